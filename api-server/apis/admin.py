@@ -3,6 +3,9 @@ from typing import Dict, Any
 
 from models.schemas import SystemStatus, RetryResponse
 from services.queue import FileQueue
+from services.token_pool import token_pool
+from services.cache import response_cache
+from services.balancer import search_balancer
 
 router = APIRouter()
 queue = FileQueue()
@@ -25,4 +28,19 @@ async def retry_failed_tasks() -> RetryResponse:
     if retried_count == 0:
         return RetryResponse(status="no_failed_tasks", count=0)
     
-    return RetryResponse(status="retried", count=retried_count)
\ No newline at end of file
+    return RetryResponse(status="retried", count=retried_count)
+
+@router.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    """GitHub 토큰별 요청 한도, LLM 캐시 적중률, 검색 레플리카 상태 등 운영 지표를 반환합니다."""
+    return {
+        "github_credentials": token_pool.get_metrics(),
+        "llm_cache": response_cache.get_stats(),
+        "search_replicas": search_balancer.get_metrics()
+    }
+
+@router.post("/cache/invalidate")
+async def invalidate_cache() -> Dict[str, Any]:
+    """LLM 응답 캐시를 비웁니다 (지식 베이스를 갱신한 경우 사용)."""
+    removed = response_cache.invalidate()
+    return {"status": "invalidated", "removed_entries": removed}
\ No newline at end of file
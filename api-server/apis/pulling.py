@@ -4,23 +4,33 @@ import time
 import json
 import asyncio
 import uuid
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
 from utils.config import settings
 from utils.logger import logger
 from services.github import GitHubService
 from services.queue import FileQueue
+from services.scheduler import PollScheduler
+from services.leader import LeaderLease
+from services.dedup import deduplicator
 
 router = APIRouter()
 queue = FileQueue()
 github_service = GitHubService()
+leader_lease = LeaderLease()
 
 # 마지막으로 처리한 이슈의 ID를 저장할 딕셔너리
 last_processed_issue_ids = {}
 
+# 레포지토리별 적응형 풀링 스케줄러 (풀링 작업이 시작되면 생성)
+poll_scheduler: Optional[PollScheduler] = None
+
 async def pull_issues_from_repo(repo_name: str) -> List[Dict[str, Any]]:
-    """특정 레포지토리에서 새로운 이슈들을 가져옵니다."""
+    """특정 레포지토리에서 새로운 이슈들을 가져옵니다.
+    
+    마지막 처리 ID는 갱신하지 않습니다. 이슈를 큐에 추가한 뒤 advance_last_processed_id로 갱신하세요.
+    """
     try:
         # 해당 레포지토리에서 마지막으로 처리한 이슈 ID 가져오기
         last_id = last_processed_issue_ids.get(repo_name, 0)
@@ -29,10 +39,7 @@ async def pull_issues_from_repo(repo_name: str) -> List[Dict[str, Any]]:
         issues = await github_service.get_issues(repo_name, since_id=last_id)
         
         if issues and len(issues) > 0:
-            # 가장 최근 이슈의 ID를 저장
-            newest_id = max(issue.get("id", 0) for issue in issues)
-            last_processed_issue_ids[repo_name] = newest_id
-            logger.info(f"레포지토리 {repo_name}에서 {len(issues)}개의 새 이슈를 가져왔습니다. 마지막 ID: {newest_id}")
+            logger.info(f"레포지토리 {repo_name}에서 {len(issues)}개의 새 이슈를 가져왔습니다.")
             return issues
         
         logger.info(f"레포지토리 {repo_name}에서 새 이슈가 없습니다.")
@@ -42,8 +49,81 @@ async def pull_issues_from_repo(repo_name: str) -> List[Dict[str, Any]]:
         logger.error(f"레포지토리 {repo_name}에서 이슈를 가져오는 중 오류 발생: {str(e)}")
         return []
 
+def advance_last_processed_id(repo_name: str, issues: List[Dict[str, Any]]):
+    """큐에 추가한 이슈 중 가장 최근 이슈의 ID를 마지막 처리 ID로 저장합니다."""
+    if not issues:
+        return
+    newest_id = max(issue.get("id", 0) for issue in issues)
+    last_processed_issue_ids[repo_name] = max(newest_id, last_processed_issue_ids.get(repo_name, 0))
+    logger.info(f"레포지토리 {repo_name}의 마지막 처리 ID: {last_processed_issue_ids[repo_name]}")
+
+async def poll_repo(repo_name: str) -> Optional[Tuple[int, int, int]]:
+    """레포지토리 하나를 풀링해 새 이슈를 큐에 추가하고 (가져온 수, 추가한 수, 건너뛴 수)를 반환합니다.
+    
+    큐에 넣기 전에 리더 lease를 잃으면 아무것도 추가하지 않고 None을 반환합니다.
+    이때 마지막 처리 ID를 그대로 두므로 다음 리더(또는 다시 리더가 된 이 레플리카)가 같은 이슈를 다시 가져옵니다.
+    """
+    issues = await pull_issues_from_repo(repo_name)
+    
+    # 큐에 넣기 전에 다시 확인 (이슈 조회가 오래 걸린 경우 다른 레플리카가 리더가 되었을 수 있음)
+    if not await leader_lease.acquire():
+        logger.warning(f"풀링 중 리더 lease를 잃어 {repo_name}의 이슈를 큐에 추가하지 않습니다.")
+        return None
+    
+    enqueued = skipped = 0
+    for issue in issues:
+        if await enqueue_pulled_issue(repo_name, issue, "pull"):
+            enqueued += 1
+        else:
+            skipped += 1
+    
+    # 모든 이슈를 큐에 추가한 뒤에만 다음 풀링의 기준 ID를 옮김
+    advance_last_processed_id(repo_name, issues)
+    return len(issues), enqueued, skipped
+
+async def enqueue_pulled_issue(repo_name: str, issue: Dict[str, Any], source: str) -> bool:
+    """풀링한 이슈를 큐에 추가합니다. 이미 처리되었거나 웹훅으로 추가된 이슈이면 False를 반환합니다."""
+    issue_number = issue.get("number")
+    if issue_number is None:
+        logger.warning(f"번호가 없는 이슈({repo_name})는 건너뜁니다.")
+        return False
+    
+    # 이미 처리된 이슈인지 확인
+    if await queue.is_issue_already_processed(repo_name, issue_number):
+        logger.info(f"이슈 #{issue_number} ({repo_name})는 이미 처리되었으므로 건너뜁니다.")
+        return False
+    
+    # 웹훅 등으로 이미 큐에 추가된 이슈인지 확인 (DUAL 모드)
+    dedup_keys = [deduplicator.issue_key(repo_name, issue_number)]
+    if deduplicator.reserve(dedup_keys):
+        logger.info(f"이슈 #{issue_number} ({repo_name})는 이미 큐에 추가된 적이 있으므로 건너뜁니다.")
+        return False
+    
+    # 이슈 데이터를 웹훅 페이로드 형식으로 변환
+    payload = {
+        "action": "opened",
+        "issue": issue,
+        "repository": {
+            "full_name": repo_name
+        },
+        "pulled_at": datetime.now().isoformat(),
+        "source": source
+    }
+    
+    # 작업을 큐에 추가
+    try:
+        await queue.enqueue(payload)
+    except Exception:
+        deduplicator.release(dedup_keys)
+        raise
+    
+    await deduplicator.commit(dedup_keys)
+    logger.info(f"이슈 #{issue_number} ({repo_name})가 큐에 추가되었습니다.")
+    return True
+
 async def pull_issues_task():
     """모든 레포지토리에서 이슈를 주기적으로 가져오는 백그라운드 작업"""
+    global poll_scheduler
     logger.info("이슈 풀링 작업 시작")
     
     # 환경 변수에서 레포지토리 목록 가져오기
@@ -53,57 +133,59 @@ async def pull_issues_task():
         logger.warning("풀링할 레포지토리가 설정되지 않았습니다. 풀링 작업을 종료합니다.")
         return
     
+    # 레포지토리별 적응형 스케줄러 초기화
+    poll_scheduler = PollScheduler(repo_list)
+    
     logger.info(f"다음 레포지토리에서 이슈 풀링 예정: {', '.join(repo_list)}")
-    logger.info(f"풀링 간격: {settings.PULLING_INTERVAL}초")
+    logger.info(f"풀링 간격: 기본 {poll_scheduler.base_interval}초 (최소 {poll_scheduler.min_interval}초, 최대 {poll_scheduler.max_interval}초)")
     
     while True:
         try:
+            # 리더 레플리카만 풀링 수행 (lease 획득 또는 갱신)
+            if not await leader_lease.acquire():
+                await asyncio.sleep(leader_lease.renew_interval)
+                continue
+            
+            # 풀링 시각이 된 레포지토리 가져오기
+            due_repos = poll_scheduler.pop_due()
+            
+            if not due_repos:
+                # 가장 가까운 풀링 시각까지 대기 (lease가 만료되기 전에 갱신할 수 있도록 제한)
+                wait_seconds = min(poll_scheduler.seconds_until_next(), leader_lease.renew_interval)
+                logger.info(f"다음 풀링까지 {wait_seconds:.0f}초 대기 중...")
+                await asyncio.sleep(wait_seconds)
+                continue
+            
             pull_start_time = time.time()
             total_issues_pulled = 0
             skipped_issues = 0
             
-            for repo_name in repo_list:
-                if not repo_name:
-                    continue
+            for position, repo_name in enumerate(due_repos):
+                # 한 주기가 lease TTL보다 길어질 수 있으므로 레포지토리마다 lease를 갱신하고,
+                # 리더를 잃었으면 남은 레포지토리는 되돌려 두고 주기를 중단
+                if not await leader_lease.acquire():
+                    logger.warning(f"풀링 중 리더 lease를 잃어 {len(due_repos) - position}개 레포지토리의 풀링을 중단합니다.")
+                    poll_scheduler.requeue(due_repos[position:])
+                    break
                 
-                # 레포지토리에서 이슈 가져오기
-                issues = await pull_issues_from_repo(repo_name)
-                
-                # 가져온 이슈들을 큐에 추가
-                for issue in issues:
-                    issue_number = issue.get("number")
-                    
-                    # 이미 처리된 이슈인지 확인
-                    if await queue.is_issue_already_processed(repo_name, issue_number):
-                        logger.info(f"이슈 #{issue_number} ({repo_name})는 이미 처리되었으므로 건너뜁니다.")
-                        skipped_issues += 1
+                fetched_count = 0
+                try:
+                    # 레포지토리에서 이슈를 가져와 큐에 추가
+                    result = await poll_repo(repo_name)
+                    if result is None:
                         continue
-                    
-                    # 이슈 데이터를 웹훅 페이로드 형식으로 변환
-                    payload = {
-                        "action": "opened",
-                        "issue": issue,
-                        "repository": {
-                            "full_name": repo_name
-                        },
-                        "pulled_at": datetime.now().isoformat(),
-                        "source": "pull"
-                    }
-                    
-                    # 작업을 큐에 추가
-                    await queue.enqueue(payload)
-                    logger.info(f"이슈 #{issue_number} ({repo_name})가 큐에 추가되었습니다.")
-                    total_issues_pulled += 1
+                    fetched_count, enqueued, skipped = result
+                    total_issues_pulled += enqueued
+                    skipped_issues += skipped
+                finally:
+                    # 풀링 결과에 따라 다음 풀링 시각 재계산 (오류가 나도 스케줄에서 빠지지 않도록)
+                    poll_scheduler.record_poll(repo_name, fetched_count)
             
             pull_duration = time.time() - pull_start_time
             if total_issues_pulled > 0 or skipped_issues > 0:
                 logger.info(f"풀링 작업 완료: {total_issues_pulled}개의 이슈를 큐에 추가, {skipped_issues}개의 이슈는 이미 처리되어 건너뜀. 소요 시간: {pull_duration:.2f}초")
             else:
                 logger.info(f"풀링 작업 완료: 새로운 이슈가 없습니다. 소요 시간: {pull_duration:.2f}초")
-            
-            # 설정된 간격만큼 대기
-            logger.info(f"다음 풀링까지 {settings.PULLING_INTERVAL}초 대기 중...")
-            await asyncio.sleep(settings.PULLING_INTERVAL)
         
         except Exception as e:
             logger.error(f"이슈 풀링 중 오류 발생: {str(e)}")
@@ -158,28 +240,10 @@ async def manual_pull():
             
             # 가져온 이슈들을 큐에 추가
             for issue in issues:
-                issue_number = issue.get("number")
-                
-                # 이미 처리된 이슈인지 확인
-                if await queue.is_issue_already_processed(repo_name, issue_number):
-                    logger.info(f"이슈 #{issue_number} ({repo_name})는 이미 처리되었으므로 건너뜁니다.")
+                if await enqueue_pulled_issue(repo_name, issue, "manual_pull"):
+                    total_issues += 1
+                else:
                     skipped_issues += 1
-                    continue
-                
-                # 이슈 데이터를 웹훅 페이로드 형식으로 변환
-                payload = {
-                    "action": "opened",
-                    "issue": issue,
-                    "repository": {
-                        "full_name": repo_name
-                    },
-                    "pulled_at": datetime.now().isoformat(),
-                    "source": "manual_pull"
-                }
-                
-                # 작업을 큐에 추가
-                await queue.enqueue(payload)
-                total_issues += 1
             
             logger.info(f"레포지토리 {repo_name}에서 {total_issues}개의 이슈를 큐에 추가, {skipped_issues}개의 이슈는 이미 처리되어 건너뜀.")
         
@@ -207,6 +271,10 @@ async def get_pulling_status():
         "pulling_enabled": len(repo_list) > 0,
         "pulling_repos": repo_list,
         "interval_seconds": settings.PULLING_INTERVAL,
+        "min_interval_seconds": settings.PULLING_MIN_INTERVAL,
+        "max_interval_seconds": settings.PULLING_MAX_INTERVAL,
+        "schedule": poll_scheduler.get_schedule() if poll_scheduler else [],
+        "leader": leader_lease.get_status(),
         "last_processed_issues": last_processed_issue_ids
     }
 
@@ -1,27 +1,87 @@
-from fastapi import APIRouter, Body  
-from typing import Dict, Any
+from fastapi import APIRouter, Request, HTTPException
+from typing import Dict, Any, Optional
+import hmac
+import json
+import hashlib
 
+from utils.config import settings
 from utils.logger import logger
 from models.schemas import WebhookResponse
 from services.queue import FileQueue
+from services.dedup import deduplicator
 
 router = APIRouter()
 queue = FileQueue()
 
-@router.post("/webhook", response_model=WebhookResponse)
-async def github_webhook(payload: Dict[str, Any] = Body(...)) -> WebhookResponse:
-    """GitHub 웹훅을 처리합니다."""
-    logger.info(f"Received webhook: issue {payload.get('issue', {}).get('number')} in repo {payload.get('repository', {}).get('full_name')}")
-    
+if not settings.GITHUB_WEBHOOK_SECRET:
+    logger.warning("GITHUB_WEBHOOK_SECRET is not set. Webhook signatures will not be verified.")
+
+def verify_signature(raw_body: bytes, signature: Optional[str]) -> bool:
+    """X-Hub-Signature-256 헤더의 HMAC 서명을 검증합니다."""
+    if not settings.GITHUB_WEBHOOK_SECRET:
+        return True
+    if not signature or not signature.startswith("sha256="):
+        return False
+
+    expected = hmac.new(
+        settings.GITHUB_WEBHOOK_SECRET.encode('utf-8'),
+        raw_body,
+        hashlib.sha256
+    ).hexdigest()
+    return hmac.compare_digest(f"sha256={expected}", signature)
+
+@router.post("/webhook", response_model=WebhookResponse, status_code=202)
+async def github_webhook(request: Request) -> WebhookResponse:
+    """GitHub 웹훅을 처리합니다.
+
+    큐 파일이 디스크에 기록되는 즉시 202를 반환하여 GitHub의 타임아웃 재전송을 막습니다.
+    """
+    raw_body = await request.body()
+
+    # 서명 검증
+    if not verify_signature(raw_body, request.headers.get("X-Hub-Signature-256")):
+        logger.warning("Rejected webhook with invalid signature")
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    try:
+        payload: Dict[str, Any] = json.loads(raw_body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+
+    issue_number = payload.get('issue', {}).get('number')
+    repo_name = payload.get('repository', {}).get('full_name')
+    delivery_id = request.headers.get("X-GitHub-Delivery")
+    logger.info(f"Received webhook: issue {issue_number} in repo {repo_name} (delivery: {delivery_id})")
+
     # 이슈 생성 이벤트만 처리
     if payload.get("action") != "opened":
         logger.info(f"Ignoring action: {payload.get('action')}")
         return WebhookResponse(
-            status="ignored", 
+            status="ignored",
             reason=f"Action {payload.get('action')} is not handled"
         )
-    
-    # 작업을 큐에 추가
-    task_id = await queue.enqueue(payload)
-    
-    return WebhookResponse(status="queued", task_id=task_id)
\ No newline at end of file
+
+    # 이슈 번호나 레포지토리가 없으면 중복 제거 키가 "issue:<repo>#None"으로 겹치므로 먼저 거부
+    if not repo_name or not isinstance(issue_number, int) or isinstance(issue_number, bool):
+        logger.warning(f"Rejected webhook without a valid issue number or repository (delivery: {delivery_id})")
+        raise HTTPException(status_code=400, detail="Payload must include repository.full_name and an integer issue.number")
+
+    # 전달 ID 및 (레포지토리, 이슈) 단위 중복 제거
+    dedup_keys = [deduplicator.issue_key(repo_name, issue_number)]
+    if delivery_id:
+        dedup_keys.insert(0, deduplicator.delivery_key(delivery_id))
+
+    duplicate_key = deduplicator.reserve(dedup_keys)
+    if duplicate_key:
+        logger.info(f"Ignoring duplicate webhook: {duplicate_key}")
+        return WebhookResponse(status="duplicate", reason=f"Already received: {duplicate_key}")
+
+    # 작업을 큐에 추가 (원본 본문을 그대로 저장)
+    try:
+        task_id = await queue.enqueue(payload, raw_body=raw_body)
+    except Exception:
+        deduplicator.release(dedup_keys)
+        raise HTTPException(status_code=500, detail="Failed to enqueue task")
+
+    await deduplicator.commit(dedup_keys)
+    return WebhookResponse(status="queued", task_id=task_id)
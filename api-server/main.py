@@ -12,6 +12,7 @@ from apis import webhook, admin, task, ping, pulling
 os.makedirs(settings.PENDING_DIR, exist_ok=True)
 os.makedirs(settings.COMPLETED_DIR, exist_ok=True)
 os.makedirs(settings.FAILED_DIR, exist_ok=True)
+os.makedirs(settings.POST_MARKER_DIR, exist_ok=True)
 
 # FastAPI 애플리케이션 생성
 app = FastAPI(title="GitHub Issue Comment Bot")
@@ -65,6 +66,10 @@ def shutdown_event():
     """애플리케이션 종료 시 실행되는 이벤트 핸들러."""
     logger.info("Shutting down GitHub Issue Comment Bot...")
     task_processor.stop()
+    
+    # 풀러 리더였다면 lease를 반납하여 다른 레플리카가 바로 이어받도록 함
+    if settings.SYSTEM_MODE in ["PULL", "DUAL"]:
+        pulling.leader_lease.release()
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)
\ No newline at end of file
@@ -36,6 +36,9 @@ class CompletedTask(BaseModel):
     llm_response: str
     completed_at: datetime = Field(default_factory=datetime.now)
     status: str = "success"
+    token_counts: Optional[Dict[str, int]] = None  # 축약 전후 추정 토큰 수
+    timings: Optional[Dict[str, Any]] = None  # 검색 서버의 단계별 소요 시간/토큰 수 (응답 캐시 적중 시 최초 응답 기준)
+    route: Optional[str] = None  # 검색 서버의 요약 단계 라우팅 결과 (skip, fast, pro)
 
 # API 응답 모델
 class WebhookResponse(BaseModel):
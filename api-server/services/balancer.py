@@ -0,0 +1,123 @@
+import time
+import random
+from collections import deque
+from typing import Dict, Any, Optional, List, Iterable
+
+from utils.config import settings
+from utils.logger import logger
+
+# 지연 시간 통계에 사용할 최근 요청 수
+LATENCY_WINDOW = 200
+# p95 기반 헤징 지연을 쓰기 위한 최소 표본 수
+MIN_LATENCY_SAMPLES = 10
+
+def p95(samples: List[float]) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+class SearchReplica:
+    """LangGraph 검색 레플리카 하나의 부하 및 서킷 브레이커 상태"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.outstanding = 0
+        self.state = "closed"  # closed, open, half_open
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.latencies: deque = deque(maxlen=LATENCY_WINDOW)
+        self.total_requests = 0
+        self.total_failures = 0
+
+    @property
+    def version_url(self) -> str:
+        """같은 레플리카의 지식 베이스 버전 엔드포인트 (.../search -> .../version)"""
+        base = self.url[:-len("/search")] if self.url.endswith("/search") else self.url.rstrip("/")
+        return f"{base}/version"
+
+    def is_available(self, now: float) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            # 리셋 시간이 지나면 시험 요청 하나를 허용 (half-open)
+            return now - (self.opened_at or 0) >= settings.SEARCH_CIRCUIT_RESET_SECONDS
+        # half_open: 시험 요청이 끝나기 전까지 추가 요청 차단
+        return self.outstanding == 0
+
+    def record_success(self, latency: Optional[float] = None):
+        self.total_requests += 1
+        if latency is not None:
+            self.latencies.append(latency)
+        if self.state != "closed":
+            logger.info(f"Search replica {self.url} recovered. Closing circuit.")
+        self.state = "closed"
+        self.consecutive_failures = 0
+
+    def record_failure(self):
+        self.total_requests += 1
+        self.total_failures += 1
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= settings.SEARCH_CIRCUIT_FAILURE_THRESHOLD:
+            if self.state != "open":
+                logger.warning(f"Opening circuit for search replica {self.url} after {self.consecutive_failures} consecutive failure(s)")
+            self.state = "open"
+            self.opened_at = time.time()
+
+class ReplicaBalancer:
+    """최소 진행 요청(least outstanding requests) 방식으로 검색 레플리카를 선택합니다."""
+
+    def __init__(self, urls: List[str]):
+        self.replicas = [SearchReplica(url) for url in urls]
+        logger.info(f"Search replicas: {', '.join(urls)}")
+
+    def pick(self, exclude: Iterable[SearchReplica] = ()) -> Optional[SearchReplica]:
+        """사용 가능한 레플리카 중 진행 중인 요청이 가장 적은 것을 반환합니다.
+
+        고르는 즉시 진행 요청 수를 늘려 같은 순간의 다른 호출자가 half-open 시험 요청을
+        중복으로 보내지 않게 합니다. 요청이 끝나면 반드시 release()를 호출하세요.
+        """
+        now = time.time()
+        excluded = set(id(replica) for replica in exclude)
+        candidates = [replica for replica in self.replicas
+                      if id(replica) not in excluded and replica.is_available(now)]
+        if not candidates:
+            return None
+
+        fewest = min(replica.outstanding for replica in candidates)
+        replica = random.choice([replica for replica in candidates if replica.outstanding == fewest])
+        if replica.state == "open":
+            replica.state = "half_open"
+        replica.outstanding += 1
+        return replica
+
+    def release(self, replica: SearchReplica):
+        """pick()으로 예약한 진행 요청 하나를 반납합니다."""
+        replica.outstanding = max(0, replica.outstanding - 1)
+
+    def hedge_delay(self) -> float:
+        """헤징 요청을 보내기 전 대기 시간 (최근 성공 지연 시간의 p95)"""
+        samples = [latency for replica in self.replicas for latency in replica.latencies]
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return max(settings.SEARCH_HEDGE_MIN_DELAY, settings.SEARCH_API_TIMEOUT / 2)
+        return max(settings.SEARCH_HEDGE_MIN_DELAY, p95(samples))
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        metrics = []
+        for replica in self.replicas:
+            latency_p95 = p95(list(replica.latencies))
+            metrics.append({
+                "url": replica.url,
+                "state": replica.state,
+                "outstanding": replica.outstanding,
+                "total_requests": replica.total_requests,
+                "total_failures": replica.total_failures,
+                "p95_latency_seconds": round(latency_p95, 3) if latency_p95 is not None else None
+            })
+        return metrics
+
+def _configured_urls() -> List[str]:
+    urls = [url.strip() for url in settings.SEARCH_API_URLS.split(',') if url.strip()]
+    return urls or [settings.SEARCH_API_URL]
+
+search_balancer = ReplicaBalancer(_configured_urls())
@@ -0,0 +1,187 @@
+import os
+import re
+import json
+import glob
+import time
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from utils.config import settings
+from utils.logger import logger
+
+class ResponseCache:
+    """LLM 응답 캐시 (메모리 LRU + 디스크 계층).
+
+    정규화한 이슈 쿼리의 해시를 키로 사용하며, 항목은 TTL이 지나거나
+    지식 베이스(Milvus 컬렉션) 버전이 바뀌면 무효화됩니다.
+    디스크 계층은 재시작 후에도 유지됩니다.
+    """
+
+    def __init__(self):
+        self.cache_dir = settings.LLM_CACHE_DIR
+        self.max_size = settings.LLM_CACHE_MAX_ENTRIES
+        self.max_disk_size = max(settings.LLM_CACHE_MAX_DISK_ENTRIES, self.max_size)
+        self.ttl = settings.LLM_CACHE_TTL_SECONDS
+        self.enabled = settings.LLM_CACHE_ENABLED
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._writes = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "invalidations": 0}
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._version_file = os.path.join(self.cache_dir, "KB_VERSION")
+        self.kb_version = self._read_version()
+
+        # 설정된 지식 베이스 버전이 캐시 버전과 다르면 캐시 비우기
+        if settings.KNOWLEDGE_BASE_VERSION:
+            self.observe_kb_version(settings.KNOWLEDGE_BASE_VERSION)
+
+    @staticmethod
+    def make_key(query: str) -> str:
+        """공백/대소문자/유니코드 표현 차이를 정규화한 쿼리의 해시를 반환합니다."""
+        normalized = unicodedata.normalize("NFKC", query).lower()
+        normalized = re.sub(r"\s+", " ", normalized).strip()
+        return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+    def _read_version(self) -> str:
+        if not os.path.exists(self._version_file):
+            return ""
+        try:
+            with open(self._version_file, 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        except Exception:
+            return ""
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _is_valid(self, entry: Dict[str, Any]) -> bool:
+        if time.time() - entry.get("created_at", 0) > self.ttl:
+            return False
+        return entry.get("kb_version", "") == self.kb_version
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_size:
+            self._memory.popitem(last=False)
+
+    def _remove(self, key: str):
+        self._memory.pop(key, None)
+        try:
+            os.remove(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Failed to remove cache entry {key}: {str(e)}")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """캐시된 응답을 반환합니다. 없거나 만료되었으면 None을 반환합니다."""
+        if not self.enabled:
+            return None
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            if self._is_valid(entry):
+                self._memory.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry["response"]
+            self._remove(key)
+
+        entry_path = self._entry_path(key)
+        if os.path.exists(entry_path):
+            try:
+                with open(entry_path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+                if self._is_valid(entry):
+                    self._remember(key, entry)
+                    self.stats["hits"] += 1
+                    self.stats["disk_hits"] += 1
+                    return entry["response"]
+                self._remove(key)
+            except Exception as e:
+                logger.warning(f"Could not read cache entry {key}: {str(e)}")
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(self, key: str, response: Dict[str, Any]):
+        """응답을 메모리와 디스크에 저장합니다."""
+        if not self.enabled:
+            return
+
+        entry = {
+            "response": response,
+            "created_at": time.time(),
+            "kb_version": self.kb_version
+        }
+        self._remember(key, entry)
+
+        try:
+            entry_path = self._entry_path(key)
+            temp_file = f"{entry_path}.temp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(temp_file, entry_path)
+        except Exception as e:
+            logger.error(f"Failed to write cache entry {key}: {str(e)}")
+            return
+
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """디스크 항목 수가 상한을 넘으면 오래된 항목부터 삭제합니다."""
+        entry_files = glob.glob(os.path.join(self.cache_dir, "*.json"))
+        overflow = len(entry_files) - self.max_disk_size
+        if overflow <= 0:
+            return
+
+        entry_files.sort(key=os.path.getmtime)
+        for entry_file in entry_files[:overflow]:
+            try:
+                os.remove(entry_file)
+            except OSError:
+                pass
+        logger.info(f"Pruned {overflow} LLM cache entries from disk")
+
+    def observe_kb_version(self, version: Optional[str]):
+        """지식 베이스 버전을 반영합니다. 버전이 바뀌면 캐시 전체를 무효화합니다."""
+        if not version or version == self.kb_version:
+            return
+
+        logger.info(f"Knowledge base version changed ({self.kb_version or 'unknown'} -> {version}). Invalidating LLM cache.")
+        self.invalidate()
+        self.kb_version = version
+        try:
+            with open(self._version_file, 'w', encoding='utf-8') as f:
+                f.write(version)
+        except Exception as e:
+            logger.error(f"Failed to write cache version file: {str(e)}")
+
+    def invalidate(self) -> int:
+        """캐시 전체를 비우고 삭제한 디스크 항목 수를 반환합니다."""
+        self._memory.clear()
+        removed = 0
+        for entry_file in glob.glob(os.path.join(self.cache_dir, "*.json")):
+            try:
+                os.remove(entry_file)
+                removed += 1
+            except OSError:
+                pass
+        self.stats["invalidations"] += 1
+        return removed
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "enabled": self.enabled,
+            "kb_version": self.kb_version or None,
+            "memory_entries": len(self._memory),
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            **self.stats
+        }
+
+response_cache = ResponseCache()
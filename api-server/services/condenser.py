@@ -0,0 +1,187 @@
+import re
+import math
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from utils.config import settings
+
+# 한글/한자/가나 문자 (대략 문자당 토큰 1개로 계산)
+CJK_PATTERN = re.compile(r"[\u1100-\u11ff\u3040-\u30ff\u3130-\u318f\u4e00-\u9fff\uac00-\ud7af]")
+# 마크다운/HTML 이미지 및 data URI
+IMAGE_PATTERNS = [
+    re.compile(r"!\[[^\]]*\]\([^)]*\)"),
+    re.compile(r"<img\b[^>]*>", re.IGNORECASE),
+    re.compile(r"data:[\w/+.-]+;base64,[A-Za-z0-9+/=]+"),
+]
+# 공백 없이 길게 이어지는 base64/바이너리 덤프
+BASE64_PATTERN = re.compile(r"[A-Za-z0-9+/]{200,}={0,2}")
+# 로그/스택 트레이스 줄
+LOG_LINE_PATTERN = re.compile(
+    r"^\s*("
+    r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}"                 # 2024-01-01 12:00 타임스탬프
+    r"|\[?(TRACE|DEBUG|INFO|WARN|WARNING|ERROR|FATAL)\]?[\s:]"  # 로그 레벨
+    r"|at [\w$.<>]+\(.*\)"                                # Java/JS 스택 프레임
+    r"|File \".*\", line \d+"                             # Python 스택 프레임
+    r"|[IWEF]\d{4} \d{2}:\d{2}"                           # glog
+    r")"
+)
+FENCE_PATTERN = re.compile(r"^\s*(```|~~~)")
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 토큰 수를 추정합니다 (CJK 문자 1개 ≈ 1토큰, 그 외 4문자 ≈ 1토큰)."""
+    if not text:
+        return 0
+    cjk_count = len(CJK_PATTERN.findall(text))
+    return cjk_count + math.ceil((len(text) - cjk_count) / 4)
+
+def _elide(lines: List[str], head: int, tail: int, label: str) -> List[str]:
+    """줄 목록이 길면 앞뒤 일부만 남기고 가운데를 생략합니다."""
+    if len(lines) <= head + tail + 1:
+        return lines
+    omitted = len(lines) - head - tail
+    return lines[:head] + [f"... ({omitted} {label} lines omitted) ..."] + (lines[-tail:] if tail else [])
+
+def _dedupe_lines(lines: List[str], seen: Optional[Set[str]] = None) -> List[str]:
+    """연속으로 반복되는 줄을 합치고, 앞에서 이미 나온 긴 줄은 제거합니다.
+
+    코드 펜스 줄이 섞이면 블록 짝이 어긋나므로 펜스를 나눈 뒤 펜스가 아닌 줄에만 사용합니다.
+    seen을 넘기면 여러 구간에 걸쳐 이미 나온 긴 줄을 공유합니다.
+    """
+    result: List[str] = []
+    seen = seen if seen is not None else set()
+    repeat = 0
+
+    for line in lines:
+        key = line.strip()
+        if result and key and key == result[-1].strip():
+            repeat += 1
+            continue
+        if repeat:
+            result.append(f"(previous line repeated {repeat} more times)")
+            repeat = 0
+        if len(key) > 20 and key in seen:
+            continue
+        seen.add(key)
+        result.append(line)
+
+    if repeat:
+        result.append(f"(previous line repeated {repeat} more times)")
+    return result
+
+def _split_fences(lines: List[str]) -> List[Tuple[bool, List[str]]]:
+    """줄 목록을 코드 블록(여닫는 펜스 포함)과 그 밖의 구간으로 나눕니다. [(코드 블록 여부, 줄 목록)]"""
+    segments: List[Tuple[bool, List[str]]] = []
+    current: List[str] = []
+    in_fence = False
+
+    for line in lines:
+        if FENCE_PATTERN.match(line):
+            if in_fence:
+                current.append(line)
+                segments.append((True, current))
+                current = []
+                in_fence = False
+            else:
+                if current:
+                    segments.append((False, current))
+                current = [line]
+                in_fence = True
+            continue
+        current.append(line)
+
+    # 닫히지 않은 코드 블록은 여는 펜스만 가진 블록으로 남김
+    if current:
+        segments.append((in_fence, current))
+    return segments
+
+def _condense_log_runs(lines: List[str], head: int, tail: int) -> List[str]:
+    """연속된 로그 줄을 앞뒤 일부만 남기고 줄입니다."""
+    result: List[str] = []
+    log_run: List[str] = []
+
+    for line in lines:
+        if LOG_LINE_PATTERN.match(line):
+            log_run.append(line)
+            continue
+        result.extend(_elide(log_run, head, tail, "log"))
+        log_run = []
+        result.append(line)
+
+    result.extend(_elide(log_run, head, tail, "log"))
+    return result
+
+def _condense_blocks(lines: List[str], head: int, tail: int) -> List[str]:
+    """반복 줄을 제거하고, 코드 블록과 연속된 로그 줄을 앞뒤 일부만 남기고 줄입니다.
+
+    펜스를 먼저 나눈 뒤 펜스 안쪽과 바깥 줄에만 반복 제거를 적용하므로 여닫는 펜스는 항상 유지됩니다.
+    """
+    result: List[str] = []
+    seen: Set[str] = set()
+
+    for is_code, segment in _split_fences(lines):
+        if not is_code:
+            result.extend(_condense_log_runs(_dedupe_lines(segment, seen), head, tail))
+            continue
+
+        closed = len(segment) > 1 and FENCE_PATTERN.match(segment[-1]) is not None
+        body = segment[1:-1] if closed else segment[1:]
+        result.append(segment[0])
+        result.extend(_elide(_dedupe_lines(body, seen), head, tail, "code"))
+        if closed:
+            result.append(segment[-1])
+    return result
+
+def truncate_to_budget(text: str, token_budget: int) -> str:
+    """토큰 예산을 넘으면 앞부분 2/3, 뒷부분 1/3을 남기고 자릅니다. 생략 표시도 예산에 포함합니다."""
+    if token_budget <= 0:
+        return ""
+    tokens = estimate_tokens(text)
+    if tokens <= token_budget:
+        return text
+
+    marker = f"\n... (truncated to fit {token_budget} token budget) ...\n"
+    available = token_budget - estimate_tokens(marker)
+    if available <= 0:
+        # 예산이 생략 표시보다 작으면 앞부분만 남김
+        marker, available = "", token_budget
+
+    # 추정 토큰 비율로 남길 문자 수를 구하고, CJK 분포 차이로 넘치면 줄여가며 맞춤
+    keep_chars = max(1, int(len(text) * available / tokens))
+    while True:
+        head_chars = keep_chars * 2 // 3 if marker else keep_chars
+        tail_chars = keep_chars - head_chars
+        tail = text[-tail_chars:] if tail_chars else ""
+        truncated = f"{text[:head_chars]}{marker}{tail}"
+        if estimate_tokens(truncated) <= token_budget or keep_chars <= 1:
+            return truncated
+        keep_chars = max(1, int(keep_chars * 0.9))
+
+def condense(text: str, token_budget: int, block_head: int = 8, block_tail: int = 4) -> Dict[str, Any]:
+    """이슈 본문에서 이미지, 바이너리, 긴 코드/로그, 반복 줄을 줄이고 토큰 예산에 맞춥니다.
+
+    Args:
+        text: 원본 텍스트
+        token_budget: 최대 토큰 수 (추정치 기준)
+        block_head: 코드/로그 블록에서 남길 앞쪽 줄 수
+        block_tail: 코드/로그 블록에서 남길 뒤쪽 줄 수 (에러 메시지는 보통 끝에 있음)
+
+    Returns:
+        {"text": 줄인 텍스트, "tokens_before": 원본 토큰 수, "tokens_after": 결과 토큰 수}
+    """
+    text = text or ""
+    tokens_before = estimate_tokens(text)
+
+    if settings.CONDENSE_ENABLED:
+        for pattern in IMAGE_PATTERNS:
+            text = pattern.sub("[image]", text)
+        text = BASE64_PATTERN.sub("[binary data omitted]", text)
+
+        lines = _condense_blocks(text.splitlines(), block_head, block_tail)
+        text = re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+    text = truncate_to_budget(text, token_budget)
+
+    return {
+        "text": text,
+        "tokens_before": tokens_before,
+        "tokens_after": estimate_tokens(text)
+    }
@@ -0,0 +1,130 @@
+import os
+import asyncio
+from collections import OrderedDict
+from typing import List, Optional
+
+from utils.config import settings
+from utils.logger import logger
+
+class Deduplicator:
+    """웹훅 전달 ID와 (레포지토리, 이슈) 키의 중복을 걸러냅니다.
+
+    최근 키는 크기가 제한된 메모리 LRU에 보관하고, 큐에 추가가 끝난 키는
+    append-only 파일에 기록하여 재시작 후에도 중복을 감지합니다.
+    파일은 LRU 크기의 두 배를 넘게 쌓이면 현재 LRU 내용으로 다시 씁니다.
+
+    각 키는 함께 예약된 이슈 키를 기억하므로, 작업이 실패하면 forget_issue로
+    그 이슈의 키와 전달 ID 키를 모두 지워 재전송이나 수동 풀링으로 다시 추가할 수 있습니다.
+    파일 기록은 이벤트 루프를 막지 않도록 스레드에서 실행합니다.
+    """
+
+    def __init__(self):
+        self.path = settings.DEDUP_STORE_FILE
+        self.max_size = settings.DEDUP_MAX_KEYS
+        # 키 -> 함께 예약된 이슈 키 (이슈 키가 없으면 자기 자신)
+        self._seen: "OrderedDict[str, str]" = OrderedDict()
+        self._log_lines = 0
+        self._write_lock = asyncio.Lock()
+        self._load()
+
+    @staticmethod
+    def delivery_key(delivery_id: str) -> str:
+        return f"delivery:{delivery_id}"
+
+    @staticmethod
+    def issue_key(repo_name: str, issue_number: int) -> str:
+        if not repo_name or issue_number is None:
+            raise ValueError(f"Invalid issue identity: {repo_name}#{issue_number}")
+        return f"issue:{repo_name}#{issue_number}"
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    self._log_lines += 1
+                    # "-키"는 실패한 작업의 키를 지운 기록
+                    if line.startswith("-"):
+                        self._seen.pop(line[1:], None)
+                        continue
+                    key, _, owner = line.partition("\t")
+                    self._remember(key, owner or key)
+            logger.info(f"Loaded {len(self._seen)} dedup keys from {self.path}")
+        except Exception as e:
+            logger.error(f"Failed to load dedup store {self.path}: {str(e)}")
+
+    def _remember(self, key: str, owner: str):
+        self._seen[key] = owner
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+
+    def reserve(self, keys: List[str]) -> Optional[str]:
+        """키들을 메모리에 예약합니다.
+
+        Returns:
+            이미 본 키가 있으면 그 키, 모두 처음 보는 키이면 None
+        """
+        for key in keys:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return key
+
+        owner = next((key for key in keys if key.startswith("issue:")), None)
+        for key in keys:
+            self._remember(key, owner or key)
+        return None
+
+    def release(self, keys: List[str]):
+        """큐 추가에 실패한 경우 예약을 취소하여 재전송을 받을 수 있게 합니다."""
+        for key in keys:
+            self._seen.pop(key, None)
+
+    async def commit(self, keys: List[str]):
+        """큐 추가가 끝난 키를 파일에 기록합니다."""
+        await self._append([f"{key}\t{self._seen.get(key, key)}" for key in keys])
+
+    async def forget_issue(self, repo_name: str, issue_number: int):
+        """실패한 작업의 이슈 키와 함께 예약된 전달 ID 키를 지웁니다 (재전송, 수동 풀링으로 다시 추가 가능)."""
+        issue_key = self.issue_key(repo_name, issue_number)
+        keys = [key for key, owner in self._seen.items() if key == issue_key or owner == issue_key]
+        if not keys:
+            return
+        for key in keys:
+            self._seen.pop(key, None)
+        await self._append([f"-{key}" for key in keys])
+        logger.info(f"Released dedup keys of failed task: {', '.join(keys)}")
+
+    async def _append(self, lines: List[str]):
+        async with self._write_lock:
+            try:
+                await asyncio.to_thread(self._append_lines, lines)
+                self._log_lines += len(lines)
+
+                if self._log_lines > self.max_size * 2:
+                    # 스레드에서 LRU를 순회하지 않도록 현재 내용을 먼저 복사
+                    snapshot = list(self._seen.items())
+                    await asyncio.to_thread(self._compact, snapshot)
+                    self._log_lines = len(snapshot)
+                    logger.info(f"Compacted dedup store to {self._log_lines} keys")
+            except Exception as e:
+                logger.error(f"Failed to persist dedup keys: {str(e)}")
+
+    def _append_lines(self, lines: List[str]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write("".join(f"{line}\n" for line in lines))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _compact(self, snapshot: List[tuple]):
+        temp_file = f"{self.path}.temp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            f.write("".join(f"{key}\t{owner}\n" for key, owner in snapshot))
+        os.replace(temp_file, self.path)
+
+deduplicator = Deduplicator()
@@ -1,29 +1,40 @@
 import httpx
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 
 from utils.config import settings
 from utils.logger import logger
+from services.token_pool import token_pool, GitHubCredential
+
+# 봇 댓글에 붙이는 숨김 마커 (중복 게시 확인용)
+COMMENT_MARKER_TEMPLATE = "<!-- issue-comment-bot:task-id={task_id} -->"
 
 class GitHubService:
     def __init__(self):
         self.api_url = settings.GITHUB_API_URL
-        self.token = settings.GITHUB_TOKEN
+        self.token_pool = token_pool
         
-        if not self.token:
+        if not len(self.token_pool):
             logger.warning("GitHub token is not set. API calls may be rate limited.")
     
+    def _build_headers(self, repo_name: str) -> Tuple[Dict[str, str], Optional[GitHubCredential]]:
+        """요청 헤더를 만들고, 토큰 풀에서 남은 한도가 가장 많은 토큰을 골라 인증 헤더에 넣습니다."""
+        headers = {
+            "Accept": "application/vnd.github.v3+json"
+        }
+        
+        credential = self.token_pool.select(repo_name)
+        if credential:
+            headers["Authorization"] = f"token {credential.token}"
+        
+        return headers, credential
+    
     async def post_comment(self, repo_name: str, issue_number: int, comment: str) -> bool:
         """GitHub 이슈에 댓글을 작성합니다."""
         try:
             logger.info(f"Posting comment to {repo_name}#{issue_number}")
             
             url = f"{self.api_url}/repos/{repo_name}/issues/{issue_number}/comments"
-            headers = {
-                "Accept": "application/vnd.github.v3+json"
-            }
-            
-            if self.token:
-                headers["Authorization"] = f"token {self.token}"
+            headers, credential = self._build_headers(repo_name)
             
             async with httpx.AsyncClient() as client:
                 response = await client.post(
@@ -31,6 +42,7 @@ class GitHubService:
                     json={"body": comment},
                     headers=headers
                 )
+                self.token_pool.update(credential, response.headers)
                 response.raise_for_status()
                 
             logger.info(f"Comment posted successfully to {repo_name}#{issue_number}")
@@ -39,6 +51,47 @@ class GitHubService:
             logger.error(f"Error posting comment to GitHub: {str(e)}")
             return False
             
+    def tag_comment(self, comment: str, task_id: str) -> str:
+        """댓글 본문 끝에 작업 ID를 담은 숨김 마커를 붙입니다."""
+        return f"{comment}\n\n{COMMENT_MARKER_TEMPLATE.format(task_id=task_id)}"
+    
+    async def has_tagged_comment(self, repo_name: str, issue_number: int, task_id: str) -> Optional[bool]:
+        """이슈에 해당 작업 ID 마커가 붙은 댓글이 이미 있는지 확인합니다.
+        
+        Returns:
+            댓글이 있으면 True, 없으면 False, 확인에 실패하면 None
+        """
+        marker = COMMENT_MARKER_TEMPLATE.format(task_id=task_id)
+        url = f"{self.api_url}/repos/{repo_name}/issues/{issue_number}/comments"
+        
+        try:
+            logger.info(f"Checking existing comments on {repo_name}#{issue_number} for task {task_id}")
+            page = 1
+            
+            async with httpx.AsyncClient() as client:
+                while True:
+                    headers, credential = self._build_headers(repo_name)
+                    response = await client.get(
+                        url,
+                        params={"per_page": 100, "page": page},
+                        headers=headers,
+                        timeout=30.0
+                    )
+                    self.token_pool.update(credential, response.headers)
+                    response.raise_for_status()
+                    
+                    comments = response.json()
+                    if any(marker in (comment.get("body") or "") for comment in comments):
+                        return True
+                    
+                    if len(comments) < 100:
+                        return False
+                    
+                    page += 1
+        except Exception as e:
+            logger.error(f"Error checking comments on GitHub: {str(e)}")
+            return None
+    
     async def get_issues(self, repo_name: str, since_id: int = 0, limit: int = 100, state: str = "open") -> List[Dict[str, Any]]:
         """GitHub 레포지토리에서 이슈 목록을 가져옵니다.
         
@@ -55,12 +108,6 @@ class GitHubService:
             logger.info(f"Fetching issues from {repo_name} (since_id: {since_id})")
             
             url = f"{self.api_url}/repos/{repo_name}/issues"
-            headers = {
-                "Accept": "application/vnd.github.v3+json"
-            }
-            
-            if self.token:
-                headers["Authorization"] = f"token {self.token}"
             
             params = {
                 "state": state,
@@ -75,12 +122,15 @@ class GitHubService:
             async with httpx.AsyncClient() as client:
                 while len(issues) < limit:
                     params["page"] = page
+                    # 페이지마다 남은 한도가 가장 많은 토큰 선택
+                    headers, credential = self._build_headers(repo_name)
                     response = await client.get(
                         url,
                         params=params,
                         headers=headers,
                         timeout=30.0  # 타임아웃 30초
                     )
+                    self.token_pool.update(credential, response.headers)
                     response.raise_for_status()
                     
                     page_issues = response.json()
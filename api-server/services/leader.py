@@ -0,0 +1,128 @@
+import os
+import json
+import asyncio
+import time
+import uuid
+import fcntl
+import socket
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from utils.config import settings
+from utils.logger import logger
+
+class LeaderLease:
+    """공유 큐 볼륨의 lease 파일로 리더를 선출합니다.
+
+    여러 레플리카가 같은 file-queue 볼륨을 공유할 때, lease를 가진
+    레플리카 하나만 이슈 풀링을 수행합니다. 리더는 TTL 안에 lease를
+    갱신해야 하며, 갱신이 끊기면(프로세스 종료 등) 만료 후 다른
+    레플리카가 lease를 넘겨받습니다.
+    """
+
+    def __init__(self, name: str = "poller"):
+        os.makedirs(settings.TASKS_DIR, exist_ok=True)
+        self.lease_path = os.path.join(settings.TASKS_DIR, f"{name}.lease")
+        self.lock_path = f"{self.lease_path}.lock"
+        self.ttl = settings.PULLING_LEADER_LEASE_SECONDS
+        self.holder_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+
+    @property
+    def renew_interval(self) -> float:
+        """lease 갱신 주기 (TTL의 1/3)"""
+        return max(1.0, self.ttl / 3)
+
+    def _read_lease(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.lease_path):
+            return None
+        try:
+            with open(self.lease_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logger.warning(f"Could not read leader lease file: {str(e)}")
+            return None
+
+    def _write_lease(self, lease: Dict[str, Any]):
+        # atomic write
+        temp_file = f"{self.lease_path}.{self.holder_id}.temp"
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(lease, f, ensure_ascii=False, indent=2)
+        os.replace(temp_file, self.lease_path)
+
+    async def acquire(self) -> bool:
+        """try_acquire를 스레드에서 실행합니다. 다른 프로세스가 잠금을 잡고 있어도 이벤트 루프를 막지 않습니다."""
+        return await asyncio.to_thread(self.try_acquire)
+
+    def try_acquire(self) -> bool:
+        """lease를 획득하거나 갱신합니다. 리더이면 True를 반환합니다."""
+        try:
+            with open(self.lock_path, 'a+') as lock_file:
+                # lease 읽기-쓰기 구간을 레플리카 간에 직렬화
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    now = time.time()
+                    lease = self._read_lease()
+
+                    if lease and lease.get("holder") != self.holder_id and lease.get("expires_at", 0) > now:
+                        if self.is_leader:
+                            logger.warning(f"리더 lease를 잃었습니다. 현재 리더: {lease.get('holder')}")
+                        self.is_leader = False
+                        return False
+
+                    acquired_at = now
+                    if lease and lease.get("holder") == self.holder_id:
+                        acquired_at = lease.get("acquired_at", now)
+
+                    self._write_lease({
+                        "holder": self.holder_id,
+                        "acquired_at": acquired_at,
+                        "renewed_at": now,
+                        "expires_at": now + self.ttl
+                    })
+
+                    if not self.is_leader:
+                        previous = lease.get("holder") if lease else None
+                        logger.info(f"리더 lease 획득: {self.holder_id} (이전 리더: {previous})")
+                    self.is_leader = True
+                    return True
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        except Exception as e:
+            logger.error(f"리더 lease 처리 중 오류 발생: {str(e)}")
+            self.is_leader = False
+            return False
+
+    def release(self):
+        """리더인 경우 lease를 반납하여 다른 레플리카가 즉시 넘겨받을 수 있게 합니다."""
+        if not self.is_leader:
+            return
+        try:
+            with open(self.lock_path, 'a+') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    lease = self._read_lease()
+                    if lease and lease.get("holder") == self.holder_id:
+                        os.remove(self.lease_path)
+                        logger.info(f"리더 lease 반납: {self.holder_id}")
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        except Exception as e:
+            logger.error(f"리더 lease 반납 중 오류 발생: {str(e)}")
+        finally:
+            self.is_leader = False
+
+    def get_status(self) -> Dict[str, Any]:
+        """현재 lease 상태를 반환합니다."""
+        lease = self._read_lease() or {}
+
+        def to_iso(ts: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+        return {
+            "instance_id": self.holder_id,
+            "is_leader": self.is_leader,
+            "leader": lease.get("holder") if lease.get("expires_at", 0) > time.time() else None,
+            "lease_expires_at": to_iso(lease.get("expires_at")),
+            "lease_ttl_seconds": self.ttl
+        }
@@ -1,29 +1,199 @@
+import asyncio
+import time
 import httpx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List
 
 from utils.config import settings
 from utils.logger import logger
+from services.cache import response_cache
+from services.balancer import search_balancer, SearchReplica
+from services.condenser import condense, estimate_tokens, truncate_to_budget
 
 class LLMService:
     def __init__(self):
-        self.api_url = settings.SEARCH_API_URL
+        self.balancer = search_balancer
+        self.cache = response_cache
+        # 진행 중인 요청 (캐시 키 -> 공유 future)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 지식 베이스 버전 확인 (마지막 확인 시각, 진행 중인 확인)
+        self._version_checked_at = 0.0
+        self._version_check: Optional[asyncio.Future] = None
     
-    async def generate_response(self, query: str) -> Optional[Dict[str, Any]]:
-        """LLM API를 호출하여 응답을 생성합니다."""
+    async def generate_response(self, query: str, search_query: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """LLM API를 호출하여 응답을 생성합니다. 같은 쿼리의 응답이 캐시에 있으면 재사용합니다.
+        
+        같은 정규화 쿼리에 대한 요청이 이미 진행 중이면 새로 호출하지 않고
+        진행 중인 요청의 결과를 함께 기다립니다 (single-flight).
+        """
+        cache_key = self.cache.make_key(query)
+        # 재적재 후 이전 지식 베이스의 답변이 나가지 않도록 적중 전에 버전 확인
+        await self._refresh_kb_version()
+        cached_response = self.cache.get(cache_key)
+        if cached_response is not None:
+            logger.info(f"LLM response cache hit: {cache_key[:12]}")
+            return cached_response
+        
+        inflight = self._inflight.get(cache_key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(self._fetch_and_cache(cache_key, query, search_query))
+            self._inflight[cache_key] = inflight
+            inflight.add_done_callback(lambda task: self._discard_inflight(cache_key, task))
+        else:
+            logger.info(f"Joining in-flight LLM request: {cache_key[:12]}")
+        
+        # 한 호출자가 취소되어도 공유 요청은 취소되지 않도록 shield 사용
+        return await asyncio.shield(inflight)
+    
+    async def _refresh_kb_version(self):
+        """검색 서버의 지식 베이스 버전을 확인해 캐시에 반영합니다 (최대 LLM_CACHE_VERSION_CHECK_SECONDS마다 한 번)."""
+        if not self.cache.enabled or settings.LLM_CACHE_VERSION_CHECK_SECONDS <= 0:
+            return
+        if self._version_check is None:
+            if time.monotonic() - self._version_checked_at < settings.LLM_CACHE_VERSION_CHECK_SECONDS:
+                return
+            # 확인 실패 시에도 간격을 지키도록 시작 시각으로 기록
+            self._version_checked_at = time.monotonic()
+            self._version_check = asyncio.ensure_future(self._fetch_kb_version())
+            self._version_check.add_done_callback(self._clear_version_check)
+        
+        version = await asyncio.shield(self._version_check)
+        self.cache.observe_kb_version(version)
+    
+    def _clear_version_check(self, task: asyncio.Future):
+        if self._version_check is task:
+            self._version_check = None
+    
+    async def _fetch_kb_version(self) -> Optional[str]:
+        """서킷이 열리지 않은 레플리카의 /version에서 지식 베이스 버전을 가져옵니다. 모두 실패하면 None."""
+        for replica in self.balancer.replicas:
+            if replica.state == "open":
+                continue
+            try:
+                async with httpx.AsyncClient() as client:
+                    response = await client.get(replica.version_url, timeout=settings.LLM_CACHE_VERSION_CHECK_TIMEOUT)
+                    response.raise_for_status()
+                    return response.json().get("kb_version")
+            except Exception as e:
+                logger.warning(f"Could not check knowledge base version on {replica.url}: {str(e)}")
+        return None
+    
+    def _discard_inflight(self, cache_key: str, task: asyncio.Future):
+        if self._inflight.get(cache_key) is task:
+            del self._inflight[cache_key]
+    
+    async def _fetch_and_cache(self, cache_key: str, query: str, search_query: Optional[str]) -> Optional[Dict[str, Any]]:
+        response_data = await self._call_search_api(query, search_query)
+        
+        if response_data:
+            # 지식 베이스 버전이 바뀌었으면 캐시를 비운 뒤 저장
+            self.cache.observe_kb_version(response_data.get("kb_version"))
+            self.cache.set(cache_key, response_data)
+        
+        return response_data
+    
+    async def _call_search_api(self, query: str, search_query: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """LangGraph 검색 API를 호출합니다."""
         try:
             logger.info(f"Calling LLM API with query: {query[:2000]}...")
-            
+            payload = {"query": query}
+            if search_query:
+                payload["search_query"] = search_query
+            return await self._post_to_replicas(payload)
+        except Exception as e:
+            logger.error(f"Error calling LLM API: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _is_client_error(error: BaseException) -> bool:
+        """요청 자체의 문제(4xx)로 다른 레플리카에서도 똑같이 실패할 오류인지 확인합니다."""
+        return isinstance(error, httpx.HTTPStatusError) and 400 <= error.response.status_code < 500
+    
+    async def _post_to_replica(self, replica: SearchReplica, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """레플리카 하나에 요청을 보내고 결과로 서킷 브레이커 상태를 갱신합니다.
+
+        연결 오류, 타임아웃, 5xx만 레플리카 장애로 집계합니다. 4xx는 레플리카가 정상 응답한 것이므로
+        서킷을 열지 않습니다. 진행 요청 수는 pick()에서 늘리고 작업 완료 콜백에서 줄입니다.
+        """
+        start_time = time.monotonic()
+        try:
             async with httpx.AsyncClient() as client:
                 response = await client.post(
-                    self.api_url,
-                    json={"query": query},
-                    timeout=60.0  # LLM은 시간이 걸릴 수 있으므로 타임아웃 길게 설정
+                    replica.url,
+                    json=payload,
+                    timeout=settings.SEARCH_API_TIMEOUT  # LLM은 시간이 걸릴 수 있으므로 타임아웃 길게 설정
                 )
                 response.raise_for_status()
-                return response.json()
-        except Exception as e:
-            logger.error(f"Error calling LLM API: {str(e)}")
-            return None
+                result = response.json()
+            replica.record_success(time.monotonic() - start_time)
+            return result
+        except asyncio.CancelledError:
+            # 헤징에서 진 요청은 실패로 집계하지 않음
+            raise
+        except httpx.HTTPStatusError as e:
+            if self._is_client_error(e):
+                replica.record_success()
+            else:
+                replica.record_failure()
+            raise
+        except httpx.TransportError:
+            # 연결 실패, 타임아웃 등
+            replica.record_failure()
+            raise
+    
+    async def _post_to_replicas(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """레플리카를 골라 요청하고, 실패하면 다른 레플리카로 넘기며, 설정 시 헤징 요청을 보냅니다."""
+        tried: List[SearchReplica] = []
+        pending: Dict[asyncio.Future, SearchReplica] = {}
+        last_error: Optional[BaseException] = None
+        hedged = False
+        
+        def launch() -> bool:
+            replica = self.balancer.pick(exclude=tried)
+            if not replica:
+                return False
+            tried.append(replica)
+            task = asyncio.ensure_future(self._post_to_replica(replica, payload))
+            # 시작 전에 취소되어도 예약한 진행 요청 수를 반납하도록 완료 콜백에서 처리
+            task.add_done_callback(lambda _: self.balancer.release(replica))
+            pending[task] = replica
+            return True
+        
+        if not launch():
+            raise RuntimeError("No search replica available (all circuits open)")
+        
+        try:
+            while pending:
+                hedge_delay = None
+                if settings.SEARCH_HEDGE_ENABLED and not hedged:
+                    hedge_delay = self.balancer.hedge_delay()
+                
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    # p95 시간 안에 응답이 없으면 다른 레플리카로 한 번 더 요청
+                    hedged = True
+                    if launch():
+                        logger.info(f"Hedging search request to {tried[-1].url} after {hedge_delay:.1f}s")
+                    continue
+                
+                for task in done:
+                    replica = pending.pop(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    logger.warning(f"Search replica {replica.url} failed: {str(last_error)}")
+                    if self._is_client_error(last_error):
+                        # 잘못된 요청은 다른 레플리카로 넘겨도 같은 결과
+                        raise last_error
+                
+                # 진행 중인 요청이 없으면 아직 시도하지 않은 레플리카로 넘김
+                if not pending and launch():
+                    logger.info(f"Failing over search request to {tried[-1].url}")
+            
+            raise last_error or RuntimeError("Search request failed")
+        finally:
+            for task in pending:
+                task.cancel()
     
     def craft_issue_query(self, issue_title: str, 
                          issue_body: str) -> str:
@@ -38,4 +208,40 @@ class LLMService:
 {issue_body}
 
 """
-        return query
\ No newline at end of file
+        return query
+    
+    def build_issue_queries(self, issue_title: str, issue_body: str) -> Dict[str, Any]:
+        """이슈 본문을 축약하여 답변 생성용 쿼리와 검색용 쿼리를 각각의 토큰 예산에 맞춰 만듭니다.
+        
+        Returns:
+            {"query": 답변 생성용 쿼리, "search_query": 검색용 쿼리, "token_counts": 축약 전후 토큰 수}
+        """
+        issue_body = issue_body or ""
+        title_tokens = estimate_tokens(issue_title)
+        
+        # 답변 생성용: 코드/로그는 앞뒤 일부를 유지 (제목 토큰을 먼저 뺀 예산)
+        generation = condense(
+            issue_body,
+            settings.GENERATION_QUERY_TOKEN_BUDGET - title_tokens
+        )
+        # 검색용: 제목도 예산에 포함. 제목이 너무 길면 예산의 절반까지만 쓰고,
+        # 남은 예산(제목과 본문 사이 줄바꿈 포함)으로 본문을 줄임
+        search_title = truncate_to_budget(issue_title, settings.SEARCH_QUERY_TOKEN_BUDGET // 2)
+        search_title_tokens = estimate_tokens(search_title)
+        retrieval = condense(
+            issue_body,
+            settings.SEARCH_QUERY_TOKEN_BUDGET - search_title_tokens - 1,
+            block_head=2,
+            block_tail=2
+        )
+        search_query = f"{search_title}\n{retrieval['text']}".strip()
+        
+        return {
+            "query": self.craft_issue_query(issue_title, generation["text"]),
+            "search_query": search_query,
+            "token_counts": {
+                "body_tokens_before": generation["tokens_before"],
+                "generation_tokens_after": generation["tokens_after"] + title_tokens,
+                "retrieval_tokens_after": estimate_tokens(search_query)
+            }
+        }
\ No newline at end of file
@@ -1,5 +1,5 @@
 import asyncio
-from typing import Optional
+from typing import Any, Dict, Optional, Tuple
 
 from utils.logger import logger
 from utils.config import settings
@@ -7,6 +7,7 @@ from models.schemas import CompletedTask
 from services.queue import FileQueue
 from services.github import GitHubService
 from services.llm import LLMService
+from services.dedup import deduplicator
 from datetime import datetime
 
 class TaskProcessor:
@@ -16,6 +17,36 @@ class TaskProcessor:
         self.llm_service = LLMService()
         self.running = False
     
+    async def _check_previous_post(self, task_id: str, repo_name: str, issue_number: int) -> Tuple[Optional[str], bool]:
+        """이전 시도의 댓글 게시 마커를 확인합니다.
+        
+        Returns:
+            (이전에 생성한 댓글 또는 None, 이미 게시되었는지 여부)
+        """
+        marker = await self.queue.get_post_marker(task_id)
+        
+        if not marker or not marker.get("comment"):
+            return None, False
+        
+        if marker.get("state") == "posted":
+            return marker["comment"], True
+        
+        # 게시 시도 중 중단된 경우: 실제로 게시되었는지 이슈 댓글에서 한 번 확인
+        found = await self.github_service.has_tagged_comment(repo_name, issue_number, task_id)
+        if found is None:
+            raise RuntimeError("Could not verify whether the comment was already posted")
+        
+        return marker["comment"], found
+    
+    async def _fail_task(self, task_id: str, error: str, payload: Optional[Dict[str, Any]]):
+        """작업을 실패 처리하고, 재전송이나 수동 풀링으로 다시 추가할 수 있도록 중복 제거 키를 해제합니다."""
+        await self.queue.fail_task(task_id, error, payload)
+        
+        repo_name = (payload or {}).get("repository", {}).get("full_name")
+        issue_number = (payload or {}).get("issue", {}).get("number")
+        if repo_name and isinstance(issue_number, int):
+            await deduplicator.forget_issue(repo_name, issue_number)
+    
     async def process_task(self):
         """큐에서 하나의 작업을 처리합니다."""
         # 작업 가져오기
@@ -36,36 +67,67 @@ class TaskProcessor:
             issue_body = issue.get("body", "")
             issue_user = issue.get("user", {}).get("login", "Anonymous")
             
-            # LLM 쿼리 생성
-            query = self.llm_service.craft_issue_query(
-                issue_title=issue_title,
-                issue_body=issue_body
-            )
-            
-            # LLM API 호출
-            llm_response = await self.llm_service.generate_response(query)
+            # 이전 시도에서 댓글을 게시했는지 확인 (크래시 또는 재시도 대비)
+            comment, already_posted = await self._check_previous_post(task.task_id, repo_name, issue_number)
             
-            if not llm_response:
-                await self.queue.fail_task(
-                    task.task_id, 
-                    "Failed to get response from LLM API",
-                    payload
+            token_counts = None
+            timings = None
+            route = None
+            if comment is None:
+                # LLM 쿼리 생성 (본문 축약 및 검색/생성용 토큰 예산 적용)
+                queries = self.llm_service.build_issue_queries(
+                    issue_title=issue_title,
+                    issue_body=issue_body
                 )
-                return False
-            logger.info(f"llm호출하여 얻은 응답입니다: {llm_response}")
-            # 댓글 추출
-            comment = llm_response.get("summary", "Sorry, I couldn't process your issue at this time.")
-            
-            # GitHub에 댓글 작성
-            success = await self.github_service.post_comment(repo_name, issue_number, comment)
-            
-            if not success:
-                await self.queue.fail_task(
-                    task.task_id, 
-                    "Failed to post comment to GitHub",
-                    payload
+                token_counts = queries["token_counts"]
+                logger.info(f"Token counts for task {task.task_id}: {token_counts}")
+                
+                # LLM API 호출
+                llm_response = await self.llm_service.generate_response(
+                    queries["query"],
+                    search_query=queries["search_query"]
                 )
-                return False
+                
+                if not llm_response:
+                    await self._fail_task(
+                        task.task_id, 
+                        "Failed to get response from LLM API",
+                        payload
+                    )
+                    return False
+                logger.info(f"llm호출하여 얻은 응답입니다: {llm_response}")
+                # 댓글 추출
+                comment = llm_response.get("summary", "Sorry, I couldn't process your issue at this time.")
+                timings = llm_response.get("timings")
+                route = llm_response.get("route")
+                if route:
+                    logger.info(f"Route for task {task.task_id}: {route}")
+            
+            if already_posted:
+                logger.info(f"Comment for task {task.task_id} was already posted to {repo_name}#{issue_number}. Skipping post.")
+            else:
+                # 게시 전에 마커를 먼저 기록 (write-ahead)
+                if not await self.queue.set_post_marker(task.task_id, "posting", repo_name, issue_number, comment):
+                    await self._fail_task(
+                        task.task_id, 
+                        "Failed to write post marker",
+                        payload
+                    )
+                    return False
+                
+                # GitHub에 댓글 작성 (작업 ID 숨김 마커 포함)
+                tagged_comment = self.github_service.tag_comment(comment, task.task_id)
+                success = await self.github_service.post_comment(repo_name, issue_number, tagged_comment)
+                
+                if not success:
+                    await self._fail_task(
+                        task.task_id, 
+                        "Failed to post comment to GitHub",
+                        payload
+                    )
+                    return False
+                
+                await self.queue.set_post_marker(task.task_id, "posted", repo_name, issue_number, comment)
             
             # 작업 완료 처리
             completed_task = CompletedTask(
@@ -76,15 +138,21 @@ class TaskProcessor:
                 issue_title=issue_title,
                 issue_body=issue_body,
                 llm_response=comment,
-                status="success"
+                status="success",
+                token_counts=token_counts,
+                timings=timings,
+                route=route
             )
             
-            await self.queue.complete_task(task.task_id, completed_task)
+            if not await self.queue.complete_task(task.task_id, completed_task):
+                return False
+            
+            await self.queue.clear_post_marker(task.task_id)
             return True
             
         except Exception as e:
             logger.error(f"Error processing task {task.task_id}: {str(e)}")
-            await self.queue.fail_task(
+            await self._fail_task(
                 task.task_id, 
                 str(e),
                 task.payload if task else None
@@ -1,5 +1,6 @@
 import os
 import json
+import asyncio
 import glob
 from datetime import datetime
 import uuid
@@ -15,9 +16,15 @@ class FileQueue:
         os.makedirs(settings.PENDING_DIR, exist_ok=True)
         os.makedirs(settings.COMPLETED_DIR, exist_ok=True)
         os.makedirs(settings.FAILED_DIR, exist_ok=True)
+        os.makedirs(settings.POST_MARKER_DIR, exist_ok=True)
     
-    async def enqueue(self, payload: Dict[str, Any]) -> str:
-        """작업을 큐에 추가합니다."""
+    async def enqueue(self, payload: Dict[str, Any], raw_body: Optional[bytes] = None) -> str:
+        """작업을 큐에 추가합니다.
+        
+        Args:
+            payload: 작업 페이로드
+            raw_body: 이미 JSON으로 직렬화된 페이로드 (웹훅 원본 본문). 주어지면 다시 직렬화하지 않고 그대로 저장합니다.
+        """
         # 작업 ID 생성
         timestamp = int(datetime.now().timestamp() * 1000)
         issue_id = payload.get("issue", {}).get("number", "unknown")
@@ -28,14 +35,27 @@ class FileQueue:
         task_path = os.path.join(settings.PENDING_DIR, task_id)
         
         try:
-            with open(task_path, 'w', encoding='utf-8') as f:
-                json.dump(payload, f, ensure_ascii=False, indent=2)
+            if raw_body is None:
+                raw_body = json.dumps(payload, ensure_ascii=False, indent=2).encode('utf-8')
+            
+            # 디스크 I/O가 이벤트 루프를 막지 않도록 스레드에서 실행
+            await asyncio.to_thread(self._write_durable, task_path, raw_body)
             logger.info(f"Task enqueued: {task_id}")
             return task_id
         except Exception as e:
             logger.error(f"Failed to enqueue task: {str(e)}")
             raise
     
+    @staticmethod
+    def _write_durable(path: str, data: bytes):
+        """fsync 후 atomic rename으로 파일을 기록합니다 (작성 중인 파일이 dequeue되지 않도록 .temp 사용)."""
+        temp_path = f"{path}.temp"
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    
     async def dequeue(self) -> Optional[TaskItem]:
         """큐에서 가장 오래된 작업을 가져옵니다."""
         # 대기 중인 작업 파일 찾기 (생성 시간순으로 정렬)
@@ -249,4 +269,62 @@ class FileQueue:
         if (repo_name, issue_number) in pending_issues:
             return True
             
-        return False
\ No newline at end of file
+        return False
+    
+    def _post_marker_path(self, task_id: str) -> str:
+        return os.path.join(settings.POST_MARKER_DIR, task_id)
+    
+    async def get_post_marker(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """작업의 댓글 게시 마커를 반환합니다. 마커가 없으면 None을 반환합니다."""
+        marker_file = self._post_marker_path(task_id)
+        if not os.path.exists(marker_file):
+            return None
+        
+        try:
+            with open(marker_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Failed to read post marker {task_id}: {str(e)}")
+            return None
+    
+    async def set_post_marker(self, task_id: str, state: str, repo_name: str, issue_number: int, comment: str) -> bool:
+        """댓글 게시 상태 마커를 기록합니다 (write-ahead).
+        
+        Args:
+            task_id: 작업 ID
+            state: "posting" (게시 시도 직전) 또는 "posted" (게시 성공)
+            repo_name: 레포지토리 이름 (형식: owner/repo)
+            issue_number: 이슈 번호
+            comment: 게시할 댓글 내용 (재시도 시 LLM 재호출 없이 재사용)
+        """
+        marker_file = self._post_marker_path(task_id)
+        marker = {
+            "task_id": task_id,
+            "state": state,
+            "repository": repo_name,
+            "issue_number": issue_number,
+            "comment": comment,
+            "updated_at": datetime.now().isoformat()
+        }
+        
+        try:
+            # 크래시 후에도 마커가 남아 있도록 fsync 후 atomic rename
+            temp_file = f"{marker_file}.temp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump(marker, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, marker_file)
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write post marker {task_id}: {str(e)}")
+            return False
+    
+    async def clear_post_marker(self, task_id: str):
+        """완료된 작업의 댓글 게시 마커를 삭제합니다."""
+        marker_file = self._post_marker_path(task_id)
+        try:
+            if os.path.exists(marker_file):
+                os.remove(marker_file)
+        except Exception as e:
+            logger.error(f"Failed to remove post marker {task_id}: {str(e)}")
@@ -0,0 +1,123 @@
+import heapq
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Tuple
+
+from utils.config import settings
+from utils.logger import logger
+
+class PollScheduler:
+    """레포지토리별 다음 풀링 시각을 우선순위 큐로 관리하는 적응형 스케줄러.
+
+    최근에 새 이슈가 올라온 레포지토리는 풀링 간격을 줄이고,
+    조용한 레포지토리는 간격을 늘립니다. 간격은 항상
+    PULLING_MIN_INTERVAL ~ PULLING_MAX_INTERVAL 범위 안에 유지됩니다.
+    """
+
+    def __init__(self, repo_list: List[str]):
+        self.min_interval = settings.PULLING_MIN_INTERVAL
+        self.max_interval = max(settings.PULLING_MAX_INTERVAL, self.min_interval)
+        self.base_interval = self._clamp(settings.PULLING_INTERVAL)
+
+        # (다음 풀링 시각, 레포지토리) 힙
+        self._heap: List[Tuple[float, str]] = []
+        # 레포지토리별 스케줄 상태
+        self._state: Dict[str, Dict[str, Any]] = {}
+
+        now = time.time()
+        for repo_name in repo_list:
+            self._state[repo_name] = {
+                "interval": self.base_interval,
+                "next_poll_at": now,
+                "last_polled_at": None,
+                "last_activity_at": None,
+                "last_new_issues": 0
+            }
+            heapq.heappush(self._heap, (now, repo_name))
+
+    def _clamp(self, interval: float) -> float:
+        return min(self.max_interval, max(self.min_interval, interval))
+
+    def seconds_until_next(self) -> float:
+        """가장 가까운 풀링 시각까지 남은 시간(초)을 반환합니다."""
+        if not self._heap:
+            return float(self.base_interval)
+        return max(0.0, self._heap[0][0] - time.time())
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """풀링 시각이 지난 레포지토리들을 힙에서 꺼내 반환합니다."""
+        now = now if now is not None else time.time()
+        due_repos = []
+
+        while self._heap and self._heap[0][0] <= now:
+            next_poll_at, repo_name = heapq.heappop(self._heap)
+            # 재스케줄되어 더 이상 유효하지 않은 항목은 무시
+            state = self._state.get(repo_name)
+            if not state or state["next_poll_at"] != next_poll_at:
+                continue
+            due_repos.append(repo_name)
+
+        return due_repos
+
+    def record_poll(self, repo_name: str, new_issue_count: int, now: Optional[float] = None) -> float:
+        """풀링 결과를 반영하여 다음 풀링 시각을 계산하고 다시 힙에 넣습니다.
+
+        Args:
+            repo_name: 레포지토리 이름 (형식: owner/repo)
+            new_issue_count: 이번 풀링에서 가져온 새 이슈 수
+            now: 기준 시각 (기본값: 현재 시각)
+
+        Returns:
+            새로 적용된 풀링 간격(초)
+        """
+        now = now if now is not None else time.time()
+        state = self._state.setdefault(repo_name, {
+            "interval": self.base_interval,
+            "last_activity_at": None,
+        })
+
+        if new_issue_count > 0:
+            # 활동이 있으면 간격을 줄여 빠르게 응답
+            interval = state["interval"] * settings.PULLING_SPEEDUP_FACTOR
+            state["last_activity_at"] = now
+        else:
+            # 활동이 없으면 점진적으로 간격을 늘려 API 호출 절약
+            interval = state["interval"] * settings.PULLING_BACKOFF_FACTOR
+
+        interval = self._clamp(interval)
+        state["interval"] = interval
+        state["last_polled_at"] = now
+        state["last_new_issues"] = new_issue_count
+        state["next_poll_at"] = now + interval
+        heapq.heappush(self._heap, (state["next_poll_at"], repo_name))
+
+        logger.info(f"레포지토리 {repo_name}의 다음 풀링 간격: {interval:.0f}초 (새 이슈 {new_issue_count}개)")
+        return interval
+
+    def requeue(self, repo_names: List[str], now: Optional[float] = None):
+        """꺼냈지만 풀링하지 못한 레포지토리를 간격 변경 없이 즉시 풀링 대상으로 되돌립니다."""
+        now = now if now is not None else time.time()
+        for repo_name in repo_names:
+            state = self._state.get(repo_name)
+            if not state:
+                continue
+            state["next_poll_at"] = now
+            heapq.heappush(self._heap, (now, repo_name))
+
+    def get_schedule(self) -> List[Dict[str, Any]]:
+        """레포지토리별 스케줄을 다음 풀링 시각 순으로 반환합니다."""
+        def to_iso(ts: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(ts).isoformat() if ts else None
+
+        schedule = []
+        for repo_name, state in self._state.items():
+            schedule.append({
+                "repo": repo_name,
+                "interval_seconds": round(state["interval"], 1),
+                "next_poll_at": to_iso(state.get("next_poll_at")),
+                "last_polled_at": to_iso(state.get("last_polled_at")),
+                "last_activity_at": to_iso(state.get("last_activity_at")),
+                "last_new_issues": state.get("last_new_issues", 0)
+            })
+
+        return sorted(schedule, key=lambda item: item["next_poll_at"] or "")
@@ -0,0 +1,170 @@
+import time
+import fnmatch
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Mapping
+
+from utils.config import settings
+from utils.logger import logger
+
+# GitHub 인증 토큰의 기본 시간당 요청 한도
+DEFAULT_RATE_LIMIT = 5000
+# 응답 헤더를 받기 전 추정하는 rate limit 창 길이 (초)
+RATE_LIMIT_WINDOW_SECONDS = 3600
+
+class GitHubCredential:
+    """GitHub 인증 토큰 하나와 그 토큰의 rate limit 상태"""
+
+    def __init__(self, name: str, token: str):
+        self.name = name
+        self.token = token
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset_at: Optional[float] = None
+        self.request_count = 0
+        self.last_used_at: Optional[float] = None
+
+    def effective_remaining(self, now: Optional[float] = None) -> int:
+        """현재 사용 가능한 것으로 추정되는 남은 요청 수"""
+        now = now if now is not None else time.time()
+        # 아직 응답을 받지 못했거나 리셋 시각이 지났으면 한도가 가득 찬 것으로 간주
+        if self.remaining is None or (self.reset_at and now >= self.reset_at):
+            return self.limit or DEFAULT_RATE_LIMIT
+        return self.remaining
+
+    def reserve(self, now: Optional[float] = None):
+        """요청 하나만큼 남은 한도를 미리 차감합니다 (응답 헤더로 나중에 보정)."""
+        now = now if now is not None else time.time()
+        if self.remaining is None or (self.reset_at and now >= self.reset_at):
+            # 새 창: 헤더를 받기 전까지 한도가 가득 찬 것으로 보고 창 길이를 추정
+            self.remaining = self.limit or DEFAULT_RATE_LIMIT
+            self.reset_at = now + RATE_LIMIT_WINDOW_SECONDS
+        self.remaining = max(0, self.remaining - 1)
+
+    def masked_token(self) -> str:
+        return f"...{self.token[-4:]}" if len(self.token) > 4 else "****"
+
+class TokenPool:
+    """여러 GitHub 토큰을 관리하며 남은 한도가 가장 많은 토큰을 골라줍니다.
+
+    GITHUB_TOKENS에 "이름=토큰" 또는 토큰을 쉼표로 구분하여 설정하고,
+    GITHUB_REPO_CREDENTIALS에 "owner/repo=이름" 형식(와일드카드 허용)으로
+    레포지토리별로 우선 사용할 토큰을 지정할 수 있습니다.
+    """
+
+    def __init__(self):
+        self.credentials: Dict[str, GitHubCredential] = {}
+        self.repo_affinity: Dict[str, str] = {}
+
+        if settings.GITHUB_TOKEN:
+            self._add_credential("default", settings.GITHUB_TOKEN)
+
+        for idx, entry in enumerate(item.strip() for item in settings.GITHUB_TOKENS.split(',')):
+            if not entry:
+                continue
+            if "=" in entry:
+                name, token = entry.split("=", 1)
+                self._add_credential(name.strip(), token.strip())
+            else:
+                self._add_credential(f"token-{idx + 1}", entry)
+
+        for entry in (item.strip() for item in settings.GITHUB_REPO_CREDENTIALS.split(',')):
+            if not entry or "=" not in entry:
+                continue
+            pattern, name = entry.split("=", 1)
+            if name.strip() not in self.credentials:
+                logger.warning(f"Unknown GitHub credential '{name.strip()}' in GITHUB_REPO_CREDENTIALS. Ignored.")
+                continue
+            self.repo_affinity[pattern.strip()] = name.strip()
+
+        if self.credentials:
+            logger.info(f"GitHub token pool initialized with {len(self.credentials)} credential(s): {', '.join(self.credentials)}")
+
+    def _add_credential(self, name: str, token: str):
+        if not token:
+            return
+        # 같은 토큰이 중복 설정된 경우 하나만 사용
+        if any(cred.token == token for cred in self.credentials.values()):
+            return
+        self.credentials[name] = GitHubCredential(name, token)
+
+    def __len__(self) -> int:
+        return len(self.credentials)
+
+    def _affinity_credential(self, repo_name: Optional[str]) -> Optional[GitHubCredential]:
+        if not repo_name:
+            return None
+        for pattern, name in self.repo_affinity.items():
+            if fnmatch.fnmatch(repo_name, pattern):
+                return self.credentials.get(name)
+        return None
+
+    def select(self, repo_name: Optional[str] = None) -> Optional[GitHubCredential]:
+        """요청에 사용할 토큰을 선택합니다.
+
+        레포지토리에 지정된 토큰이 있고 한도가 남아 있으면 그 토큰을,
+        그렇지 않으면 남은 한도가 가장 많은 토큰을 반환합니다.
+        고른 토큰의 남은 한도는 바로 차감하므로 동시 요청은 다른 토큰으로 분산됩니다.
+        """
+        if not self.credentials:
+            return None
+
+        now = time.time()
+        preferred = self._affinity_credential(repo_name)
+        if preferred and preferred.effective_remaining(now) > 0:
+            credential = preferred
+        else:
+            credential = max(self.credentials.values(), key=lambda cred: cred.effective_remaining(now))
+
+        credential.reserve(now)
+        credential.request_count += 1
+        credential.last_used_at = now
+        return credential
+
+    def update(self, credential: Optional[GitHubCredential], headers: Mapping[str, str]):
+        """GitHub 응답 헤더의 rate limit 정보로 토큰 상태를 보정합니다.
+
+        같은 창의 응답이면 아직 헤더에 반영되지 않은 동시 요청의 차감을 유지하도록
+        더 작은 값을, 새 창이면 헤더 값을 사용합니다.
+        """
+        if not credential:
+            return
+        try:
+            limit = int(headers["x-ratelimit-limit"]) if "x-ratelimit-limit" in headers else None
+            remaining = int(headers["x-ratelimit-remaining"]) if "x-ratelimit-remaining" in headers else None
+            reset_at = float(headers["x-ratelimit-reset"]) if "x-ratelimit-reset" in headers else None
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Could not parse rate limit headers for credential {credential.name}: {str(e)}")
+            return
+
+        if limit is not None:
+            credential.limit = limit
+        if remaining is not None:
+            same_window = reset_at is not None and reset_at == credential.reset_at
+            if same_window and credential.remaining is not None:
+                credential.remaining = min(credential.remaining, remaining)
+            else:
+                credential.remaining = remaining
+        if reset_at is not None:
+            credential.reset_at = reset_at
+
+        if credential.remaining == 0:
+            logger.warning(f"GitHub credential {credential.name} exhausted until {datetime.fromtimestamp(credential.reset_at or time.time()).isoformat()}")
+
+    def get_metrics(self) -> List[Dict[str, Any]]:
+        """토큰별 한도 사용 현황을 반환합니다."""
+        now = time.time()
+        metrics = []
+        for credential in self.credentials.values():
+            metrics.append({
+                "name": credential.name,
+                "token": credential.masked_token(),
+                "limit": credential.limit,
+                "remaining": credential.remaining,
+                "effective_remaining": credential.effective_remaining(now),
+                "reset_at": datetime.fromtimestamp(credential.reset_at).isoformat() if credential.reset_at else None,
+                "request_count": credential.request_count,
+                "repos": [pattern for pattern, name in self.repo_affinity.items() if name == credential.name]
+            })
+        return metrics
+
+token_pool = TokenPool()
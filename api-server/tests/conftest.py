@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# 테스트가 작업 디렉토리의 file-queue를 건드리지 않도록 설정을 불러오기 전에 임시 경로 지정
+_queue_dir = tempfile.mkdtemp(prefix="api-server-test-")
+os.environ.setdefault("TASKS_DIR", _queue_dir)
+os.environ.setdefault("LLM_CACHE_DIR", os.path.join(_queue_dir, "llm-cache"))
+os.environ.setdefault("DEDUP_STORE_FILE", os.path.join(_queue_dir, "dedup-keys.log"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
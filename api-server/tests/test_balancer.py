@@ -0,0 +1,58 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from services.balancer import ReplicaBalancer
+from services.llm import LLMService
+from utils.config import settings
+
+def test_half_open_replica_allows_single_trial():
+    balancer = ReplicaBalancer(["http://replica-a/search"])
+    replica = balancer.replicas[0]
+    replica.state = "open"
+    replica.opened_at = time.time() - settings.SEARCH_CIRCUIT_RESET_SECONDS - 1
+
+    # 같은 순간의 두 호출자 중 하나만 시험 요청을 보냄
+    assert balancer.pick() is replica
+    assert balancer.pick() is None
+    assert replica.state == "half_open"
+
+    balancer.release(replica)
+    assert replica.outstanding == 0
+
+def make_service(monkeypatch, handler):
+    transport = httpx.MockTransport(handler)
+    real_client = httpx.AsyncClient
+    monkeypatch.setattr(httpx, "AsyncClient", lambda *args, **kwargs: real_client(transport=transport))
+    monkeypatch.setattr(settings, "SEARCH_HEDGE_ENABLED", False)
+    service = LLMService()
+    service.balancer = ReplicaBalancer(["http://replica-a/search", "http://replica-b/search"])
+    return service
+
+def test_client_error_does_not_open_circuit_or_fail_over(monkeypatch):
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.host)
+        return httpx.Response(422, json={"detail": "invalid"})
+
+    service = make_service(monkeypatch, handler)
+    for _ in range(settings.SEARCH_CIRCUIT_FAILURE_THRESHOLD + 1):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(service._post_to_replicas({"query": "q"}))
+
+    # 4xx는 다른 레플리카로 넘기지 않고, 서킷도 열지 않음
+    assert len(requests) == settings.SEARCH_CIRCUIT_FAILURE_THRESHOLD + 1
+    assert all(replica.state == "closed" for replica in service.balancer.replicas)
+    assert all(replica.outstanding == 0 for replica in service.balancer.replicas)
+
+def test_server_errors_open_circuit(monkeypatch):
+    service = make_service(monkeypatch, lambda request: httpx.Response(503))
+    for _ in range(settings.SEARCH_CIRCUIT_FAILURE_THRESHOLD):
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(service._post_to_replicas({"query": "q"}))
+
+    # 5xx는 장애로 집계되어 두 레플리카 모두 서킷이 열림 (매번 다른 레플리카로 넘김)
+    assert all(replica.state == "open" for replica in service.balancer.replicas)
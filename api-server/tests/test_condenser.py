@@ -0,0 +1,41 @@
+from services.condenser import condense, estimate_tokens, truncate_to_budget
+from services.llm import LLMService
+from utils.config import settings
+
+def test_adjacent_fences_stay_balanced():
+    body = "\n".join([
+        "Empty block:",
+        "```",
+        "```",
+        "```python",
+        "print('hello')",
+        "```",
+        "The error only happens after upgrading to the new release.",
+    ])
+
+    text = condense(body, 1000)["text"]
+
+    assert text.count("```") == 4
+    assert "repeated" not in text
+    assert text.endswith("The error only happens after upgrading to the new release.")
+
+def test_repeated_lines_are_still_collapsed_outside_fences():
+    body = "\n".join(["retrying connection"] * 5 + ["```", "x = 1", "x = 1", "```"])
+
+    text = condense(body, 1000)["text"]
+
+    assert text.count("retrying connection") == 1
+    assert "(previous line repeated 4 more times)" in text
+    assert text.count("```") == 2
+
+def test_truncation_marker_fits_in_budget():
+    text = truncate_to_budget("word " * 2000, 100)
+
+    assert estimate_tokens(text) <= 100
+    assert "truncated" in text
+
+def test_search_query_includes_title_in_budget():
+    queries = LLMService().build_issue_queries("Cluster provisioning fails " * 60, "body text " * 2000)
+
+    assert estimate_tokens(queries["search_query"]) <= settings.SEARCH_QUERY_TOKEN_BUDGET
+    assert queries["token_counts"]["retrieval_tokens_after"] <= settings.SEARCH_QUERY_TOKEN_BUDGET
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pytest
+
+from services import processor
+from services.dedup import Deduplicator
+from utils.config import settings
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "DEDUP_STORE_FILE", str(tmp_path / "dedup-keys.log"))
+
+def keys_for(delivery_id, repo_name="octo/repo", issue_number=7):
+    return [Deduplicator.delivery_key(delivery_id), Deduplicator.issue_key(repo_name, issue_number)]
+
+def test_committed_keys_survive_restart(store):
+    deduplicator = Deduplicator()
+    assert deduplicator.reserve(keys_for("d1")) is None
+    asyncio.run(deduplicator.commit(keys_for("d1")))
+
+    restarted = Deduplicator()
+    assert restarted.reserve(keys_for("d1")) == "delivery:d1"
+    assert restarted.reserve(keys_for("d2")) == "issue:octo/repo#7"
+
+def test_failed_issue_can_be_enqueued_again(store):
+    deduplicator = Deduplicator()
+    deduplicator.reserve(keys_for("d1"))
+    asyncio.run(deduplicator.commit(keys_for("d1")))
+    other = keys_for("d9", issue_number=8)
+    deduplicator.reserve(other)
+    asyncio.run(deduplicator.commit(other))
+
+    asyncio.run(deduplicator.forget_issue("octo/repo", 7))
+
+    # 같은 전달 ID의 재전송도, 다른 경로(수동 풀링)의 추가도 받을 수 있음
+    assert deduplicator.reserve(keys_for("d1")) is None
+    deduplicator.release(keys_for("d1"))
+    assert deduplicator.reserve([Deduplicator.issue_key("octo/repo", 7)]) is None
+    # 다른 이슈의 키는 그대로
+    assert deduplicator.reserve(other) == "delivery:d9"
+
+    # 해제 기록도 재시작 후 유지됨
+    restarted = Deduplicator()
+    assert restarted.reserve(keys_for("d1")) is None
+    assert restarted.reserve(other) == "delivery:d9"
+
+def test_log_write_runs_off_the_event_loop(store, monkeypatch):
+    deduplicator = Deduplicator()
+    threads = []
+    append_lines = deduplicator._append_lines
+
+    def recording_append(lines):
+        threads.append(threading.current_thread())
+        append_lines(lines)
+
+    monkeypatch.setattr(deduplicator, "_append_lines", recording_append)
+    deduplicator.reserve(keys_for("d1"))
+    asyncio.run(deduplicator.commit(keys_for("d1")))
+
+    assert threads and threads[0] is not threading.main_thread()
+
+def test_processor_failure_releases_issue_keys(store, monkeypatch):
+    deduplicator = Deduplicator()
+    monkeypatch.setattr(processor, "deduplicator", deduplicator)
+    deduplicator.reserve(keys_for("d1"))
+    asyncio.run(deduplicator.commit(keys_for("d1")))
+
+    task_processor = processor.TaskProcessor()
+    failed = []
+
+    async def fail_task(task_id, error, payload=None):
+        failed.append(task_id)
+        return True
+
+    monkeypatch.setattr(task_processor.queue, "fail_task", fail_task)
+    payload = {"issue": {"number": 7}, "repository": {"full_name": "octo/repo"}}
+    asyncio.run(task_processor._fail_task("task-1", "LLM error", payload))
+
+    assert failed == ["task-1"]
+    assert deduplicator.reserve(keys_for("d1")) is None
@@ -0,0 +1,60 @@
+import asyncio
+
+from services.cache import ResponseCache
+from services.llm import LLMService
+from utils.config import settings
+
+def make_service(tmp_path, monkeypatch, versions):
+    """/version 응답을 versions 순서대로 돌려주고 검색 서버 호출 횟수를 세는 LLMService"""
+    monkeypatch.setattr(settings, "LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "KNOWLEDGE_BASE_VERSION", "")
+    service = LLMService()
+    service.cache = ResponseCache()
+    service.search_calls = 0
+
+    async def fetch_kb_version():
+        return versions.pop(0)
+
+    async def call_search_api(query, search_query=None):
+        service.search_calls += 1
+        return {"query": query, "summary": f"answer {service.search_calls}", "kb_version": service.current_version}
+
+    service._fetch_kb_version = fetch_kb_version
+    service._call_search_api = call_search_api
+    return service
+
+def test_cached_response_is_not_served_after_kb_version_changes(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch, ["kb:v1", "kb:v1", "kb:v2"])
+
+    async def scenario():
+        service.current_version = "kb:v1"
+        first = await service.generate_response("How do I reset my password?")
+
+        # 같은 버전이면 캐시에서 응답
+        service._version_checked_at = 0.0
+        second = await service.generate_response("How do I reset my password?")
+
+        # 재적재로 버전이 바뀌면 TTL이 남아 있어도 캐시 적중으로 이전 답변을 반환하지 않음
+        service.current_version = "kb:v2"
+        service._version_checked_at = 0.0
+        third = await service.generate_response("How do I reset my password?")
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+
+    assert second["summary"] == first["summary"] == "answer 1"
+    assert third["summary"] == "answer 2"
+    assert service.search_calls == 2
+    assert service.cache.kb_version == "kb:v2"
+
+def test_version_check_is_throttled(tmp_path, monkeypatch):
+    service = make_service(tmp_path, monkeypatch, ["kb:v1"])
+    service.current_version = "kb:v1"
+
+    async def scenario():
+        for _ in range(3):
+            await service.generate_response("How do I reset my password?")
+
+    # 확인 간격 안에서는 /version을 한 번만 호출 (두 번 호출되면 빈 목록에서 IndexError)
+    asyncio.run(scenario())
+    assert service.search_calls == 1
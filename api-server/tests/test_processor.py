@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+
+from models.schemas import TaskItem
+from services.processor import TaskProcessor
+
+TASK_ID = "task-1"
+PAYLOAD = {
+    "issue": {"number": 7, "title": "Login fails", "body": "500 on /login", "user": {"login": "alice"}},
+    "repository": {"full_name": "octo/repo"}
+}
+
+class FakeQueue:
+    def __init__(self, marker=None):
+        self.task = TaskItem(task_id=TASK_ID, payload=PAYLOAD)
+        self.marker = marker
+        self.marker_states = []
+        self.completed = []
+        self.failed = []
+
+    async def dequeue(self):
+        task, self.task = self.task, None
+        return task
+
+    async def get_post_marker(self, task_id):
+        return self.marker
+
+    async def set_post_marker(self, task_id, state, repo_name, issue_number, comment):
+        self.marker_states.append(state)
+        self.marker = {"state": state, "comment": comment}
+        return True
+
+    async def clear_post_marker(self, task_id):
+        self.marker = None
+
+    async def complete_task(self, task_id, task_data):
+        self.completed.append(task_data)
+        return True
+
+    async def fail_task(self, task_id, error, payload=None):
+        self.failed.append(error)
+        return True
+
+class FakeGitHub:
+    def __init__(self, tagged):
+        self.tagged = tagged
+        self.posted = []
+
+    def tag_comment(self, comment, task_id):
+        return f"{comment}\n<!-- {task_id} -->"
+
+    async def has_tagged_comment(self, repo_name, issue_number, task_id):
+        return self.tagged
+
+    async def post_comment(self, repo_name, issue_number, comment):
+        self.posted.append(comment)
+        return True
+
+class UnusedLLM:
+    def build_issue_queries(self, **kwargs):
+        raise AssertionError("LLM should not be called when a previous comment exists")
+
+    async def generate_response(self, *args, **kwargs):
+        raise AssertionError("LLM should not be called when a previous comment exists")
+
+def make_processor(marker, tagged=None):
+    processor = TaskProcessor()
+    processor.queue = FakeQueue(marker)
+    processor.github_service = FakeGitHub(tagged)
+    processor.llm_service = UnusedLLM()
+    return processor
+
+def test_posting_marker_with_tagged_comment_skips_repost():
+    processor = make_processor({"state": "posting", "comment": "answer"}, tagged=True)
+
+    assert asyncio.run(processor.process_task()) is True
+    assert processor.github_service.posted == []
+    assert processor.queue.marker_states == []
+    assert processor.queue.completed[0].llm_response == "answer"
+    assert processor.queue.marker is None
+
+def test_posting_marker_without_tagged_comment_reposts_stored_comment():
+    processor = make_processor({"state": "posting", "comment": "answer"}, tagged=False)
+
+    assert asyncio.run(processor.process_task()) is True
+    assert processor.github_service.posted == [f"answer\n<!-- {TASK_ID} -->"]
+    assert processor.queue.marker_states == ["posting", "posted"]
+    assert processor.queue.completed[0].llm_response == "answer"
+
+def test_posted_marker_completes_without_llm_or_github():
+    processor = make_processor({"state": "posted", "comment": "answer"})
+    # 게시 완료 마커가 있으면 이슈 댓글도 조회하지 않음
+    processor.github_service.has_tagged_comment = None
+
+    assert asyncio.run(processor.process_task()) is True
+    assert processor.github_service.posted == []
+    assert processor.queue.completed[0].llm_response == "answer"
+
+@pytest.mark.parametrize("marker", [None, {"state": "posting"}])
+def test_missing_marker_or_comment_means_not_posted(marker):
+    processor = make_processor(marker)
+
+    assert asyncio.run(processor._check_previous_post(TASK_ID, "octo/repo", 7)) == (None, False)
+
+def test_unverifiable_posting_marker_fails_task():
+    processor = make_processor({"state": "posting", "comment": "answer"}, tagged=None)
+
+    assert asyncio.run(processor.process_task()) is False
+    assert processor.github_service.posted == []
+    assert processor.queue.completed == []
+    assert processor.queue.failed == ["Could not verify whether the comment was already posted"]
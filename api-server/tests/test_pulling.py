@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+
+from apis import pulling
+
+ISSUES = [{"id": 101, "number": 1, "title": "first"}, {"id": 102, "number": 2, "title": "second"}]
+
+@pytest.fixture
+def pulled(monkeypatch):
+    """이슈 조회와 큐 추가를 가짜로 바꾸고, 큐에 추가된 이슈 번호와 조회 기준 ID를 기록 (중복 제거 키가 남으므로 테스트마다 다른 레포지토리 사용)"""
+    state = {"leader": [], "since_ids": [], "enqueued": []}
+
+    async def get_issues(repo_name, since_id=0, **kwargs):
+        state["since_ids"].append(since_id)
+        return [issue for issue in ISSUES if issue["id"] > since_id]
+
+    async def acquire():
+        return state["leader"].pop(0)
+
+    async def is_issue_already_processed(repo_name, issue_number):
+        return False
+
+    async def enqueue(payload):
+        state["enqueued"].append(payload["issue"]["number"])
+
+    monkeypatch.setattr(pulling.github_service, "get_issues", get_issues)
+    monkeypatch.setattr(pulling.leader_lease, "acquire", acquire)
+    monkeypatch.setattr(pulling.queue, "is_issue_already_processed", is_issue_already_processed)
+    monkeypatch.setattr(pulling.queue, "enqueue", enqueue)
+    monkeypatch.setattr(pulling, "last_processed_issue_ids", {})
+    return state
+
+def test_lease_lost_between_fetch_and_enqueue_keeps_last_id(pulled):
+    repo = "octo/lease-lost"
+    # 조회 후 큐에 넣기 전에 리더를 잃음
+    pulled["leader"] = [False]
+    assert asyncio.run(pulling.poll_repo(repo)) is None
+    assert pulled["enqueued"] == []
+    assert repo not in pulling.last_processed_issue_ids
+
+    # 다시 리더가 되면 같은 기준 ID로 조회해 놓친 이슈를 큐에 추가
+    pulled["leader"] = [True]
+    assert asyncio.run(pulling.poll_repo(repo)) == (2, 2, 0)
+    assert pulled["since_ids"] == [0, 0]
+    assert pulled["enqueued"] == [1, 2]
+    assert pulling.last_processed_issue_ids[repo] == 102
+
+def test_last_id_advances_only_after_enqueue(pulled):
+    repo = "octo/lease-kept"
+    pulled["leader"] = [True, True]
+    asyncio.run(pulling.poll_repo(repo))
+    asyncio.run(pulling.poll_repo(repo))
+
+    assert pulled["since_ids"] == [0, 102]
+    assert pulled["enqueued"] == [1, 2]
@@ -0,0 +1,63 @@
+import time
+
+import pytest
+
+from services.scheduler import PollScheduler
+from utils.config import settings
+
+@pytest.fixture(autouse=True)
+def intervals(monkeypatch):
+    monkeypatch.setattr(settings, "PULLING_INTERVAL", 60)
+    monkeypatch.setattr(settings, "PULLING_MIN_INTERVAL", 30)
+    monkeypatch.setattr(settings, "PULLING_MAX_INTERVAL", 240)
+    monkeypatch.setattr(settings, "PULLING_SPEEDUP_FACTOR", 0.5)
+    monkeypatch.setattr(settings, "PULLING_BACKOFF_FACTOR", 2.0)
+
+def test_base_interval_is_clamped_to_bounds(monkeypatch):
+    monkeypatch.setattr(settings, "PULLING_INTERVAL", 10)
+    assert PollScheduler(["octo/repo"]).base_interval == 30
+
+    monkeypatch.setattr(settings, "PULLING_INTERVAL", 1000)
+    assert PollScheduler(["octo/repo"]).base_interval == 240
+
+def test_empty_polls_back_off_up_to_max():
+    scheduler = PollScheduler(["octo/repo"])
+
+    intervals = [scheduler.record_poll("octo/repo", 0, now=1000.0) for _ in range(4)]
+
+    assert intervals == [120, 240, 240, 240]
+
+def test_new_issues_speed_up_down_to_min():
+    scheduler = PollScheduler(["octo/repo"])
+
+    intervals = [scheduler.record_poll("octo/repo", 3, now=1000.0) for _ in range(3)]
+
+    assert intervals == [30, 30, 30]
+    assert scheduler._state["octo/repo"]["last_activity_at"] == 1000.0
+
+def test_pop_due_returns_only_due_repos_and_skips_stale_entries():
+    scheduler = PollScheduler(["octo/a", "octo/b"])
+    assert sorted(scheduler.pop_due()) == ["octo/a", "octo/b"]
+
+    now = time.time()
+    scheduler.record_poll("octo/a", 0, now=now)  # 120초 뒤
+    scheduler.record_poll("octo/b", 5, now=now)  # 30초 뒤
+    # 이전 예약 시각의 항목은 재스케줄 후 무효
+    scheduler.record_poll("octo/b", 5, now=now + 10)  # 40초 뒤
+
+    assert scheduler.pop_due(now=now + 35) == []
+    assert scheduler.pop_due(now=now + 40) == ["octo/b"]
+    assert scheduler.pop_due(now=now + 120) == ["octo/a"]
+    assert scheduler.pop_due(now=now + 9999) == []
+
+def test_requeue_keeps_repo_due_without_changing_interval():
+    scheduler = PollScheduler(["octo/repo"])
+    scheduler.record_poll("octo/repo", 0, now=1000.0)
+    assert scheduler.pop_due(now=1120.0) == ["octo/repo"]
+
+    # 풀링하지 못하고 되돌린 레포지토리는 다음 확인 때 다시 꺼내짐
+    scheduler.requeue(["octo/repo", "octo/unknown"], now=1130.0)
+
+    assert scheduler.pop_due(now=1130.0) == ["octo/repo"]
+    assert scheduler._state["octo/repo"]["interval"] == 120
+    assert "octo/unknown" not in scheduler._state
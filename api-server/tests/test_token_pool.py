@@ -0,0 +1,81 @@
+import time
+
+import pytest
+
+from services.token_pool import TokenPool, DEFAULT_RATE_LIMIT
+from utils.config import settings
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(settings, "GITHUB_TOKEN", "")
+    monkeypatch.setattr(settings, "GITHUB_TOKENS", "a=tok-a,b=tok-b")
+    monkeypatch.setattr(settings, "GITHUB_REPO_CREDENTIALS", "octo/*=b")
+    return TokenPool()
+
+def headers(remaining, reset_at, limit=5000):
+    return {
+        "x-ratelimit-limit": str(limit),
+        "x-ratelimit-remaining": str(remaining),
+        "x-ratelimit-reset": str(reset_at)
+    }
+
+def test_concurrent_selections_spread_across_tokens(pool):
+    # 응답 헤더를 받기 전이라도 고른 토큰의 한도를 차감하므로 번갈아 선택됨
+    names = [pool.select().name for _ in range(4)]
+
+    assert names == ["a", "b", "a", "b"]
+    assert pool.credentials["a"].remaining == DEFAULT_RATE_LIMIT - 2
+
+def test_selection_prefers_token_with_most_remaining(pool):
+    reset_at = time.time() + 600
+    pool.update(pool.credentials["a"], headers(10, reset_at))
+    pool.update(pool.credentials["b"], headers(3, reset_at))
+
+    assert pool.select().name == "a"
+    assert pool.credentials["a"].remaining == 9
+
+def test_repo_affinity_until_exhausted(pool):
+    reset_at = time.time() + 600
+    pool.update(pool.credentials["b"], headers(1, reset_at))
+
+    assert pool.select("octo/repo").name == "b"
+    # 지정 토큰의 한도가 바닥나면 다른 토큰으로 넘김
+    assert pool.select("octo/repo").name == "a"
+    assert pool.select("other/repo").name == "a"
+
+def test_exhausted_token_recovers_after_reset(pool):
+    pool.update(pool.credentials["a"], headers(0, time.time() + 600))
+    pool.update(pool.credentials["b"], headers(0, time.time() - 1))
+
+    assert pool.credentials["b"].effective_remaining() == 5000
+    assert pool.select().name == "b"
+    # 새 창의 한도에서 차감
+    assert pool.credentials["b"].remaining == 4999
+
+def test_update_parses_headers(pool):
+    credential = pool.credentials["a"]
+    pool.update(credential, headers(4321, 1700000000, limit=15000))
+
+    assert (credential.limit, credential.remaining, credential.reset_at) == (15000, 4321, 1700000000.0)
+
+def test_invalid_headers_leave_state_unchanged(pool):
+    credential = pool.credentials["a"]
+    pool.update(credential, headers(100, 1700000000))
+    pool.update(credential, {"x-ratelimit-limit": "5000", "x-ratelimit-remaining": "many"})
+
+    assert (credential.limit, credential.remaining, credential.reset_at) == (5000, 100, 1700000000.0)
+
+def test_update_keeps_local_reservations_in_same_window(pool):
+    credential = pool.credentials["a"]
+    reset_at = time.time() + 600
+    pool.update(credential, headers(100, reset_at))
+    for _ in range(3):
+        credential.reserve()
+
+    # 먼저 끝난 요청의 헤더는 아직 다른 동시 요청을 반영하지 않음
+    pool.update(credential, headers(99, reset_at))
+    assert credential.remaining == 97
+
+    # 새 창의 헤더는 그대로 사용
+    pool.update(credential, headers(4999, reset_at + 3600))
+    assert credential.remaining == 4999
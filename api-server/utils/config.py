@@ -3,16 +3,56 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     # LLM 검색 API 설정
     SEARCH_API_URL: str = "http://localhost:8000/search"
+    # 여러 LangGraph 레플리카 URL (쉼표로 구분, 비워두면 SEARCH_API_URL만 사용)
+    SEARCH_API_URLS: str = ""
+    SEARCH_API_TIMEOUT: float = 60.0
+    # 레플리카별 서킷 브레이커 설정
+    SEARCH_CIRCUIT_FAILURE_THRESHOLD: int = 3
+    SEARCH_CIRCUIT_RESET_SECONDS: int = 30
+    # 헤징 요청 설정 (p95 지연 시간이 지나도 응답이 없으면 다른 레플리카로 한 번 더 요청)
+    SEARCH_HEDGE_ENABLED: bool = False
+    SEARCH_HEDGE_MIN_DELAY: float = 5.0
+    
+    # 이슈 본문 축약 및 토큰 예산 설정
+    CONDENSE_ENABLED: bool = True
+    # 검색(임베딩) 쿼리 토큰 예산
+    SEARCH_QUERY_TOKEN_BUDGET: int = 256
+    # 답변 생성에 전달하는 이슈 본문 토큰 예산
+    GENERATION_QUERY_TOKEN_BUDGET: int = 2048
+    
+    # LLM 응답 캐시 설정
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_DIR: str = "file-queue/llm-cache"
+    LLM_CACHE_MAX_ENTRIES: int = 500
+    LLM_CACHE_MAX_DISK_ENTRIES: int = 5000
+    LLM_CACHE_TTL_SECONDS: int = 86400
+    # 지식 베이스(Milvus 컬렉션) 버전. 값이 바뀌면 캐시가 무효화됩니다.
+    KNOWLEDGE_BASE_VERSION: str = ""
+    # 캐시 적중 응답을 반환하기 전에 검색 서버의 지식 베이스 버전(/version)을 확인하는 최소 간격 (초, 0이면 확인 안 함)
+    LLM_CACHE_VERSION_CHECK_SECONDS: float = 30.0
+    LLM_CACHE_VERSION_CHECK_TIMEOUT: float = 2.0
     
     # GitHub API 설정
     GITHUB_API_URL: str = "https://api.github.com"
     GITHUB_TOKEN: str = ""
+    # 추가 토큰 풀 ("이름=토큰" 또는 토큰, 쉼표로 구분)
+    GITHUB_TOKENS: str = ""
+    # 레포지토리별 우선 사용 토큰 ("owner/repo=이름", 와일드카드 허용, 쉼표로 구분)
+    GITHUB_REPO_CREDENTIALS: str = ""
     
     # 작업 폴더 설정
     TASKS_DIR: str = "file-queue"
     PENDING_DIR: str = "file-queue/waiting-list"
     COMPLETED_DIR: str = "file-queue/completed"
     FAILED_DIR: str = "file-queue/failed"
+    POST_MARKER_DIR: str = "file-queue/post-markers"
+    
+    # 웹훅/풀링 중복 제거 설정
+    DEDUP_STORE_FILE: str = "file-queue/dedup-keys.log"
+    DEDUP_MAX_KEYS: int = 10000
+    
+    # GitHub 웹훅 시크릿 (설정하면 X-Hub-Signature-256 서명을 검증)
+    GITHUB_WEBHOOK_SECRET: str = ""
     
     # 작업 확인 주기 (초)
     QUEUE_WORKING_INTERVAL: int = 30
@@ -21,6 +61,15 @@ class Settings(BaseSettings):
     PULLING_REPO_LIST: str = ""
     PULLING_INTERVAL: int = 300
     
+    # 적응형 풀링 간격 설정 (초)
+    PULLING_MIN_INTERVAL: int = 60
+    PULLING_MAX_INTERVAL: int = 1800
+    PULLING_SPEEDUP_FACTOR: float = 0.5
+    PULLING_BACKOFF_FACTOR: float = 1.5
+    
+    # 풀러 리더 선출 lease 유지 시간 (초)
+    PULLING_LEADER_LEASE_SECONDS: int = 90
+    
     # 시스템 모드 설정
     # 가능한 값: PUSH, PULL, DUAL
     SYSTEM_MODE: str = "PUSH"
@@ -0,0 +1,132 @@
+import os
+import re
+from typing import List, Dict, Any, TypedDict, Annotated, Optional
+import operator
+from dotenv import load_dotenv
+from agents.search_agent import SearchAgent, EMBEDDING_DIM
+from agents.router_agent import ROUTE_PRO, ROUTE_SKIP_REPLY
+from agents.summary_agent import is_no_relevant_content, NON_WORD_PATTERN
+from utils.answer_cache import AnswerCache
+from utils.logger import setup_logger
+
+# 로거 설정
+logger = setup_logger("answer_cache_agent")
+
+# .env 파일 로드
+load_dotenv()
+
+# 환경 변수 설정
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+# 이전 질문과의 쿼리 임베딩 코사인 유사도가 이 값 이상이면 캐시 적중
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_CAPACITY = int(os.getenv("ANSWER_CACHE_CAPACITY", "5000"))
+# 적중 시 동작: return(이전 답변 그대로 반환) 또는 hint(검색 없이 이전 답변을 참고해 빠른 모델로 답변)
+ANSWER_CACHE_MODE = os.getenv("ANSWER_CACHE_MODE", "hint").lower()
+# 첫 줄이 이 패턴과 맞는 답변("모르겠습니다", "찾을 수 없습니다" 등)은 저장하지 않음
+ANSWER_CACHE_EXCLUDE_PATTERN = re.compile(os.getenv(
+    "ANSWER_CACHE_EXCLUDE_PATTERN",
+    r"모르겠|모릅니다|알 수 없|찾을 수 없|찾지 못|don't know|do not know|couldn't find|could not find|no relevant"
+), re.IGNORECASE)
+
+# 적중 시 라우팅 결과
+ROUTE_CACHE = "cache"
+ROUTE_CACHE_HINT = "cache_hint"
+
+# AgentState 타입 정의 - 그래프에서 사용
+class AgentState(TypedDict):
+    query: str
+    search_query: str
+    search_results: Annotated[List[Dict[str, Any]], operator.add]
+    branch_results: Annotated[List[List[Dict[str, Any]]], operator.add]
+    route: str
+    cached_answer: Optional[Dict[str, Any]]
+    summary: str
+
+def answer_scope(variant: str, route: Optional[str]) -> str:
+    """캐시 항목의 scope. 변형마다 모델과 검색 옵션이 다르고 경로마다 모델 등급이 다르므로 둘 다 포함합니다."""
+    return f"{variant}:{route or 'default'}"
+
+def is_cacheable_answer(answer: Optional[str]) -> bool:
+    """다른 질문에 재사용해도 되는 답변인지 확인합니다 (빈 답변, 관련 없음, 정해진 skip 답변, 모른다는 답변 제외)."""
+    if not answer or not answer.strip():
+        return False
+    if is_no_relevant_content(answer):
+        return False
+    if NON_WORD_PATTERN.sub("", answer) == NON_WORD_PATTERN.sub("", ROUTE_SKIP_REPLY):
+        return False
+    first_line = answer.strip().splitlines()[0]
+    return ANSWER_CACHE_EXCLUDE_PATTERN.search(first_line) is None
+
+class AnswerCacheAgent:
+    """이전에 답변한 비슷한 질문을 찾아 검색과 답변 생성을 생략하는 에이전트"""
+
+    def __init__(self, search_agent: SearchAgent):
+        self.search_agent = search_agent
+        self.cache = AnswerCache(
+            dim=EMBEDDING_DIM,
+            capacity=ANSWER_CACHE_CAPACITY,
+            threshold=ANSWER_CACHE_THRESHOLD
+        )
+        self.mode = ANSWER_CACHE_MODE
+        logger.info(f"AnswerCacheAgent initialized (mode: {self.mode}, threshold: {ANSWER_CACHE_THRESHOLD})")
+
+    @staticmethod
+    def lookup_scope(variant: str, routing: bool) -> str:
+        """조회할 scope. 검색 전에는 라우팅 결과를 알 수 없으므로 변형의 기본 모델(pro) 답변만 재사용합니다."""
+        return answer_scope(variant, ROUTE_PRO if routing else None)
+
+    async def lookup(self, search_query: str, variant: str, routing: bool) -> Optional[Dict[str, Any]]:
+        """현재 지식 베이스 버전과 같은 변형으로 만든 답변 중 search_query와 가장 비슷한 항목을 찾습니다."""
+        # 쿼리 임베딩은 임베딩 캐시에 남으므로 이어지는 검색에서 다시 호출하지 않음
+        vector = await self.search_agent.embed_query(search_query)
+        cached = self.cache.get(vector, self.search_agent.kb_version, self.lookup_scope(variant, routing))
+        if cached is not None:
+            logger.info(f"Answer cache hit (similarity: {cached['similarity']:.4f}, cached query: {cached['query']})")
+        return cached
+
+    async def store(self, search_query: str, answer: str, search_results: List[Any],
+                    variant: str, route: Optional[str]):
+        """완료된 답변을 쿼리 임베딩, 출처 문서, 지식 베이스 버전, scope와 함께 저장합니다.
+
+        조회되지 않는 경로(skip, fast)의 답변과 재사용하면 안 되는 답변은 저장하지 않습니다.
+        """
+        if route not in (ROUTE_PRO, None):
+            return
+        if not is_cacheable_answer(answer):
+            logger.info("Answer not cached (no relevant content or don't-know reply)")
+            return
+        sources = self.search_agent.source_paths(search_results)
+        # 근거 문서 없이 만든 답변은 저장하지 않음
+        if not sources:
+            return
+        vector = await self.search_agent.embed_query(search_query)
+        self.cache.put(
+            vector,
+            query=search_query,
+            answer=answer,
+            sources=sources,
+            kb_version=self.search_agent.kb_version,
+            scope=answer_scope(variant, route)
+        )
+
+    def cached_route(self) -> str:
+        return ROUTE_CACHE_HINT if self.mode == "hint" else ROUTE_CACHE
+
+    # 노드 함수 - 그래프 시작에서 캐시 확인
+    async def lookup_node(self, state: AgentState, variant: str = "default", routing: bool = False) -> AgentState:
+        """비슷한 이전 질문의 답변을 찾는 노드. return 모드에서 적중하면 그 답변을 최종 결과로 설정합니다."""
+        logger.info("Executing answer cache lookup node")
+        cached = await self.lookup(state["search_query"], variant, routing)
+        if cached is None:
+            return {"cached_answer": None}
+        if self.mode == "hint":
+            return {"cached_answer": cached, "route": ROUTE_CACHE_HINT}
+        return {"cached_answer": cached, "route": ROUTE_CACHE, "summary": cached["answer"]}
+
+    # 노드 함수 - 답변 생성 후 캐시에 저장
+    async def store_node(self, state: AgentState, variant: str = "default") -> AgentState:
+        """생성한 답변을 캐시에 저장하는 노드"""
+        logger.info("Executing answer cache store node")
+        await self.store(state["search_query"], state["summary"], state["search_results"], variant, state.get("route"))
+
+        return {}
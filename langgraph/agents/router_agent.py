@@ -0,0 +1,100 @@
+import os
+from typing import List, Dict, Any, TypedDict, Annotated, Optional
+import operator
+from dotenv import load_dotenv
+from utils.logger import setup_logger
+from agents.search_agent import HIT_SIMILARITY_ENABLED
+from utils.context_packer import estimate_tokens, flatten_hits
+
+# 로거 설정
+logger = setup_logger("router_agent")
+
+# .env 파일 로드
+load_dotenv()
+
+# 환경 변수 설정
+# 임계값은 로그의 라우팅 판단 근거(Routing decision)로 조정한 뒤 켜세요
+ROUTING_ENABLED = os.getenv("ROUTING_ENABLED", "false").lower() == "true"
+# 최고 유사도(쿼리-문서 밀집 벡터 코사인)가 이 값 미만이면 답변 생성 생략
+ROUTE_SKIP_SIMILARITY = float(os.getenv("ROUTE_SKIP_SIMILARITY", "0.45"))
+# 최고 유사도가 이 값 이상이고 쿼리가 짧으면 빠른 모델로 답변
+ROUTE_FAST_SIMILARITY = float(os.getenv("ROUTE_FAST_SIMILARITY", "0.75"))
+ROUTE_FAST_MAX_QUERY_TOKENS = int(os.getenv("ROUTE_FAST_MAX_QUERY_TOKENS", "400"))
+# 단계별 최대 출력 토큰 수 (pro는 추론 토큰도 포함되므로 기존 요약 에이전트와 같은 값 유지)
+ROUTE_FAST_MAX_TOKENS = int(os.getenv("ROUTE_FAST_MAX_TOKENS", "2048"))
+ROUTE_PRO_MAX_TOKENS = int(os.getenv("ROUTE_PRO_MAX_TOKENS", "65535"))
+ROUTE_SKIP_REPLY = os.getenv(
+    "ROUTE_SKIP_REPLY",
+    "질문과 관련된 문서를 찾지 못했습니다. 질문을 조금 더 구체적으로 작성해 주시면 다시 확인하겠습니다."
+)
+
+# 라우팅 결과
+ROUTE_SKIP = "skip"
+ROUTE_FAST = "fast"
+ROUTE_PRO = "pro"
+
+# AgentState 타입 정의 - 그래프에서 사용
+class AgentState(TypedDict):
+    query: str
+    search_query: str
+    search_results: Annotated[List[Dict[str, Any]], operator.add]
+    branch_results: Annotated[List[List[Dict[str, Any]]], operator.add]
+    route: str
+    cached_answer: Optional[Dict[str, Any]]
+    summary: str
+
+class RouterAgent:
+    """검색 결과의 유사도와 쿼리 길이로 답변 방식(skip/fast/pro)을 정하는 에이전트"""
+    
+    def __init__(self):
+        if ROUTING_ENABLED and not HIT_SIMILARITY_ENABLED:
+            logger.warning("HIT_SIMILARITY_ENABLED is off. Routing can only choose skip (no hits) or pro.")
+    
+    def decide(self, query: str, search_results: List[Any]) -> Dict[str, Any]:
+        """라우팅 결과와 판단 근거를 반환합니다.
+
+        - skip: 검색 결과가 없거나 최고 유사도가 ROUTE_SKIP_SIMILARITY 미만 (인사말, 관련 없는 이슈 등)
+        - fast: 최고 유사도가 ROUTE_FAST_SIMILARITY 이상이고 쿼리가 ROUTE_FAST_MAX_QUERY_TOKENS 이하
+        - pro : 그 외
+        유사도 정보가 없는 결과(HIT_SIMILARITY_ENABLED 비활성화 시 등)는 pro로 보냅니다.
+        """
+        hits = [hit for hits in search_results for hit in ([hits] if isinstance(hits, dict) else hits)]
+        similarities = [hit["similarity"] for hit in hits if hit.get("similarity") is not None]
+        top_similarity = max(similarities) if similarities else None
+        query_tokens = estimate_tokens(query)
+        
+        # 본문이 있는 결과가 하나도 없으면 답변할 근거가 없음
+        if not flatten_hits(search_results):
+            route = ROUTE_SKIP
+        elif top_similarity is None:
+            route = ROUTE_PRO
+        elif top_similarity < ROUTE_SKIP_SIMILARITY:
+            route = ROUTE_SKIP
+        elif top_similarity >= ROUTE_FAST_SIMILARITY and query_tokens <= ROUTE_FAST_MAX_QUERY_TOKENS:
+            route = ROUTE_FAST
+        else:
+            route = ROUTE_PRO
+        
+        decision = {
+            "route": route,
+            "top_similarity": round(top_similarity, 4) if top_similarity is not None else None,
+            "query_tokens": query_tokens,
+            "hits": len(hits)
+        }
+        # 임계값 조정을 위해 판단 근거를 함께 기록
+        logger.info(f"Routing decision: {decision}")
+        return decision
+    
+    # 노드 함수 - 검색과 요약 사이에서 답변 방식을 결정
+    async def route_node(self, state: AgentState) -> AgentState:
+        """검색 결과로 답변 방식을 정하는 노드"""
+        logger.info("Executing route node")
+        decision = self.decide(state["query"], state["search_results"])
+        
+        return {"route": decision["route"]}
+    
+    async def skip_node(self, state: AgentState) -> AgentState:
+        """관련 문서가 없을 때 LLM 호출 없이 정해진 답변을 반환하는 노드"""
+        logger.info("Executing skip node")
+        
+        return {"summary": ROUTE_SKIP_REPLY}
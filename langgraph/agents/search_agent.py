@@ -1,12 +1,22 @@
-from typing import Dict, List, Any, TypedDict, Annotated
+from typing import Dict, List, Any, TypedDict, Annotated, Optional
 import operator
 import os
+import re
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import numpy as np
 from dotenv import load_dotenv
 import vertexai
 from vertexai.language_models import TextEmbeddingModel
 from sklearn.feature_extraction.text import TfidfVectorizer
 from pymilvus import MilvusClient, AnnSearchRequest, WeightedRanker, RRFRanker
 from utils.logger import setup_logger
+from utils.sparse_encoder import SparseEncoder
+from utils.embedding_cache import EmbeddingCache
+from utils.embedding_batcher import EmbeddingBatcher
+from utils.metrics import timed, record_hits
 
 # 로거 설정
 logger = setup_logger("search_agent")
@@ -23,84 +33,417 @@ MILVUS_PASSWORD = os.getenv("MILVUS_PASSWORD", "Milvus")
 VERTEX_PROJECT_ID = os.getenv("VERTEX_PROJECT_ID", "your-project-id")
 VERTEX_LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
 VERTEX_EMBEDDING_MODEL = os.getenv("VERTEX_EMBEDDING_MODEL", "text-multilingual-embedding-002")
+# Milvus 동기 클라이언트 호출을 실행할 스레드 수 (프로세스당 동시 검색 수 상한)
+SEARCH_EXECUTOR_WORKERS = int(os.getenv("SEARCH_EXECUTOR_WORKERS", "16"))
+# 적재 시 저장한 희소 인코더 아티팩트 경로 (milvus-utils/push_using_gemini.py와 같은 환경 변수).
+# 없으면 실행 위치와 관계없이 langgraph/sparse-encoder (적재 스크립트의 기본 저장 위치)
+SPARSE_ENCODER_DIR = os.path.abspath(os.getenv(
+    "SPARSE_ENCODER_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sparse-encoder")
+))
+# 쿼리 임베딩 캐시 설정
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+# 디스크 계층은 프로세스 하나만 쓸 수 있으므로 기본값 꺼짐 (여러 워커면 워커마다 다른 EMBEDDING_CACHE_DIR 필요)
+EMBEDDING_CACHE_DISK_ENABLED = os.getenv("EMBEDDING_CACHE_DISK_ENABLED", "false").lower() == "true"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding-cache")
+EMBEDDING_CACHE_CAPACITY = int(os.getenv("EMBEDDING_CACHE_CAPACITY", "50000"))
+EMBEDDING_CACHE_MEMORY_SIZE = int(os.getenv("EMBEDDING_CACHE_MEMORY_SIZE", "2048"))
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "768"))
+# 동시 요청의 쿼리 임베딩을 모아 한 번에 호출하는 마이크로 배칭 설정
+EMBEDDING_BATCHING_ENABLED = os.getenv("EMBEDDING_BATCHING_ENABLED", "true").lower() == "true"
+EMBEDDING_BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "250"))  # Vertex AI 요청당 최대 텍스트 수
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+# 적재 시 저장한 청크 순번/문자 위치 필드를 함께 조회 (해당 필드가 있는 컬렉션에서만 켜세요)
+CHUNK_OFFSET_FIELDS_ENABLED = os.getenv("CHUNK_OFFSET_FIELDS_ENABLED", "false").lower() == "true"
+OUTPUT_FIELDS = ["file_path", "title", "content", "language"]
+if CHUNK_OFFSET_FIELDS_ENABLED:
+    OUTPUT_FIELDS += ["chunk_index", "char_start", "char_end"]
+
+# MMR(maximal marginal relevance) 다양성 재정렬 설정
+# top_k * MMR_FETCH_MULTIPLIER개를 가져와 관련도와 중복도를 함께 고려해 top_k개를 고름
+MMR_ENABLED = os.getenv("MMR_ENABLED", "false").lower() == "true"
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1이면 관련도만, 0이면 다양성만 고려
+MMR_FETCH_MULTIPLIER = int(os.getenv("MMR_FETCH_MULTIPLIER", "3"))
+MMR_TIME_BUDGET_MS = float(os.getenv("MMR_TIME_BUDGET_MS", "20"))
+
+# 검색 언어 필터: auto(쿼리의 한글 비율로 ko/en 판단), none(필터 없음), 또는 고정 언어 코드
+SEARCH_LANGUAGE = os.getenv("SEARCH_LANGUAGE", "auto").strip().lower()
+# 단어 중 한글이 들어간 단어의 비율이 이 값 이상이면 한국어 쿼리로 판단
+HANGUL_RATIO_THRESHOLD = float(os.getenv("HANGUL_RATIO_THRESHOLD", "0.3"))
+HANGUL_PATTERN = re.compile(r"[\u1100-\u11ff\u3130-\u318f\uac00-\ud7af]")
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+
+# 결과마다 쿼리와의 밀집 벡터 코사인 유사도(similarity)를 계산 (라우팅 신뢰도 판단용, RRF 점수는 순위 기반이라 부적합)
+# 라우팅하는 그래프 변형의 검색에서만 Milvus 결과에 dense_vector 필드를 함께 요청합니다.
+HIT_SIMILARITY_ENABLED = os.getenv("HIT_SIMILARITY_ENABLED", "true").lower() == "true"
 
 # AgentState 타입 정의 - 그래프에서 사용
 class AgentState(TypedDict):
     query: str
+    search_query: str
     search_results: Annotated[List[Dict[str, Any]], operator.add]
+    branch_results: Annotated[List[List[Dict[str, Any]]], operator.add]
+    route: str
+    cached_answer: Optional[Dict[str, Any]]
     summary: str
 
 class SearchAgent:
     """문서 검색을 수행하는 에이전트"""
     
-    def __init__(self):
+    def __init__(self, embedding_model=None, milvus_client=None, sparse_encoder=None):
         # VertexAI 초기화
-        vertexai.init(project=VERTEX_PROJECT_ID, location=VERTEX_LOCATION)
-        self.embedding_model = TextEmbeddingModel.from_pretrained(VERTEX_EMBEDDING_MODEL)
+        if embedding_model is None:
+            vertexai.init(project=VERTEX_PROJECT_ID, location=VERTEX_LOCATION)
+            embedding_model = TextEmbeddingModel.from_pretrained(VERTEX_EMBEDDING_MODEL)
+        self.embedding_model = embedding_model
         
         # Milvus 클라이언트 초기화
-        self.milvus_client = MilvusClient(
-            uri=f"http://{MILVUS_HOST}:{MILVUS_PORT}",
-            token=f"{MILVUS_USER}:{MILVUS_PASSWORD}"
+        if milvus_client is None:
+            milvus_client = MilvusClient(
+                uri=f"http://{MILVUS_HOST}:{MILVUS_PORT}",
+                token=f"{MILVUS_USER}:{MILVUS_PASSWORD}"
+            )
+        self.milvus_client = milvus_client
+        
+        # 코퍼스 단위 희소 인코더 로드 (적재 시 학습한 어휘/IDF 사용)
+        if sparse_encoder is None:
+            try:
+                sparse_encoder = SparseEncoder.load(SPARSE_ENCODER_DIR)
+            except Exception as e:
+                logger.error(f"Failed to load sparse encoder: {str(e)}")
+        self.sparse_encoder = sparse_encoder
+        if self.sparse_encoder is None:
+            logger.warning("Sparse encoder is not available. Falling back to per-query TF-IDF.")
+        
+        # 희소 인코더 버전이 없을 때 지식 베이스 버전으로 쓸 컬렉션 생성 시각
+        self._collection_version: Optional[str] = None
+        if self.sparse_encoder is None:
+            self._collection_version = self._load_collection_version()
+        
+        # 쿼리 임베딩 캐시 (같은 쿼리 재검색 시 Vertex 호출 생략)
+        self.embedding_cache = None
+        if EMBEDDING_CACHE_ENABLED:
+            try:
+                self.embedding_cache = EmbeddingCache(
+                    cache_dir=EMBEDDING_CACHE_DIR if EMBEDDING_CACHE_DISK_ENABLED else None,
+                    dim=EMBEDDING_DIM,
+                    capacity=EMBEDDING_CACHE_CAPACITY,
+                    memory_size=EMBEDDING_CACHE_MEMORY_SIZE
+                )
+            except Exception as e:
+                # 다른 프로세스가 디렉토리를 쓰고 있거나 인덱스가 깨졌으면 메모리 계층만 사용
+                logger.error(f"Embedding cache disk tier disabled: {str(e)}")
+                self.embedding_cache = EmbeddingCache(
+                    cache_dir=None,
+                    dim=EMBEDDING_DIM,
+                    capacity=EMBEDDING_CACHE_CAPACITY,
+                    memory_size=EMBEDDING_CACHE_MEMORY_SIZE
+                )
+        
+        # 쿼리 임베딩 마이크로 배처
+        self.embedding_batcher = None
+        if EMBEDDING_BATCHING_ENABLED:
+            self.embedding_batcher = EmbeddingBatcher(
+                self.embed_texts,
+                max_batch_size=EMBEDDING_BATCH_MAX_SIZE,
+                max_wait_ms=EMBEDDING_BATCH_MAX_WAIT_MS
+            )
+        
+        # 동기 Milvus 호출이 이벤트 루프를 막지 않도록 별도 스레드 풀에서 실행
+        self._executor = ThreadPoolExecutor(
+            max_workers=SEARCH_EXECUTOR_WORKERS,
+            thread_name_prefix="milvus-search"
         )
         logger.info("SearchAgent initialized")
     
-    async def hybrid_search(self, query: str, language="ko", top_k=20) -> List[Dict[str, Any]]:
-        """하이브리드 검색 수행 (공식 API 문서 기반)"""
-        logger.info(f"Performing hybrid search for query: {query}")
+    async def embed_texts(self, texts: List[str]) -> List[List[float]]:
+        """여러 텍스트의 밀집 벡터를 한 번의 비동기 호출로 생성합니다."""
+        embeddings = await self.embedding_model.get_embeddings_async(texts)
+        return [list(embedding.values) for embedding in embeddings]
+    
+    async def _embed_uncached(self, query: str) -> List[float]:
+        if self.embedding_batcher is not None:
+            # 동시에 들어온 다른 쿼리들과 묶어서 호출
+            return await self.embedding_batcher.embed(query)
+        return (await self.embed_texts([query]))[0]
+    
+    async def embed_query(self, query: str) -> List[float]:
+        """쿼리의 밀집 벡터를 비동기로 생성합니다. (모델, 정규화된 쿼리) 단위로 캐시합니다."""
+        with timed("embedding"):
+            return await self._embed_query(query)
+    
+    async def _embed_query(self, query: str) -> List[float]:
+        if self.embedding_cache is None:
+            return await self._embed_uncached(query)
+        
+        cache_key = self.embedding_cache.make_key(VERTEX_EMBEDDING_MODEL, query)
+        cached = self.embedding_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        start_time = time.perf_counter()
+        values = await self._embed_uncached(query)
+        self.embedding_cache.put(cache_key, values, latency=time.perf_counter() - start_time)
+        return values
+    
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """여러 쿼리의 밀집 벡터를 생성합니다. 캐시에 없는 쿼리만 모아 배치로 호출합니다."""
+        with timed("embedding"):
+            return await self._embed_queries(queries)
+    
+    async def _embed_queries(self, queries: List[str]) -> List[List[float]]:
+        vectors: List[Optional[List[float]]] = [None] * len(queries)
+        cache_keys: Dict[str, str] = {}
+        missing: Dict[str, List[int]] = {}
+        
+        for i, query in enumerate(queries):
+            if self.embedding_cache is not None:
+                cache_keys[query] = self.embedding_cache.make_key(VERTEX_EMBEDDING_MODEL, query)
+                cached = self.embedding_cache.get(cache_keys[query])
+                if cached is not None:
+                    vectors[i] = cached
+                    continue
+            missing.setdefault(query, []).append(i)
         
+        texts = list(missing)
+        for offset in range(0, len(texts), EMBEDDING_BATCH_MAX_SIZE):
+            chunk = texts[offset:offset + EMBEDDING_BATCH_MAX_SIZE]
+            start_time = time.perf_counter()
+            chunk_vectors = await self.embed_texts(chunk)
+            latency = (time.perf_counter() - start_time) / len(chunk)
+            
+            for text, values in zip(chunk, chunk_vectors):
+                for i in missing[text]:
+                    vectors[i] = values
+                if self.embedding_cache is not None:
+                    self.embedding_cache.put(cache_keys[text], values, latency=latency)
+        
+        return vectors
+    
+    def close(self):
+        """캐시를 디스크에 기록하고 스레드 풀을 종료합니다."""
+        if self.embedding_cache is not None:
+            self.embedding_cache.flush()
+        self._executor.shutdown(wait=False)
+    
+    @property
+    def kb_version(self) -> Optional[str]:
+        """지식 베이스 버전 (컬렉션 이름 + 희소 인코더 버전, 인코더가 없으면 컬렉션 생성 시각)"""
+        if self.sparse_encoder is not None:
+            return f"{MILVUS_COLLECTION}:{self.sparse_encoder.version}"
+        if self._collection_version:
+            return f"{MILVUS_COLLECTION}:created-{self._collection_version}"
+        return None
+    
+    def _load_collection_version(self) -> Optional[str]:
+        """컬렉션 생성 시각을 반환합니다 (재적재 시 컬렉션을 삭제 후 다시 만들므로 바뀜)."""
         try:
-            # 1. 밀집 벡터 생성
-            dense_embedding = self.embedding_model.get_embeddings([query])[0].values
+            created = self.milvus_client.describe_collection(MILVUS_COLLECTION).get("created_timestamp")
+            return str(created) if created else None
+        except Exception as e:
+            logger.warning(f"Could not read collection version: {str(e)}")
+            return None
+    
+    async def refresh_kb_version(self) -> Optional[str]:
+        """희소 인코더가 없으면 컬렉션 생성 시각을 다시 읽어 지식 베이스 버전을 갱신하고 반환합니다."""
+        if self.sparse_encoder is None:
+            self._collection_version = await self._run_in_executor(self._load_collection_version)
+        return self.kb_version
+    
+    def encode_sparse(self, query: str) -> Dict[int, float]:
+        """쿼리를 희소 벡터로 변환합니다."""
+        if self.sparse_encoder is not None:
+            # 적재 시 어휘를 그대로 사용하므로 단순 조회로 끝남
+            return self.sparse_encoder.encode(query)
+        
+        # 인코더 아티팩트가 없을 때의 이전 방식 (쿼리 하나로 학습)
+        vectorizer = TfidfVectorizer(max_features=5000)
+        vectorizer.fit([query])
+        sparse_matrix = vectorizer.transform([query])
+        return {int(idx): float(value) for idx, value in zip(sparse_matrix.indices, sparse_matrix.data)}
+    
+    async def _run_in_executor(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+    
+    @staticmethod
+    def detect_language(query: str) -> str:
+        """한글이 들어간 단어의 비율로 쿼리 언어(ko/en)를 판단합니다.
+
+        글자 단위로 세면 영어 용어가 섞인 한국어 질문("pymilvus 설치")이 영어로 판단되므로 단어 단위로 셉니다.
+        """
+        words = WORD_PATTERN.findall(query)
+        if not words:
+            return "ko"
+        hangul_words = sum(1 for word in words if HANGUL_PATTERN.search(word))
+        return "ko" if hangul_words / len(words) >= HANGUL_RATIO_THRESHOLD else "en"
+    
+    def resolve_language(self, query: str) -> Optional[str]:
+        """SEARCH_LANGUAGE 설정에 따라 검색할 문서 언어를 정합니다 (None이면 필터 없음)."""
+        if SEARCH_LANGUAGE == "auto":
+            return self.detect_language(query)
+        if SEARCH_LANGUAGE in ("", "none"):
+            return None
+        return SEARCH_LANGUAGE
+    
+    @staticmethod
+    def language_filter(language: Optional[str]) -> Optional[str]:
+        """언어 필터 표현식 (값의 따옴표/역슬래시는 이스케이프)"""
+        if not language:
+            return None
+        escaped = language.replace("\\", "\\\\").replace('"', '\\"')
+        return f'language == "{escaped}"'
+    
+    def _build_search_requests(self, dense_vectors: List[List[float]], sparse_vectors: List[Dict[int, float]], top_k: int,
+                               expr: Optional[str] = None) -> List[AnnSearchRequest]:
+        """쿼리 벡터 목록으로 밀집/희소 AnnSearchRequest를 만듭니다 (요청 하나에 여러 쿼리 가능).
+
+        expr는 두 요청 모두에 적용되며, language가 파티션 키인 컬렉션에서는 해당 파티션만 검색합니다.
+        """
+        limit = self._fetch_limit(top_k)
+        
+        # 1. 밀집 벡터 검색 파라미터 설정
+        dense_search_param = {
+            "data": dense_vectors,
+            "anns_field": "dense_vector",
+            "param": {
+                "metric_type": "COSINE", 
+                "params": {}
+            },
+            "limit": limit,
+            "expr": expr
+        }
+        dense_request = AnnSearchRequest(**dense_search_param)
+        
+        # 어휘에 있는 단어가 하나도 없는 쿼리가 있으면 밀집 벡터만으로 검색
+        if not all(sparse_vectors):
+            return [dense_request]
+        
+        # 2. 희소 벡터 검색 파라미터 설정
+        sparse_search_param = {
+            "data": sparse_vectors,
+            "anns_field": "sparse_vector",
+            "param": {
+                "metric_type": "IP",
+                "params": {"drop_ratio_build": 0.2}
+            },
+            "limit": limit,
+            "expr": expr
+        }
+        sparse_request = AnnSearchRequest(**sparse_search_param)
+        return [sparse_request, dense_request]
+    
+    async def _run_hybrid_search(self, reqs: List[AnnSearchRequest], top_k: int,
+                                 query_vectors: Optional[List[List[float]]] = None) -> List[List[Dict[str, Any]]]:
+        """하이브리드 검색 실행 (스레드 풀에서 실행하여 이벤트 루프 차단 방지). 쿼리별 결과 목록을 반환합니다.
+
+        query_vectors가 있으면 결과마다 쿼리와의 코사인 유사도를 similarity로 붙입니다.
+        """
+        with_vectors = MMR_ENABLED or query_vectors is not None
+        with timed("milvus"):
+            results = await self._run_in_executor(
+                self.milvus_client.hybrid_search,
+                collection_name=MILVUS_COLLECTION,
+                reqs=reqs,                            # 검색 요청 리스트
+                ranker=RRFRanker(60),                 # RRF 재정렬기 (k=60)
+                limit=self._fetch_limit(top_k),       # 최종 결과 수 (MMR 사용 시 더 많이 가져옴)
+                output_fields=(OUTPUT_FIELDS + ["dense_vector"]) if with_vectors else OUTPUT_FIELDS
+            )
+        if MMR_ENABLED:
+            with timed("mmr"):
+                results = [self._mmr_rerank(hits, top_k) for hits in results]
+        if with_vectors:
+            results = [list(hits) for hits in results]
+            if query_vectors is not None:
+                for query_vector, hits in zip(query_vectors, results):
+                    self._annotate_similarity(query_vector, hits)
+            # 벡터는 응답과 프롬프트에 필요 없으므로 제거
+            for hits in results:
+                for hit in hits:
+                    hit["entity"].pop("dense_vector", None)
+        record_hits(sum(len(hits) for hits in results))
+        return results
+    
+    @staticmethod
+    def _annotate_similarity(query_vector: List[float], hits: List[Dict[str, Any]]):
+        if not hits:
+            return
+        query = np.asarray(query_vector, dtype=np.float32)
+        vectors = np.asarray([hit["entity"]["dense_vector"] for hit in hits], dtype=np.float32)
+        similarity = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query) + 1e-12)
+        for hit, value in zip(hits, similarity):
+            hit["similarity"] = float(value)
+    
+    @staticmethod
+    def _fetch_limit(top_k: int) -> int:
+        return top_k * MMR_FETCH_MULTIPLIER if MMR_ENABLED else top_k
+    
+    @staticmethod
+    def _mmr_rerank(hits: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """MMR로 관련도와 다양성을 함께 고려해 top_k개를 고릅니다.
+
+        관련도는 RRF 점수를 최댓값으로 정규화한 값(희소 검색 신호 유지)이고, 중복도는 이미 고른
+        결과들과의 밀집 벡터 코사인 유사도 최댓값입니다. 시간 예산을 넘기면 남은 자리는 RRF 순위대로 채웁니다.
+        """
+        hits = list(hits)
+        start_time = time.perf_counter()
+        
+        if len(hits) > top_k:
+            vectors = np.asarray([hit["entity"]["dense_vector"] for hit in hits], dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+            similarity = vectors @ vectors.T
             
-            # 2. 희소 벡터 생성 (TF-IDF)
-            vectorizer = TfidfVectorizer(max_features=5000)
-            vectorizer.fit([query])
-            sparse_matrix = vectorizer.transform([query])
+            scores = np.asarray([hit["distance"] for hit in hits], dtype=np.float32)
+            relevance = scores / scores.max() if scores.max() > 0 else scores
             
-            # 희소 벡터를 {인덱스: 값} 형태로 변환
-            sparse_vector = {}
-            for i, idx in enumerate(sparse_matrix.indices):
-                sparse_vector[int(idx)] = float(sparse_matrix.data[i])
+            # RRF 1위는 그대로 선택
+            selected = [0]
+            max_similarity = similarity[0].copy()
+            remaining = np.ones(len(hits), dtype=bool)
+            remaining[0] = False
             
-            # 3. 밀집 벡터 검색 파라미터 설정
-            dense_search_param = {
-                "data": [dense_embedding],
-                "anns_field": "dense_vector",
-                "param": {
-                    "metric_type": "COSINE", 
-                    "params": {}
-                },
-                "limit": top_k
-            }
-            dense_request = AnnSearchRequest(**dense_search_param)
+            while len(selected) < top_k:
+                if (time.perf_counter() - start_time) * 1000 > MMR_TIME_BUDGET_MS:
+                    logger.warning(f"MMR time budget exceeded after {len(selected)} picks. Filling the rest by RRF rank.")
+                    selected += [int(i) for i in np.flatnonzero(remaining)[:top_k - len(selected)]]
+                    break
+                mmr_scores = MMR_LAMBDA * relevance - (1 - MMR_LAMBDA) * max_similarity
+                mmr_scores[~remaining] = -np.inf
+                best = int(np.argmax(mmr_scores))
+                selected.append(best)
+                remaining[best] = False
+                max_similarity = np.maximum(max_similarity, similarity[best])
             
-            # 4. 희소 벡터 검색 파라미터 설정
-            sparse_search_param = {
-                "data": [sparse_vector],
-                "anns_field": "sparse_vector",
-                "param": {
-                    "metric_type": "IP",
-                    "params": {"drop_ratio_build": 0.2}
-                },
-                "limit": top_k
-            }
-            sparse_request = AnnSearchRequest(**sparse_search_param)
+            hits = [hits[i] for i in selected]
+        
+        return hits
+    
+    async def hybrid_search(self, query: str, language: Optional[str] = None, top_k=20,
+                            with_similarity: bool = False) -> List[Dict[str, Any]]:
+        """하이브리드 검색 수행 (공식 API 문서 기반). language가 없으면 SEARCH_LANGUAGE 설정으로 정합니다.
 
-            # 5. RRF 재정렬기 설정
-            ranker = RRFRanker(60)  # k=60
+        with_similarity(라우팅용)이고 HIT_SIMILARITY_ENABLED이면 결과마다 similarity를 붙입니다.
+        """
+        language = language or self.resolve_language(query)
+        logger.info(f"Performing hybrid search for query: {query} (language: {language or 'all'})")
+        
+        try:
+            # 1. 밀집 벡터 생성 (비동기 API 사용)
+            dense_embedding = await self.embed_query(query)
             
-            # 6. 필터 표현식 설정 (언어 필터링)
-            expr = f"language == '{language}'" if language else None
+            # 2. 희소 벡터 생성 (코퍼스 단위 TF-IDF)
+            sparse_vector = self.encode_sparse(query)
             
-            # 7. 하이브리드 검색 실행
-            results = self.milvus_client.hybrid_search(
-                collection_name=MILVUS_COLLECTION,
-                reqs=[sparse_request, dense_request],  # 검색 요청 리스트
-                ranker=ranker,                        # 재정렬기
-                limit=top_k,                          # 최종 결과 수
-                output_fields=["file_path", "title", "content", "language"]
-            )
+            # 3. 필터 표현식 설정 (언어 필터링)
+            expr = self.language_filter(language)
+            
+            # 4. 검색 요청 구성
+            reqs = self._build_search_requests([dense_embedding], [sparse_vector], top_k, expr)
+            
+            # 5. 하이브리드 검색 실행
+            query_vectors = [dense_embedding] if with_similarity and HIT_SIMILARITY_ENABLED else None
+            results = await self._run_hybrid_search(reqs, top_k, query_vectors=query_vectors)
             
             logger.info(f"Hybrid search completed. Found {len(results)} results")
             return results
@@ -109,11 +452,140 @@ class SearchAgent:
             logger.error(f"Error in hybrid search: {str(e)}")
             raise
     
+    async def hybrid_search_batch(self, queries: List[str], top_k=20, with_similarity: bool = False) -> List[Any]:
+        """여러 쿼리를 한 번의 임베딩 배치 호출과 다중 벡터 하이브리드 검색으로 처리합니다.
+
+        필터 표현식은 요청 단위로 적용되므로 쿼리를 언어별로 묶고, 희소 벡터가 비어 있는 쿼리는
+        희소 요청에 넣을 수 없으므로 밀집 전용 검색으로 따로 묶습니다.
+        반환값은 queries와 같은 순서의 쿼리별 결과 목록이며, 실패한 쿼리 자리에는 예외 객체가 들어갑니다
+        (한 쿼리의 실패가 배치 전체를 실패시키지 않도록).
+        """
+        logger.info(f"Performing batched hybrid search for {len(queries)} queries")
+        results: List[Any] = [[] for _ in queries]
+        
+        try:
+            dense_vectors = await self.embed_queries(queries)
+        except Exception as e:
+            # 배치 호출이 실패하면 어떤 쿼리 때문인지 알 수 없으므로 쿼리별로 다시 시도
+            logger.warning(f"Batched embedding failed, retrying per query: {str(e)}")
+            dense_vectors = await asyncio.gather(*(self.embed_query(query) for query in queries), return_exceptions=True)
+        
+        # (언어, 희소 벡터 유무) 단위로 묶어 그룹마다 Milvus 호출 한 번
+        sparse_vectors: Dict[int, Dict[int, float]] = {}
+        languages: Dict[int, Optional[str]] = {}
+        grouped: Dict[tuple, List[int]] = {}
+        for i, query in enumerate(queries):
+            if isinstance(dense_vectors[i], Exception):
+                results[i] = dense_vectors[i]
+                continue
+            try:
+                sparse_vectors[i] = self.encode_sparse(query)
+            except Exception as e:
+                # 인코더 아티팩트가 없을 때 불용어만 있는 쿼리는 어휘가 비어 실패함
+                logger.warning(f"Failed to encode query {i} in batch: {str(e)}")
+                results[i] = e
+                continue
+            languages[i] = self.resolve_language(query)
+            grouped.setdefault((languages[i], bool(sparse_vectors[i])), []).append(i)
+        
+        groups = list(grouped.values())
+        group_results = await asyncio.gather(*(
+            self._run_hybrid_search(
+                self._build_search_requests(
+                    [dense_vectors[i] for i in group],
+                    [sparse_vectors[i] for i in group],
+                    top_k,
+                    self.language_filter(languages[group[0]])
+                ),
+                top_k,
+                query_vectors=[dense_vectors[i] for i in group] if with_similarity and HIT_SIMILARITY_ENABLED else None
+            )
+            for group in groups
+        ), return_exceptions=True)
+        
+        for group, hits_per_query in zip(groups, group_results):
+            if isinstance(hits_per_query, Exception):
+                logger.error(f"Error in batched hybrid search for {len(group)} queries: {str(hits_per_query)}")
+                for i in group:
+                    results[i] = hits_per_query
+                continue
+            for i, hits in zip(group, hits_per_query):
+                results[i] = hits
+        
+        failed = sum(isinstance(result, Exception) for result in results)
+        logger.info(f"Batched hybrid search completed with {len(groups)} Milvus call(s), {failed} failed queries")
+        return results
+    
+    @staticmethod
+    def source_paths(search_results: List[Any]) -> List[str]:
+        """검색 결과(쿼리별 결과 목록)에서 중복 없이 순위 순으로 문서 경로를 추출합니다."""
+        paths: List[str] = []
+        for hits in search_results:
+            for hit in hits:
+                entity = hit.get("entity", hit)
+                path = entity.get("file_path")
+                if path and path not in paths:
+                    paths.append(path)
+        return paths
+    
+    @staticmethod
+    def rrf_fuse(result_lists: List[List[Dict[str, Any]]], top_k: int, k: int = 60) -> List[Dict[str, Any]]:
+        """여러 검색 결과 목록을 RRF(reciprocal rank fusion)로 합칩니다. 같은 id의 결과는 점수를 더해 한 번만 남깁니다."""
+        scores: Dict[Any, float] = {}
+        hits_by_id: Dict[Any, Dict[str, Any]] = {}
+        for hits in result_lists:
+            for rank, hit in enumerate(hits):
+                hit_id = hit.get("id")
+                scores[hit_id] = scores.get(hit_id, 0.0) + 1.0 / (k + rank + 1)
+                hits_by_id.setdefault(hit_id, hit)
+        
+        ordered = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        return [{**hits_by_id[hit_id], "distance": scores[hit_id]} for hit_id in ordered]
+    
     # 노드 함수 추가 - 이제 이 함수가 그래프의 노드로 사용됨
-    async def search_documents_node(self, state: AgentState) -> AgentState:
+    async def search_documents_node(self, state: AgentState, top_k: int = 20, with_similarity: bool = False) -> AgentState:
         """사용자 쿼리로 문서 검색을 수행하는 노드"""
         logger.info("Executing search_documents node")
-        query = state["query"]
-        search_results = await self.hybrid_search(query)
+        # 검색용으로 축약된 쿼리가 있으면 사용
+        query = state.get("search_query") or state["query"]
+        search_results = await self.hybrid_search(query, top_k=top_k, with_similarity=with_similarity)
+        
+        return {"search_results": search_results}
+    
+    async def search_language_node(self, state: AgentState, language: str, top_k: int = 20,
+                                   with_similarity: bool = False) -> AgentState:
+        """지정한 언어의 문서만 검색하는 노드 (언어별 병렬 검색 분기)"""
+        logger.info(f"Executing search_{language} node")
+        query = state.get("search_query") or state["query"]
+        search_results = await self.hybrid_search(query, language=language, top_k=top_k, with_similarity=with_similarity)
+        
+        return {"branch_results": [search_results[0] if search_results else []]}
+    
+    async def search_translated_node(self, state: AgentState, translate, languages: List[str], top_k: int = 20,
+                                     with_similarity: bool = False) -> AgentState:
+        """쿼리를 다른 언어로 번역해 그 언어의 문서를 검색하는 노드. 번역/검색 실패 시 빈 결과로 진행합니다."""
+        logger.info("Executing search_translated node")
+        query = state.get("search_query") or state["query"]
+        source_language = self.detect_language(query)
+        
+        async def search_in(language: str) -> List[Dict[str, Any]]:
+            try:
+                translated = await translate(query, language)
+                search_results = await self.hybrid_search(translated, language=language, top_k=top_k, with_similarity=with_similarity)
+                return search_results[0] if search_results else []
+            except Exception as e:
+                logger.warning(f"Translated search to {language} failed: {str(e)}")
+                return []
+        
+        branch_results = await asyncio.gather(*(
+            search_in(language) for language in languages if language != source_language
+        ))
+        return {"branch_results": list(branch_results)}
+    
+    async def fuse_results_node(self, state: AgentState, top_k: int = 20) -> AgentState:
+        """언어별 검색 분기의 결과를 RRF로 합치는 노드"""
+        logger.info("Executing fuse_results node")
+        fused = self.rrf_fuse(state.get("branch_results", []), top_k)
+        logger.info(f"Fused {len(state.get('branch_results', []))} branch results into {len(fused)} hits")
         
-        return {"search_results": search_results}
\ No newline at end of file
+        return {"search_results": [fused]}
\ No newline at end of file
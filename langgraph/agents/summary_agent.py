@@ -1,11 +1,15 @@
-from typing import List, Dict, Any, TypedDict, Annotated
+from typing import List, Dict, Any, TypedDict, Annotated, Optional, AsyncIterator
 import operator
 import os
+import re
+import asyncio
 from dotenv import load_dotenv
 from langchain_google_vertexai import ChatVertexAI
 from langchain_core.messages import HumanMessage, SystemMessage
 import vertexai
 from utils.logger import setup_logger
+from utils.context_packer import pack_context, render_context, render_passage
+from utils.metrics import timed, record_tokens
 
 # 로거 설정
 logger = setup_logger("summary_agent")
@@ -17,52 +21,174 @@ load_dotenv()
 VERTEX_PROJECT_ID = os.getenv("VERTEX_PROJECT_ID", "your-project-id")
 VERTEX_LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
 VERTEX_LLM_MODEL = os.getenv("VERTEX_LLM_MODEL", "gemini-2.5-pro-preview-03-25")
+# 프롬프트에 넣을 검색 문맥의 최대 토큰 수 (추정치)와 근접 중복 판단 기준
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "6000"))
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.85"))
+# 맵리듀스 요약: 문맥을 MAP_REDUCE_CONTEXT_TOKEN_BUDGET까지 채우고, MAP_REDUCE_THRESHOLD_TOKENS를 넘으면
+# 문단 묶음을 빠른 모델로 병렬 요약한 뒤 그 요약들로 최종 답변 생성.
+# 임계값은 CONTEXT_TOKEN_BUDGET 이상으로 유지하여 평소 크기의 문맥은 요약 없이 원문 그대로 사용
+MAP_REDUCE_ENABLED = os.getenv("MAP_REDUCE_ENABLED", "false").lower() == "true"
+MAP_REDUCE_CONTEXT_TOKEN_BUDGET = int(os.getenv("MAP_REDUCE_CONTEXT_TOKEN_BUDGET", "24000"))
+MAP_REDUCE_THRESHOLD_TOKENS = max(
+    int(os.getenv("MAP_REDUCE_THRESHOLD_TOKENS", str(CONTEXT_TOKEN_BUDGET))),
+    CONTEXT_TOKEN_BUDGET
+)
+MAP_REDUCE_GROUP_TOKENS = int(os.getenv("MAP_REDUCE_GROUP_TOKENS", "1500"))
+MAP_REDUCE_CONCURRENCY = int(os.getenv("MAP_REDUCE_CONCURRENCY", "4"))
+VERTEX_FAST_LLM_MODEL = os.getenv("VERTEX_FAST_LLM_MODEL", "gemini-2.0-flash")
+# 맵 단계에서 관련 내용이 없는 묶음이 내는 응답
+NO_RELEVANT_CONTENT = "관련 없음"
+# 비교 전에 제거할 공백, 문장 부호, 따옴표
+NON_WORD_PATTERN = re.compile(r"[\W_]+")
+
+def is_no_relevant_content(text: Optional[str]) -> bool:
+    """모델 응답이 NO_RELEVANT_CONTENT인지 확인합니다 ("관련 없음.", "'관련 없음'", 앞뒤 공백 등 허용)."""
+    return NON_WORD_PATTERN.sub("", text or "") == NON_WORD_PATTERN.sub("", NO_RELEVANT_CONTENT)
 
 # AgentState 타입 정의 - 그래프에서 사용
 class AgentState(TypedDict):
     query: str
+    search_query: str
     search_results: Annotated[List[Dict[str, Any]], operator.add]
+    branch_results: Annotated[List[List[Dict[str, Any]]], operator.add]
+    route: str
+    cached_answer: Optional[Dict[str, Any]]
     summary: str
 
 class SummaryAgent:
     """검색 결과를 요약하는 에이전트"""
     
-    def __init__(self):
+    def __init__(self, model: Optional[str] = None, max_tokens: int = 65535):
         # VertexAI 초기화
         vertexai.init(project=VERTEX_PROJECT_ID, location=VERTEX_LOCATION)
         
         # LLM 모델 초기화
+        self.model = model or VERTEX_LLM_MODEL
+        self.max_tokens = max_tokens
         self.llm = ChatVertexAI(
-            model=VERTEX_LLM_MODEL,
+            model=self.model,
             temperature=0.0,
-            max_tokens=65535,
+            max_tokens=max_tokens,
             max_retries=2
         )
-        logger.info("SummaryAgent initialized")
+        # 맵 단계용 빠른 모델
+        self.map_llm = None
+        if MAP_REDUCE_ENABLED:
+            self.map_llm = ChatVertexAI(
+                model=VERTEX_FAST_LLM_MODEL,
+                temperature=0.0,
+                max_tokens=1024,
+                max_retries=2
+            )
+        logger.info(f"SummaryAgent initialized (model: {self.model}, max_tokens: {max_tokens})")
+    
+    @staticmethod
+    def _group_passages(passages: List[Dict[str, Any]], group_tokens: int) -> List[List[int]]:
+        """순위 순서를 유지하며 문단 번호(1부터)를 group_tokens 이하의 묶음으로 나눕니다."""
+        groups: List[List[int]] = []
+        used = 0
+        for number, passage in enumerate(passages, start=1):
+            if not groups or used + passage["tokens"] > group_tokens:
+                groups.append([])
+                used = 0
+            groups[-1].append(number)
+            used += passage["tokens"]
+        return groups
+    
+    async def _condense_group(self, query: str, group_text: str) -> str:
+        """문단 묶음에서 질문과 관련된 내용만 빠른 모델로 정리합니다. 실패하면 원문을 그대로 씁니다."""
+        system_message = SystemMessage(
+            content=(
+                "검색 결과 중 사용자 질문에 답하는 데 필요한 사실, 절차, 코드, 설정 값만 간결하게 정리하세요. "
+                f"각 내용 끝에 출처 번호 [n]을 그대로 남기고, 관련 내용이 없으면 '{NO_RELEVANT_CONTENT}'이라고만 답하세요."
+            )
+        )
+        user_message = HumanMessage(content=f"질문:\n{query}\n\n검색 결과:\n{group_text}")
+        try:
+            with timed("llm_map"):
+                response = await self.map_llm.ainvoke([system_message, user_message])
+            record_tokens(getattr(response, "usage_metadata", None))
+            return response.content.strip()
+        except Exception as e:
+            logger.warning(f"Map step failed, using raw passages instead: {str(e)}")
+            return group_text
+    
+    async def _map_reduce_context(self, query: str, passages: List[Dict[str, Any]]) -> str:
+        """문단 묶음별 요약을 병렬(최대 MAP_REDUCE_CONCURRENCY개)로 만들고 최종 호출에 넣을 문맥으로 합칩니다."""
+        groups = self._group_passages(passages, MAP_REDUCE_GROUP_TOKENS)
+        semaphore = asyncio.Semaphore(MAP_REDUCE_CONCURRENCY)
+        
+        async def condense(group: List[int]) -> str:
+            async with semaphore:
+                group_text = "\n\n".join(render_passage(number, passages[number - 1]) for number in group)
+                return await self._condense_group(query, group_text)
+        
+        condensed = await asyncio.gather(*(condense(group) for group in groups))
+        
+        # 출처 목록은 원래 번호 그대로 유지하고, 관련 없는 묶음은 제외
+        sources = "\n".join(
+            render_passage(number, passage).split("\n", 1)[0] for number, passage in enumerate(passages, start=1)
+        )
+        notes = [text for text in condensed if text and not is_no_relevant_content(text)]
+        logger.info(f"Map-reduce: {len(groups)} groups condensed, {len(notes)} with relevant content")
+        return f"출처 목록:\n{sources}\n\n검색 결과 요약:\n" + "\n\n".join(notes or [NO_RELEVANT_CONTENT])
     
-    async def summarize(self, query: str, search_results: List[Dict[str, Any]]) -> str:
+    @staticmethod
+    def _render_cached_answer(cached_answer: Dict[str, Any]) -> str:
+        sources = "\n".join(f"- {path}" for path in cached_answer.get("sources", []))
+        return (
+            f"비슷한 이전 질문: {cached_answer['query']}\n"
+            f"이전 답변:\n{cached_answer['answer']}\n"
+            f"이전 답변의 출처 문서:\n{sources}"
+        )
+    
+    async def _build_messages(self, query: str, search_results: List[Dict[str, Any]],
+                              cached_answer: Optional[Dict[str, Any]] = None) -> List[Any]:
+        # 시스템 메시지 구성
+        system_message = SystemMessage(
+            content="당신은 검색 결과를 바탕으로 사용자 질문에 답변하는 도우미입니다. 검색 결과에 관련 정보가 없다면 솔직히 모른다고 답변하세요."
+        )
+        
+        # 검색 결과 문맥 구성 (제목/경로/본문만, 토큰 예산 안에서 순위 순)
+        # 맵리듀스를 쓰면 더 큰 예산으로 채우고, 임계값을 넘을 때만 묶음별로 요약
+        token_budget = MAP_REDUCE_CONTEXT_TOKEN_BUDGET if self.map_llm is not None else CONTEXT_TOKEN_BUDGET
+        passages = pack_context(search_results, token_budget, CONTEXT_DEDUP_THRESHOLD)
+        packed_tokens = sum(p['tokens'] for p in passages)
+        logger.info(f"Packed {len(passages)} passages (~{packed_tokens} tokens) into context")
+        
+        # 문맥이 길면 맵리듀스로 줄인 뒤 최종 답변 생성
+        if self.map_llm is not None and packed_tokens > MAP_REDUCE_THRESHOLD_TOKENS and len(passages) > 1:
+            context = await self._map_reduce_context(query, passages)
+        else:
+            context = render_context(passages)
+        
+        # 비슷한 질문에 대한 이전 답변을 강한 힌트로 함께 제공 (답변 캐시 hint 모드)
+        if cached_answer:
+            hint = self._render_cached_answer(cached_answer)
+            context = f"{hint}\n\n{context}" if context else hint
+        
+        user_prompt = f"""
+                        사용자 질문한 질문의 제목과 내용입니다: 
+                        {query}
+
+                        검색 결과:
+                        {context}
+
+                        """
+        user_message = HumanMessage(content=user_prompt)
+        return [system_message, user_message]
+    
+    async def summarize(self, query: str, search_results: List[Dict[str, Any]],
+                        cached_answer: Optional[Dict[str, Any]] = None) -> str:
         """검색 결과를 바탕으로 요약 생성"""
         logger.info(f"Summarizing results for query: {query}")
         
         try:
-            # 시스템 메시지 구성
-            system_message = SystemMessage(
-                content="당신은 검색 결과를 바탕으로 사용자 질문에 답변하는 도우미입니다. 검색 결과에 관련 정보가 없다면 솔직히 모른다고 답변하세요."
-            )
-            
-            # 검색 결과 문맥 구성
-            user_prompt = f"""
-                            사용자 질문한 질문의 제목과 내용입니다: 
-                            {query}
-
-                            검색 결과:
-                            {search_results}
-
-                            """
-            user_message = HumanMessage(content=user_prompt)
-            
             # 모델 호출
-            response = await self.llm.ainvoke([system_message, user_message])
+            messages = await self._build_messages(query, search_results, cached_answer)
+            with timed("llm"):
+                response = await self.llm.ainvoke(messages)
+            record_tokens(getattr(response, "usage_metadata", None))
             
             logger.info("Summary generated successfully")
             return response.content
@@ -71,6 +197,28 @@ class SummaryAgent:
             logger.error(f"Error in summarization: {str(e)}")
             raise
     
+    async def stream_summary(self, query: str, search_results: List[Dict[str, Any]],
+                             cached_answer: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """검색 결과를 바탕으로 요약을 생성하면서 토큰 조각을 순서대로 반환합니다."""
+        logger.info(f"Streaming summary for query: {query}")
+        
+        try:
+            # 조각들을 합친 메시지의 usage_metadata로 토큰 수 기록
+            aggregate = None
+            messages = await self._build_messages(query, search_results, cached_answer)
+            with timed("llm"):
+                async for chunk in self.llm.astream(messages):
+                    aggregate = chunk if aggregate is None else aggregate + chunk
+                    if isinstance(chunk.content, str) and chunk.content:
+                        yield chunk.content
+            record_tokens(getattr(aggregate, "usage_metadata", None))
+            
+            logger.info("Summary streamed successfully")
+            
+        except Exception as e:
+            logger.error(f"Error in streaming summarization: {str(e)}")
+            raise
+    
     # 노드 함수 추가 - 이제 이 함수가 그래프의 노드로 사용됨
     async def summarize_results_node(self, state: AgentState) -> AgentState:
         """검색 결과를 요약하는 노드"""
@@ -78,7 +226,7 @@ class SummaryAgent:
         query = state["query"]
         search_results = state["search_results"]
         
-        summary = await self.summarize(query, search_results)
+        summary = await self.summarize(query, search_results, state.get("cached_answer"))
         logger.info(f"검색 최종 결과 : {summary}")
         
         return {"summary": summary}
\ No newline at end of file
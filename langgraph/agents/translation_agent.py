@@ -0,0 +1,52 @@
+import os
+from typing import Optional
+from dotenv import load_dotenv
+from langchain_google_vertexai import ChatVertexAI
+from langchain_core.messages import HumanMessage, SystemMessage
+import vertexai
+from utils.logger import setup_logger
+from utils.metrics import timed, record_tokens
+
+# 로거 설정
+logger = setup_logger("translation_agent")
+
+# .env 파일 로드
+load_dotenv()
+
+# 환경 변수 설정
+VERTEX_PROJECT_ID = os.getenv("VERTEX_PROJECT_ID", "your-project-id")
+VERTEX_LOCATION = os.getenv("VERTEX_LOCATION", "us-central1")
+# 쿼리 번역은 짧은 작업이므로 빠른 모델 사용
+VERTEX_TRANSLATION_MODEL = os.getenv("VERTEX_TRANSLATION_MODEL", "gemini-2.0-flash")
+
+LANGUAGE_NAMES = {"ko": "한국어", "en": "영어"}
+
+class TranslationAgent:
+    """언어 간 검색을 위해 검색 쿼리를 다른 언어로 번역하는 에이전트"""
+
+    def __init__(self, model: Optional[str] = None):
+        # VertexAI 초기화
+        vertexai.init(project=VERTEX_PROJECT_ID, location=VERTEX_LOCATION)
+
+        # LLM 모델 초기화
+        self.model = model or VERTEX_TRANSLATION_MODEL
+        self.llm = ChatVertexAI(
+            model=self.model,
+            temperature=0.0,
+            max_tokens=512,
+            max_retries=2
+        )
+        logger.info(f"TranslationAgent initialized (model: {self.model})")
+
+    async def translate(self, text: str, target_language: str) -> str:
+        """텍스트를 target_language(ko/en)로 번역합니다. 제품명, 코드, 식별자는 그대로 둡니다."""
+        language_name = LANGUAGE_NAMES.get(target_language, target_language)
+        system_message = SystemMessage(
+            content=f"다음 검색 쿼리를 {language_name}로 번역하세요. 제품명, 코드, 식별자는 번역하지 말고 번역문만 출력하세요."
+        )
+        with timed("llm_translate"):
+            response = await self.llm.ainvoke([system_message, HumanMessage(content=text)])
+        record_tokens(getattr(response, "usage_metadata", None))
+        translated = response.content.strip()
+        logger.info(f"Translated query to {target_language}: {translated}")
+        return translated
@@ -1,13 +1,16 @@
 import os
+import json
 import asyncio
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 
 from graphs.builder import GraphBuilder, AgentState
 from utils.logger import setup_logger
+from utils.metrics import metrics, trace_request
 
 # 로거 설정
 logger = setup_logger("app")
@@ -15,13 +18,35 @@ logger = setup_logger("app")
 # .env 파일 로드
 load_dotenv()
 
+# 배치 검색 설정
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "250"))
+SEARCH_BATCH_CONCURRENCY = int(os.getenv("SEARCH_BATCH_CONCURRENCY", "4"))
+
 # Pydantic 모델 정의
 class QueryRequest(BaseModel):
     query: str
+    # 검색(임베딩)에 사용할 축약 쿼리. 없으면 query를 그대로 사용
+    search_query: Optional[str] = None
+    # 사용할 그래프 변형 이름 (GRAPH_VARIANTS에 정의)
+    variant: str = "default"
+
+class BatchQueryItem(BaseModel):
+    query: str
+    search_query: Optional[str] = None
+
+class BatchQueryRequest(BaseModel):
+    queries: List[BatchQueryItem]
+    variant: str = "default"
 
 class QueryResponse(BaseModel):
     query: str
     summary: str
+    # 지식 베이스 버전 (api-server 응답 캐시 무효화에 사용)
+    kb_version: Optional[str] = None
+    # 요청 단위 단계별 소요 시간(ms), LLM 토큰 수, 검색 결과 수
+    timings: Optional[Dict[str, Any]] = None
+    # 라우팅 결과 (skip, fast, pro, 답변 캐시 적중 시 cache, cache_hint / 라우팅을 쓰지 않으면 None)
+    route: Optional[str] = None
 
 # FastAPI 앱 초기화
 app = FastAPI(title="문서 검색 및 요약 API")
@@ -41,16 +66,38 @@ graph_builder = GraphBuilder()
 @app.on_event("startup")
 async def startup_event():
     logger.info("Starting up the application")
+    # 그래프는 요청마다 만들지 않고 시작 시 한 번만 컴파일
+    graph_builder.compile_all()
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down the application")
+    graph_builder.search_agent.close()
 
 # 기본 루트 엔드포인트
 @app.get("/")
 async def root():
     return {"message": "문서 검색 및 요약 API에 오신 것을 환영합니다"}
 
+# 지표 엔드포인트
+@app.get("/metrics")
+async def metrics_endpoint():
+    """단계별 지연 시간, 토큰 수, 캐시 적중률 등 운영 지표를 반환합니다."""
+    embedding_cache = graph_builder.search_agent.embedding_cache
+    embedding_batcher = graph_builder.search_agent.embedding_batcher
+    return {
+        "pipeline": metrics.get_stats(),
+        "embedding_cache": embedding_cache.get_stats() if embedding_cache else None,
+        "embedding_batcher": embedding_batcher.get_stats() if embedding_batcher else None,
+        "answer_cache": graph_builder.answer_cache_agent.cache.get_stats()
+    }
+
+# 지식 베이스 버전 엔드포인트
+@app.get("/version")
+async def version_endpoint():
+    """현재 지식 베이스 버전을 반환합니다 (api-server가 응답 캐시 적중 전에 확인)."""
+    return {"kb_version": await graph_builder.search_agent.refresh_kb_version()}
+
 # 검색 엔드포인트
 @app.post("/search", response_model=QueryResponse)
 async def search_endpoint(request: QueryRequest):
@@ -60,22 +107,120 @@ async def search_endpoint(request: QueryRequest):
     try:
         logger.info(f"Received search request: {request.query}")
         
-        # 그래프 생성
-        graph = graph_builder.build_graph()
+        # 컴파일해 둔 그래프 사용
+        try:
+            graph = graph_builder.get_graph(request.variant)
+        except KeyError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         # 초기 상태 설정
-        initial_state = {"query": request.query, "search_results": [], "summary": ""}
+        initial_state = {
+            "query": request.query,
+            "search_query": request.search_query or request.query,
+            "search_results": [],
+            "branch_results": [],
+            "route": "",
+            "cached_answer": None,
+            "summary": ""
+        }
         
-        # 그래프 실행 (비동기)
-        result = await graph.ainvoke(initial_state)
+        # 그래프 실행 (비동기, 노드/외부 호출별 소요 시간 기록)
+        with trace_request() as trace:
+            result = await graph.ainvoke(initial_state)
+        timings = trace.to_dict()
         
-        logger.info(f"Search completed for query: {request.query}")
-        return {"query": request.query, "summary": result["summary"]}
+        logger.info(f"Search completed for query: {request.query} ({timings})")
+        return {
+            "query": request.query,
+            "summary": result["summary"],
+            "kb_version": graph_builder.search_agent.kb_version,
+            "timings": timings,
+            "route": result.get("route") or None
+        }
     
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 스트리밍 검색 엔드포인트
+@app.post("/search/stream")
+async def search_stream_endpoint(request: QueryRequest):
+    """
+    쿼리에 기반하여 문서를 검색하고 요약을 SSE(server-sent events)로 스트리밍하는 엔드포인트
+
+    이벤트 순서: sources(출처 문서 경로) -> token(요약 조각, 여러 번) -> done
+    도중에 실패하면 error 이벤트를 보내고 스트림을 닫습니다.
+    """
+    logger.info(f"Received streaming search request: {request.query}")
+    
+    try:
+        graph_builder.get_variant_options(request.variant)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def stream_events():
+        try:
+            async for event in graph_builder.stream_search(
+                request.query, request.search_query or request.query, request.variant
+            ):
+                yield format_sse(event["event"], event["data"])
+            logger.info(f"Streaming search completed for query: {request.query}")
+        except Exception as e:
+            logger.error(f"Error processing streaming request: {str(e)}")
+            yield format_sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        stream_events(),
+        media_type="text/event-stream",
+        # 프록시가 버퍼링하지 않도록 설정
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 배치 검색 엔드포인트
+@app.post("/search/batch")
+async def search_batch_endpoint(request: BatchQueryRequest):
+    """
+    여러 쿼리를 한 번에 검색하고, 요약이 끝나는 순서대로 NDJSON으로 스트리밍하는 엔드포인트
+
+    각 줄은 {"index", "query", "summary", "kb_version"} 또는 {"index", "query", "error"} 형태입니다.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="queries must not be empty")
+    if len(request.queries) > SEARCH_BATCH_MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"Too many queries (max {SEARCH_BATCH_MAX_QUERIES})")
+    
+    queries = [item.query for item in request.queries]
+    search_queries = [item.search_query or item.query for item in request.queries]
+    logger.info(f"Received batch search request: {len(queries)} queries")
+    
+    try:
+        # 검색은 스트리밍 전에 한 번에 수행 (쿼리별 실패는 해당 줄의 error로 전달)
+        search_results = await graph_builder.search_batch(search_queries, request.variant)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error processing batch request: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    kb_version = graph_builder.search_agent.kb_version
+    
+    async def stream_results():
+        async for result in graph_builder.summarize_batch(
+            queries, search_results, request.variant, concurrency=SEARCH_BATCH_CONCURRENCY,
+            search_queries=search_queries
+        ):
+            if "error" not in result:
+                result["kb_version"] = kb_version
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+        logger.info(f"Batch search completed: {len(queries)} queries")
+    
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
 # 메인 실행 부분
 if __name__ == "__main__":
     import uvicorn
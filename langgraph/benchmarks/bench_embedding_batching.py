@@ -0,0 +1,63 @@
+"""
+쿼리 임베딩 마이크로 배칭 처리량 벤치마크
+
+Vertex AI 임베딩 호출을 "요청당 고정 지연 + 텍스트당 추가 지연"을 갖는 로컬 대체 구현으로 바꾸고,
+동시 요청 수에 따라 요청마다 개별 호출하는 방식(direct)과 EmbeddingBatcher(batched)의 처리량을 비교합니다.
+실제 API처럼 동시에 처리할 수 있는 호출 수(BENCH_MAX_INFLIGHT)를 제한합니다.
+
+실행: langgraph 디렉토리에서 python benchmarks/bench_embedding_batching.py
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.embedding_batcher import EmbeddingBatcher
+
+CALL_LATENCY = float(os.getenv("BENCH_CALL_LATENCY", "0.05"))
+PER_TEXT_LATENCY = float(os.getenv("BENCH_PER_TEXT_LATENCY", "0.0002"))
+MAX_INFLIGHT = int(os.getenv("BENCH_MAX_INFLIGHT", "8"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "512"))
+CONCURRENCY_LEVELS = [1, 8, 32, 128]
+
+class LocalEmbeddingAPI:
+    def __init__(self):
+        self.inflight = asyncio.Semaphore(MAX_INFLIGHT)
+        self.calls = 0
+
+    async def embed_texts(self, texts):
+        async with self.inflight:
+            self.calls += 1
+            await asyncio.sleep(CALL_LATENCY + PER_TEXT_LATENCY * len(texts))
+            return [[0.1] * 768 for _ in texts]
+
+async def measure(embed_one, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await embed_one(f"query {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start)
+
+async def main():
+    print(f"{REQUESTS} requests, call {CALL_LATENCY * 1000:.0f} ms + {PER_TEXT_LATENCY * 1000:.1f} ms/text, "
+          f"max {MAX_INFLIGHT} concurrent API calls")
+    for concurrency in CONCURRENCY_LEVELS:
+        direct_api = LocalEmbeddingAPI()
+        direct = await measure(lambda text: direct_api.embed_texts([text]), concurrency)
+
+        batched_api = LocalEmbeddingAPI()
+        batcher = EmbeddingBatcher(batched_api.embed_texts, max_batch_size=250, max_wait_ms=5)
+        batched = await measure(batcher.embed, concurrency)
+
+        print(f"concurrency {concurrency:>3}: direct {direct:8.1f} req/s ({direct_api.calls} calls) | "
+              f"batched {batched:8.1f} req/s ({batched_api.calls} calls, "
+              f"avg batch {batcher.get_stats()['avg_batch_size']})")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,66 @@
+"""
+요청당 그래프 오버헤드 측정 벤치마크
+
+요청마다 StateGraph를 새로 만들고 컴파일하던 방식(before)과
+시작 시 한 번 컴파일한 그래프를 재사용하는 방식(after)을 비교합니다.
+Vertex AI / Milvus 호출 없이 그래프 자체의 오버헤드만 보기 위해
+즉시 반환하는 로컬 에이전트를 사용합니다.
+
+실행: langgraph 디렉토리에서 python benchmarks/bench_graph_compile.py
+"""
+import os
+import sys
+import time
+import asyncio
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from graphs.builder import GraphBuilder
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", "200"))
+
+class LocalSearchAgent:
+    async def search_documents_node(self, state, top_k=20):
+        return {"search_results": []}
+
+class LocalSummaryAgent:
+    model = "local"
+    max_tokens = 65535
+
+    async def summarize_results_node(self, state):
+        return {"summary": "ok"}
+
+def make_builder() -> GraphBuilder:
+    # 외부 서비스에 연결하지 않도록 __init__을 거치지 않고 로컬 에이전트를 주입
+    builder = GraphBuilder.__new__(GraphBuilder)
+    builder.search_agent = LocalSearchAgent()
+    builder.summary_agent = LocalSummaryAgent()
+    builder.summary_agents = {("local", 65535): builder.summary_agent}
+    # 답변 캐시/라우팅 노드 없이 검색 -> 요약 그래프의 오버헤드만 측정
+    builder.variants = {"default": {"routing": False, "answer_cache": False}}
+    builder._compiled_graphs = {}
+    return builder
+
+async def run(label, get_graph):
+    initial_state = {"query": "q", "search_query": "q", "search_results": [], "summary": ""}
+    durations = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        graph = get_graph()
+        await graph.ainvoke(initial_state)
+        durations.append((time.perf_counter() - start) * 1000)
+
+    durations.sort()
+    print(f"{label:<28} mean {statistics.mean(durations):7.3f} ms | "
+          f"p50 {durations[len(durations) // 2]:7.3f} ms | "
+          f"p95 {durations[int(len(durations) * 0.95)]:7.3f} ms")
+
+async def main():
+    builder = make_builder()
+    print(f"{ITERATIONS} iterations per mode")
+    await run("before: build per request", lambda: builder.build_graph(routing=False, answer_cache=False))
+    await run("after: compiled once", lambda: builder.get_graph("default"))
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,70 @@
+"""
+/search 검색 경로 동시성 벤치마크
+
+Vertex AI 임베딩과 Milvus 하이브리드 검색을 고정 지연을 갖는 로컬 대체 구현으로 바꾸고,
+동시 요청 수에 따른 처리량을 비교합니다.
+  - before: 이벤트 루프에서 동기 임베딩/Milvus 호출 (이전 구현과 동일한 호출 방식)
+  - after : SearchAgent.hybrid_search (비동기 임베딩 + 스레드 풀 Milvus 호출)
+
+실행: langgraph 디렉토리에서 python benchmarks/bench_search_concurrency.py
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 검색 경로 자체를 비교하기 위해 쿼리 임베딩 캐시는 끔
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+
+from agents.search_agent import SearchAgent
+
+EMBEDDING_LATENCY = float(os.getenv("BENCH_EMBEDDING_LATENCY", "0.05"))
+MILVUS_LATENCY = float(os.getenv("BENCH_MILVUS_LATENCY", "0.02"))
+REQUESTS = int(os.getenv("BENCH_REQUESTS", "64"))
+CONCURRENCY_LEVELS = [1, 8, 32]
+
+class LocalEmbedding:
+    def __init__(self, values):
+        self.values = values
+
+class LocalEmbeddingModel:
+    def get_embeddings(self, texts):
+        time.sleep(EMBEDDING_LATENCY)
+        return [LocalEmbedding([0.1] * 768) for _ in texts]
+
+    async def get_embeddings_async(self, texts):
+        await asyncio.sleep(EMBEDDING_LATENCY)
+        return [LocalEmbedding([0.1] * 768) for _ in texts]
+
+class LocalMilvusClient:
+    def hybrid_search(self, collection_name, reqs, ranker, limit=10, output_fields=None, **kwargs):
+        time.sleep(MILVUS_LATENCY)
+        return [[]]
+
+async def blocking_search(agent: SearchAgent, query: str):
+    # 이전 구현: async 함수 안에서 동기 호출
+    agent.embedding_model.get_embeddings([query])
+    agent.milvus_client.hybrid_search(collection_name="bench", reqs=[], ranker=None)
+
+async def measure(search, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await search(f"query {i}")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(REQUESTS)))
+    return REQUESTS / (time.perf_counter() - start)
+
+async def main():
+    agent = SearchAgent(embedding_model=LocalEmbeddingModel(), milvus_client=LocalMilvusClient())
+    print(f"{REQUESTS} requests, embedding {EMBEDDING_LATENCY * 1000:.0f} ms, milvus {MILVUS_LATENCY * 1000:.0f} ms")
+    for concurrency in CONCURRENCY_LEVELS:
+        before = await measure(lambda q: blocking_search(agent, q), concurrency)
+        after = await measure(agent.hybrid_search, concurrency)
+        print(f"concurrency {concurrency:>3}: before {before:7.1f} req/s | after {after:7.1f} req/s")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,41 +1,368 @@
-from typing import TypedDict, List, Annotated, Dict, Any
+from typing import TypedDict, List, Annotated, Dict, Any, Optional, AsyncIterator
 import operator
+import os
+import json
+import asyncio
 from langgraph.graph import StateGraph, START, END
 from agents.search_agent import SearchAgent
-from agents.summary_agent import SummaryAgent
+from agents.summary_agent import SummaryAgent, VERTEX_FAST_LLM_MODEL
+from agents.translation_agent import TranslationAgent
+from agents.router_agent import (
+    RouterAgent, ROUTING_ENABLED, ROUTE_SKIP, ROUTE_FAST, ROUTE_PRO,
+    ROUTE_SKIP_REPLY, ROUTE_FAST_MAX_TOKENS, ROUTE_PRO_MAX_TOKENS
+)
+from agents.answer_cache_agent import AnswerCacheAgent, ANSWER_CACHE_ENABLED, ROUTE_CACHE, ROUTE_CACHE_HINT
 from utils.logger import setup_logger
+from utils.metrics import timed, trace_request
 
 # 로거 설정
 logger = setup_logger("graph_builder")
 
+# 기본 검색 결과 수
+DEFAULT_TOP_K = 20
+# 언어 간 검색 변형에서 병렬로 검색할 문서 언어
+CROSS_LINGUAL_LANGUAGES = [language.strip() for language in os.getenv("CROSS_LINGUAL_LANGUAGES", "ko,en").split(",") if language.strip()]
+
+def load_graph_variants() -> Dict[str, Dict[str, Any]]:
+    """GRAPH_VARIANTS 환경 변수(JSON)에서 이름별 그래프 옵션(top_k, llm_model, cross_lingual, translate, routing, answer_cache)을 읽습니다.
+
+    예: {"fast": {"top_k": 8, "llm_model": "gemini-2.0-flash"}}
+    기본 제공 변형 "cross_lingual"은 언어별 검색을 병렬로 실행하고 RRF로 합칩니다.
+    """
+    variants = {"default": {}, "cross_lingual": {"cross_lingual": True}}
+    raw = os.getenv("GRAPH_VARIANTS", "").strip()
+    if raw:
+        try:
+            variants.update(json.loads(raw))
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid GRAPH_VARIANTS: {str(e)}")
+    return variants
+
 # 상태 정의 (TypedDict 사용)
 class AgentState(TypedDict):
     query: str
+    search_query: str
     search_results: Annotated[List[Dict[str, Any]], operator.add]
+    # 언어 간 검색 변형에서 분기별 검색 결과 (fuse 노드가 search_results로 합침)
+    branch_results: Annotated[List[List[Dict[str, Any]]], operator.add]
+    # 라우팅 결과 (skip, fast, pro, 답변 캐시 적중 시 cache, cache_hint)
+    route: str
+    # 답변 캐시에서 찾은 비슷한 이전 질문의 답변
+    cached_answer: Optional[Dict[str, Any]]
     summary: str
 
+def add_timed_node(graph_builder: StateGraph, name: str, node):
+    """노드 실행 시간을 node.<이름> 단계로 기록하도록 감싸서 그래프에 추가합니다."""
+    async def timed_node(state: AgentState) -> AgentState:
+        with timed(f"node.{name}"):
+            return await node(state)
+    graph_builder.add_node(name, timed_node)
+
 class GraphBuilder:
     """검색 및 요약 그래프를 구축하는 클래스"""
     
     def __init__(self):
         self.search_agent = SearchAgent()
         self.summary_agent = SummaryAgent()
+        # (모델, 최대 출력 토큰)별 요약 에이전트 (변형 그래프나 라우팅 단계에서 다른 모델/상한을 쓰는 경우)
+        self.summary_agents: Dict[tuple, SummaryAgent] = {
+            (self.summary_agent.model, self.summary_agent.max_tokens): self.summary_agent
+        }
+        self.router_agent = RouterAgent()
+        self.answer_cache_agent = AnswerCacheAgent(self.search_agent)
+        # 번역 분기를 쓰는 변형이 있을 때만 생성
+        self.translation_agent: Optional[TranslationAgent] = None
+        # 변형 이름 -> 컴파일된 그래프
+        self.variants = load_graph_variants()
+        self._compiled_graphs: Dict[str, Any] = {}
         logger.info("GraphBuilder initialized")
     
-    def build_graph(self):
-        """검색 및 요약 그래프 생성"""
-        logger.info("Building graph")
+    def _get_summary_agent(self, llm_model: Optional[str], max_tokens: Optional[int] = None) -> SummaryAgent:
+        key = (llm_model or self.summary_agent.model, max_tokens or self.summary_agent.max_tokens)
+        if key not in self.summary_agents:
+            self.summary_agents[key] = SummaryAgent(model=key[0], max_tokens=key[1])
+        return self.summary_agents[key]
+    
+    def _get_routed_summary_agent(self, route: str, llm_model: Optional[str]) -> Optional[SummaryAgent]:
+        """라우팅 결과에 맞는 요약 에이전트 (skip이면 None)"""
+        if route == ROUTE_SKIP:
+            return None
+        if route == ROUTE_FAST:
+            return self._get_summary_agent(VERTEX_FAST_LLM_MODEL, ROUTE_FAST_MAX_TOKENS)
+        return self._get_summary_agent(llm_model, ROUTE_PRO_MAX_TOKENS)
+    
+    def _select_summary_agent(self, query: str, search_results: List[Any], options: Dict[str, Any]) -> tuple:
+        """변형 옵션에 따라 라우팅하고 (라우팅 결과, 요약 에이전트 또는 None)을 반환합니다."""
+        if not options.get("routing", ROUTING_ENABLED):
+            return None, self._get_summary_agent(options.get("llm_model"))
+        route = self.router_agent.decide(query, search_results)["route"]
+        return route, self._get_routed_summary_agent(route, options.get("llm_model"))
+    
+    async def _lookup_answer(self, search_query: str, variant: str, options: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """변형 옵션에서 답변 캐시를 쓰면 같은 변형의 비슷한 이전 질문 답변을 찾습니다 (그래프 밖 경로용)."""
+        if not options.get("answer_cache", ANSWER_CACHE_ENABLED):
+            return None
+        with timed("node.answer_cache"):
+            return await self.answer_cache_agent.lookup(search_query, variant, options.get("routing", ROUTING_ENABLED))
+    
+    async def _store_answer(self, search_query: str, answer: str, search_results: List[Any],
+                            route: Optional[str], variant: str, options: Dict[str, Any]):
+        # 정해진 답변(skip)은 저장하지 않음
+        if not options.get("answer_cache", ANSWER_CACHE_ENABLED) or route == ROUTE_SKIP:
+            return
+        with timed("node.cache_answer"):
+            await self.answer_cache_agent.store(search_query, answer, search_results, variant, route)
+    
+    def _get_translation_agent(self) -> TranslationAgent:
+        if self.translation_agent is None:
+            self.translation_agent = TranslationAgent()
+        return self.translation_agent
+    
+    async def retrieve(self, search_query: str, top_k: int = DEFAULT_TOP_K, cross_lingual: bool = False,
+                       translate: bool = False, routing: bool = ROUTING_ENABLED, **_) -> List[List[Dict[str, Any]]]:
+        """그래프 없이 변형 옵션대로 검색합니다 (스트리밍 경로용). 언어 간 검색이면 분기를 병렬 실행 후 합칩니다."""
+        if not cross_lingual:
+            return await self.search_agent.hybrid_search(search_query, top_k=top_k, with_similarity=routing)
+        
+        state = {"query": search_query, "search_query": search_query}
+        branches = [self.search_agent.search_language_node(state, language, top_k=top_k, with_similarity=routing)
+                    for language in CROSS_LINGUAL_LANGUAGES]
+        if translate:
+            branches.append(self.search_agent.search_translated_node(
+                state, self._get_translation_agent().translate, CROSS_LINGUAL_LANGUAGES, top_k=top_k, with_similarity=routing
+            ))
+        branch_results = [hits for update in await asyncio.gather(*branches) for hits in update["branch_results"]]
+        return (await self.search_agent.fuse_results_node({"branch_results": branch_results}, top_k=top_k))["search_results"]
+    
+    def get_graph(self, variant: str = "default"):
+        """컴파일된 그래프를 반환합니다. 변형별로 처음 요청될 때 한 번만 컴파일합니다."""
+        if variant not in self._compiled_graphs:
+            if variant not in self.variants:
+                raise KeyError(f"Unknown graph variant: {variant}")
+            self._compiled_graphs[variant] = self.build_graph(variant=variant, **self.variants[variant])
+            logger.info(f"Graph variant '{variant}' compiled")
+        return self._compiled_graphs[variant]
+    
+    def compile_all(self):
+        """설정된 모든 그래프 변형을 미리 컴파일합니다 (서버 시작 시 호출)."""
+        for variant in self.variants:
+            self.get_graph(variant)
+    
+    def get_variant_options(self, variant: str = "default") -> Dict[str, Any]:
+        if variant not in self.variants:
+            raise KeyError(f"Unknown graph variant: {variant}")
+        return self.variants[variant]
+    
+    async def search_batch(self, search_queries: List[str], variant: str = "default") -> List[Any]:
+        """여러 쿼리를 한 번에 검색합니다 (임베딩 배치 호출 1회 + 다중 벡터 하이브리드 검색).
+
+        실패한 쿼리 자리에는 예외 객체가 들어갑니다.
+        """
+        options = self.get_variant_options(variant)
+        # 라우팅하는 변형만 결과 유사도를 계산 (Milvus에서 결과마다 밀집 벡터를 가져오므로)
+        return await self.search_agent.hybrid_search_batch(
+            search_queries,
+            top_k=options.get("top_k", DEFAULT_TOP_K),
+            with_similarity=options.get("routing", ROUTING_ENABLED)
+        )
+    
+    async def stream_search(self, query: str, search_query: str, variant: str = "default") -> AsyncIterator[Dict[str, Any]]:
+        """검색 후 출처 정보를 먼저 반환하고, 이어서 요약 토큰을 생성되는 대로 반환합니다.
+
+        ("sources", {...}) -> ("token", {...}) ... -> ("done", {...}) 순서의 이벤트를 냅니다.
+        """
+        options = self.get_variant_options(variant)
+        
+        with trace_request() as trace:
+            cached_answer = await self._lookup_answer(search_query, variant, options)
+            if cached_answer is not None:
+                # 답변 캐시 적중: 검색 생략
+                search_results = []
+                route = self.answer_cache_agent.cached_route()
+                sources = cached_answer["sources"]
+                summary_agent = self._get_routed_summary_agent(ROUTE_FAST, options.get("llm_model"))
+            else:
+                with timed("node.search"):
+                    search_results = await self.retrieve(search_query, **options)
+                route, summary_agent = self._select_summary_agent(query, search_results, options)
+                sources = self.search_agent.source_paths(search_results)
+            yield {"event": "sources", "data": {
+                "query": query,
+                "sources": sources,
+                "kb_version": self.search_agent.kb_version,
+                "route": route
+            }}
+            
+            if route == ROUTE_CACHE:
+                yield {"event": "token", "data": {"text": cached_answer["answer"]}}
+            elif summary_agent is None:
+                yield {"event": "token", "data": {"text": ROUTE_SKIP_REPLY}}
+            else:
+                chunks = []
+                async for text in summary_agent.stream_summary(query, search_results, cached_answer):
+                    chunks.append(text)
+                    yield {"event": "token", "data": {"text": text}}
+                if cached_answer is None:
+                    await self._store_answer(search_query, "".join(chunks), search_results, route, variant, options)
+            
+            yield {"event": "done", "data": {"query": query, "route": route, "timings": trace.to_dict()}}
+    
+    async def summarize_batch(self, queries: List[str], search_results: List[Any],
+                              variant: str = "default", concurrency: int = 4,
+                              search_queries: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """검색 결과별 요약을 최대 concurrency개씩 동시에 실행하고 끝나는 순서대로 반환합니다.
+
+        search_queries가 있으면 답변 캐시에서 비슷한 이전 질문을 먼저 찾고, 새로 만든 답변을 저장합니다.
+        검색에 실패한 쿼리(예외 객체)는 요약하지 않고 그 쿼리의 error 결과만 반환합니다.
+        """
+        options = self.get_variant_options(variant)
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def summarize(index: int) -> Dict[str, Any]:
+            if isinstance(search_results[index], Exception):
+                return {"index": index, "query": queries[index], "error": str(search_results[index])}
+            async with semaphore:
+                # 검색은 배치 전체가 공유하므로 요약 단계만 쿼리별로 기록
+                with trace_request() as trace:
+                    try:
+                        cached_answer = None
+                        if search_queries is not None:
+                            cached_answer = await self._lookup_answer(search_queries[index], variant, options)
+                        if cached_answer is not None:
+                            route = self.answer_cache_agent.cached_route()
+                            summary = cached_answer["answer"]
+                            if route == ROUTE_CACHE_HINT:
+                                summary = await self._get_routed_summary_agent(ROUTE_FAST, options.get("llm_model")).summarize(
+                                    queries[index], [search_results[index]], cached_answer
+                                )
+                        else:
+                            route, summary_agent = self._select_summary_agent(queries[index], [search_results[index]], options)
+                            if summary_agent is None:
+                                summary = ROUTE_SKIP_REPLY
+                            else:
+                                summary = await summary_agent.summarize(queries[index], [search_results[index]])
+                            if search_queries is not None:
+                                await self._store_answer(search_queries[index], summary, [search_results[index]], route, variant, options)
+                        return {"index": index, "query": queries[index], "summary": summary, "route": route,
+                                "timings": trace.to_dict()}
+                    except Exception as e:
+                        return {"index": index, "query": queries[index], "error": str(e)}
+        
+        tasks = [asyncio.create_task(summarize(i)) for i in range(len(queries))]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # 클라이언트 연결이 끊기면 남은 요약 작업 취소
+            for task in tasks:
+                task.cancel()
+    
+    def build_graph(self, top_k: int = DEFAULT_TOP_K, llm_model: Optional[str] = None,
+                    cross_lingual: bool = False, translate: bool = False, routing: bool = ROUTING_ENABLED,
+                    answer_cache: bool = ANSWER_CACHE_ENABLED, variant: str = "default"):
+        """검색 및 요약 그래프 생성
+
+        routing이면 검색과 요약 사이에 route 노드를 두고 결과에 따라 skip(정해진 답변),
+        summarize_fast(빠른 모델), summarize(기본 모델) 중 하나로 진행합니다.
+
+        answer_cache면 시작에 answer_cache 노드를 두고 비슷한 이전 질문의 답변이 있으면
+        검색과 요약을 생략합니다 (return 모드는 바로 종료, hint 모드는 answer_hint 노드에서 빠른 모델로 답변).
+        새로 생성한 답변은 cache_answer 노드에서 저장합니다. 캐시 항목은 variant와 라우팅 경로별로 나뉩니다.
+
+        cross_lingual이면 search 노드 대신 언어별 검색 분기(search_ko, search_en, ...)와
+        선택적으로 번역 쿼리 분기(search_translated)를 병렬로 실행하고 fuse 노드에서 RRF로 합칩니다.
+        분기들은 같은 단계에서 동시에 실행되므로 검색 지연은 가장 느린 분기와 같습니다.
+        """
+        logger.info(f"Building graph (top_k={top_k}, llm_model={llm_model or 'default'}, cross_lingual={cross_lingual}, translate={translate}, routing={routing}, answer_cache={answer_cache})")
+        search_agent = self.search_agent
+        
         # 그래프 빌더 초기화
         graph_builder = StateGraph(AgentState)
         
         # 노드 추가 (각 에이전트의 노드 함수 사용)
-        graph_builder.add_node("search", self.search_agent.search_documents_node)
-        graph_builder.add_node("summarize", self.summary_agent.summarize_results_node)
+        if routing:
+            add_timed_node(graph_builder, "route", self.router_agent.route_node)
+            add_timed_node(graph_builder, "skip", self.router_agent.skip_node)
+            add_timed_node(graph_builder, "summarize_fast", self._get_routed_summary_agent(ROUTE_FAST, llm_model).summarize_results_node)
+            add_timed_node(graph_builder, "summarize", self._get_routed_summary_agent(ROUTE_PRO, llm_model).summarize_results_node)
+            # 검색 결과를 받는 노드
+            retrieval_exit = "route"
+            answer_nodes = ["summarize_fast", "summarize"]
+        else:
+            add_timed_node(graph_builder, "summarize", self._get_summary_agent(llm_model).summarize_results_node)
+            retrieval_exit = "summarize"
+            answer_nodes = ["summarize"]
+        
+        if cross_lingual:
+            branches = []
+            for language in CROSS_LINGUAL_LANGUAGES:
+                async def search_language(state: AgentState, language: str = language) -> AgentState:
+                    return await search_agent.search_language_node(state, language, top_k=top_k, with_similarity=routing)
+                add_timed_node(graph_builder, f"search_{language}", search_language)
+                branches.append(f"search_{language}")
+            
+            if translate:
+                translate_query = self._get_translation_agent().translate
+                
+                async def search_translated(state: AgentState) -> AgentState:
+                    return await search_agent.search_translated_node(state, translate_query, CROSS_LINGUAL_LANGUAGES, top_k=top_k,
+                                                                     with_similarity=routing)
+                add_timed_node(graph_builder, "search_translated", search_translated)
+                branches.append("search_translated")
+            
+            async def fuse_node(state: AgentState) -> AgentState:
+                return await search_agent.fuse_results_node(state, top_k=top_k)
+            add_timed_node(graph_builder, "fuse", fuse_node)
+            
+            # 엣지 연결: 시작 -> 분기들(병렬) -> fuse(모든 분기 완료 후) -> summarize
+            retrieval_entries = branches
+            graph_builder.add_edge(branches, "fuse")
+            graph_builder.add_edge("fuse", retrieval_exit)
+        else:
+            async def search_node(state: AgentState) -> AgentState:
+                return await search_agent.search_documents_node(state, top_k=top_k, with_similarity=routing)
+            add_timed_node(graph_builder, "search", search_node)
+            
+            # 엣지 연결
+            retrieval_entries = ["search"]
+            graph_builder.add_edge("search", retrieval_exit)
+        
+        if routing:
+            graph_builder.add_conditional_edges(
+                "route",
+                lambda state: state["route"],
+                {ROUTE_SKIP: "skip", ROUTE_FAST: "summarize_fast", ROUTE_PRO: "summarize"}
+            )
+            graph_builder.add_edge("skip", END)
         
-        # 엣지 연결
-        graph_builder.add_edge(START, "search")
-        graph_builder.add_edge("search", "summarize")
-        graph_builder.add_edge("summarize", END)
+        if answer_cache:
+            answer_cache_agent = self.answer_cache_agent
+            
+            async def answer_cache_node(state: AgentState) -> AgentState:
+                return await answer_cache_agent.lookup_node(state, variant, routing)
+            
+            async def cache_answer_node(state: AgentState) -> AgentState:
+                return await answer_cache_agent.store_node(state, variant)
+            add_timed_node(graph_builder, "answer_cache", answer_cache_node)
+            add_timed_node(graph_builder, "cache_answer", cache_answer_node)
+            add_timed_node(graph_builder, "answer_hint", self._get_routed_summary_agent(ROUTE_FAST, llm_model).summarize_results_node)
+            
+            def after_cache_lookup(state: AgentState):
+                if not state.get("cached_answer"):
+                    return retrieval_entries
+                return "answer_hint" if state["route"] == ROUTE_CACHE_HINT else END
+            
+            graph_builder.add_edge(START, "answer_cache")
+            graph_builder.add_conditional_edges("answer_cache", after_cache_lookup, retrieval_entries + ["answer_hint", END])
+            graph_builder.add_edge("answer_hint", END)
+            for node in answer_nodes:
+                graph_builder.add_edge(node, "cache_answer")
+            graph_builder.add_edge("cache_answer", END)
+        else:
+            for entry in retrieval_entries:
+                graph_builder.add_edge(START, entry)
+            for node in answer_nodes:
+                graph_builder.add_edge(node, END)
         
         # 그래프 컴파일
         return graph_builder.compile()
\ No newline at end of file
@@ -0,0 +1,12 @@
+import os
+import sys
+import tempfile
+
+# Vertex AI / Milvus 없이 실행하도록 설정을 불러오기 전에 로컬 경로와 옵션 지정
+_work_dir = tempfile.mkdtemp(prefix="langgraph-test-")
+os.environ.setdefault("EMBEDDING_CACHE_ENABLED", "false")
+os.environ.setdefault("EMBEDDING_BATCHING_ENABLED", "false")
+os.environ.setdefault("SPARSE_ENCODER_DIR", os.path.join(_work_dir, "sparse-encoder"))
+os.environ.setdefault("LOG_DIR", os.path.join(_work_dir, "log"))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+from agents.answer_cache_agent import AnswerCacheAgent, is_cacheable_answer
+from agents.router_agent import ROUTE_FAST, ROUTE_PRO, ROUTE_SKIP_REPLY
+
+class LocalSearchAgent:
+    kb_version = "kb:v1"
+
+    async def embed_query(self, query):
+        return [1.0] + [0.0] * 767
+
+    def source_paths(self, search_results):
+        return ["docs/reset.md"]
+
+SEARCH_RESULTS = [[{"entity": {"file_path": "docs/reset.md", "content": "reset steps"}}]]
+
+@pytest.mark.parametrize("answer", [
+    "", None, "관련 없음.", ROUTE_SKIP_REPLY,
+    "죄송하지만 검색 결과로는 모르겠습니다.\n다른 질문을 해 주세요.",
+    "검색 결과에서 관련 정보를 찾을 수 없습니다.",
+    "I don't know based on the provided documents."
+])
+def test_unusable_answers_are_not_cached(answer):
+    assert not is_cacheable_answer(answer)
+
+def test_answer_mentioning_not_found_error_is_cached():
+    assert is_cacheable_answer("비밀번호 재설정 방법입니다 [1].\n'파일을 찾을 수 없습니다' 오류가 나면 경로를 확인하세요.")
+
+def test_store_skips_dont_know_answer():
+    agent = AnswerCacheAgent(LocalSearchAgent())
+
+    async def scenario():
+        await agent.store("reset password", "관련 정보를 찾을 수 없습니다.", SEARCH_RESULTS, "default", ROUTE_PRO)
+        return await agent.lookup("reset password", "default", routing=True)
+
+    assert asyncio.run(scenario()) is None
+    assert agent.cache.get_stats()["entries"] == 0
+
+def test_lookup_is_scoped_by_variant_and_route():
+    agent = AnswerCacheAgent(LocalSearchAgent())
+
+    async def scenario():
+        # 빠른 모델 답변은 pro로 갈 요청에 재사용하지 않음
+        await agent.store("reset password", "fast answer [1]", SEARCH_RESULTS, "default", ROUTE_FAST)
+        fast_only = await agent.lookup("reset password", "default", routing=True)
+        await agent.store("reset password", "pro answer [1]", SEARCH_RESULTS, "default", ROUTE_PRO)
+        same_variant = await agent.lookup("reset password", "default", routing=True)
+        other_variant = await agent.lookup("reset password", "cross_lingual", routing=True)
+        without_routing = await agent.lookup("reset password", "default", routing=False)
+        return fast_only, same_variant, other_variant, without_routing
+
+    fast_only, same_variant, other_variant, without_routing = asyncio.run(scenario())
+
+    assert fast_only is None
+    assert same_variant["answer"] == "pro answer [1]"
+    assert other_variant is None
+    assert without_routing is None
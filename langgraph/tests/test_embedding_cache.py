@@ -0,0 +1,73 @@
+import json
+import os
+
+import pytest
+
+from utils.embedding_cache import EmbeddingCache
+
+DIM = 8
+
+def open_cache(cache_dir, capacity=4):
+    return EmbeddingCache(cache_dir=str(cache_dir), dim=DIM, capacity=capacity, memory_size=2)
+
+def vector(seed):
+    return [float(seed * DIM + i) for i in range(DIM)]
+
+def test_vectors_round_trip_after_reopen(tmp_path):
+    cache = open_cache(tmp_path)
+    keys = [EmbeddingCache.make_key("model", f"query {i}") for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.put(key, vector(i))
+    cache.close()
+
+    reopened = open_cache(tmp_path)
+    assert [reopened.get(key) for key in keys] == [vector(i) for i in range(3)]
+    assert reopened.get_stats()["disk_hits"] == 3
+    reopened.close()
+
+def test_ring_buffer_drops_oldest_key_after_reopen(tmp_path):
+    cache = open_cache(tmp_path, capacity=2)
+    for i in range(3):
+        cache.put(f"key{i}", vector(i))
+    cache.close()
+
+    reopened = open_cache(tmp_path, capacity=2)
+    assert reopened.get("key0") is None
+    assert reopened.get("key1") == vector(1)
+    assert reopened.get("key2") == vector(2)
+    reopened.close()
+
+def test_second_process_cannot_share_directory(tmp_path):
+    cache = open_cache(tmp_path)
+    with pytest.raises(RuntimeError):
+        open_cache(tmp_path)
+    cache.close()
+
+    # 잠금을 해제하면 다시 열 수 있음
+    open_cache(tmp_path).close()
+
+def test_index_vector_mismatch_fails_loudly(tmp_path):
+    cache = open_cache(tmp_path)
+    cache.put("key0", vector(0))
+    cache.close()
+
+    index_path = os.path.join(tmp_path, "index.json")
+    with open(index_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["index"]["other"] = meta["index"]["key0"]
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    with pytest.raises(ValueError):
+        open_cache(tmp_path)
+    # 실패한 경우에도 잠금은 해제됨
+    open_cache(tmp_path, capacity=8).close()
+
+def test_memory_only_cache_skips_disk(tmp_path):
+    cache = EmbeddingCache(cache_dir=None, dim=DIM, capacity=4, memory_size=2)
+    cache.put("key0", vector(0))
+    cache.flush()
+
+    assert cache.get("key0") == vector(0)
+    assert cache.get_stats()["disk_entries"] == 0
+    assert os.listdir(tmp_path) == []
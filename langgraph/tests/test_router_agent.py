@@ -0,0 +1,32 @@
+import pytest
+
+from agents.router_agent import (
+    RouterAgent, ROUTE_SKIP, ROUTE_FAST, ROUTE_PRO,
+    ROUTE_SKIP_SIMILARITY, ROUTE_FAST_SIMILARITY, ROUTE_FAST_MAX_QUERY_TOKENS
+)
+
+SHORT_QUERY = "How do I reset my password"
+# 영문 4문자 ≈ 1토큰이므로 ROUTE_FAST_MAX_QUERY_TOKENS를 넘는 쿼리
+LONG_QUERY = "word " * (ROUTE_FAST_MAX_QUERY_TOKENS + 10)
+
+def hit(similarity=None, content="reset steps"):
+    result = {"id": 1, "entity": {"file_path": "docs/reset.md", "content": content}}
+    if similarity is not None:
+        result["similarity"] = similarity
+    return result
+
+@pytest.mark.parametrize("name, query, search_results, route", [
+    ("no results", SHORT_QUERY, [[]], ROUTE_SKIP),
+    ("hits without content", SHORT_QUERY, [[hit(0.9, content="")]], ROUTE_SKIP),
+    ("no similarity", SHORT_QUERY, [[hit()]], ROUTE_PRO),
+    ("below skip threshold", SHORT_QUERY, [[hit(ROUTE_SKIP_SIMILARITY - 0.01)]], ROUTE_SKIP),
+    ("at skip threshold", SHORT_QUERY, [[hit(ROUTE_SKIP_SIMILARITY)]], ROUTE_PRO),
+    ("confident and short", SHORT_QUERY, [[hit(ROUTE_FAST_SIMILARITY)]], ROUTE_FAST),
+    ("confident but long", LONG_QUERY, [[hit(ROUTE_FAST_SIMILARITY)]], ROUTE_PRO),
+    ("between thresholds", SHORT_QUERY, [[hit(ROUTE_FAST_SIMILARITY - 0.01)]], ROUTE_PRO),
+    ("best of several hits", SHORT_QUERY, [[hit(0.1), hit(ROUTE_FAST_SIMILARITY + 0.05)]], ROUTE_FAST),
+])
+def test_decide(name, query, search_results, route):
+    decision = RouterAgent().decide(query, search_results)
+
+    assert decision["route"] == route, name
@@ -0,0 +1,88 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from agents.search_agent import SearchAgent
+from graphs.builder import GraphBuilder
+
+class LocalEmbedding:
+    def __init__(self, values):
+        self.values = values
+
+class LocalEmbeddingModel:
+    async def get_embeddings_async(self, texts):
+        return [LocalEmbedding([0.1] * 768) for _ in texts]
+
+class LocalMilvusClient:
+    def describe_collection(self, collection_name):
+        return {"created_timestamp": 1}
+
+    def hybrid_search(self, collection_name, reqs, ranker, limit=10, output_fields=None, **kwargs):
+        hit = {"id": 1, "distance": 0.5, "entity": {"file_path": "docs/reset.md", "title": "Reset", "content": "reset steps"}}
+        if output_fields and "dense_vector" in output_fields:
+            hit["entity"]["dense_vector"] = [0.1] * 768
+        return [[dict(hit, entity=dict(hit["entity"]))] for _ in reqs[0].data]
+
+class LocalSummaryAgent:
+    model = "local"
+    max_tokens = 65535
+
+    async def summarize(self, query, search_results, cached_answer=None):
+        return f"summary of {query}"
+
+def local_builder_init(self):
+    # 희소 인코더 아티팩트가 없으므로 쿼리별 TF-IDF 경로를 사용
+    self.search_agent = SearchAgent(embedding_model=LocalEmbeddingModel(), milvus_client=LocalMilvusClient())
+    self.summary_agent = LocalSummaryAgent()
+    self.summary_agents = {("local", 65535): self.summary_agent}
+    self.router_agent = None
+    self.answer_cache_agent = None
+    self.translation_agent = None
+    self.variants = {"default": {"routing": False, "answer_cache": False}}
+    self._compiled_graphs = {}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(GraphBuilder, "__init__", local_builder_init)
+    monkeypatch.setattr(GraphBuilder, "compile_all", lambda self: None)
+    import app
+    monkeypatch.setattr(app, "graph_builder", GraphBuilder())
+    with TestClient(app.app) as test_client:
+        yield test_client
+
+def test_failing_query_only_fails_its_own_line(client):
+    # "a"는 TF-IDF 토큰 패턴(2글자 이상)에 걸리지 않아 빈 어휘 오류가 남
+    response = client.post("/search/batch", json={"queries": [
+        {"query": "a"},
+        {"query": "How do I reset my password"}
+    ]})
+
+    assert response.status_code == 200
+    lines = {line["index"]: line for line in map(json.loads, response.text.splitlines())}
+    assert set(lines) == {0, 1}
+    assert "error" in lines[0] and "summary" not in lines[0]
+    assert lines[1]["summary"] == "summary of How do I reset my password"
+    assert "error" not in lines[1]
+
+class RecordingMilvusClient(LocalMilvusClient):
+    def __init__(self):
+        self.output_fields = []
+
+    def hybrid_search(self, collection_name, reqs, ranker, limit=10, output_fields=None, **kwargs):
+        self.output_fields.append(output_fields)
+        return super().hybrid_search(collection_name, reqs, ranker, limit=limit, output_fields=output_fields, **kwargs)
+
+def test_vectors_are_fetched_only_for_routing_searches():
+    milvus_client = RecordingMilvusClient()
+    search_agent = SearchAgent(embedding_model=LocalEmbeddingModel(), milvus_client=milvus_client)
+
+    plain = asyncio.run(search_agent.hybrid_search("How do I reset my password"))
+    routed = asyncio.run(search_agent.hybrid_search("How do I reset my password", with_similarity=True))
+
+    assert "dense_vector" not in milvus_client.output_fields[0]
+    assert "similarity" not in plain[0][0]
+    assert "dense_vector" in milvus_client.output_fields[1]
+    assert routed[0][0]["similarity"] == pytest.approx(1.0)
+    assert "dense_vector" not in routed[0][0]["entity"]
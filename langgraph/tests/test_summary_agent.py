@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from agents.summary_agent import SummaryAgent, is_no_relevant_content, MAP_REDUCE_THRESHOLD_TOKENS
+from utils.context_packer import estimate_tokens
+
+@pytest.mark.parametrize("text", ["관련 없음", "관련 없음.", " '관련 없음' \n", "\"관련없음\"", "**관련 없음**"])
+def test_no_relevant_content_variants_are_detected(text):
+    assert is_no_relevant_content(text)
+
+@pytest.mark.parametrize("text", ["", None, "관련 없음. 다만 [2]에 설치 방법이 있습니다.", "설치 방법은 [1] 참고"])
+def test_partial_with_content_is_kept(text):
+    assert not is_no_relevant_content(text)
+
+class LocalMapLLM:
+    """맵 단계 빠른 모델 대신 묶음마다 정해진 요약을 돌려주고 호출 수를 세는 모델"""
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.calls = 0
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("quota exceeded")
+        return SimpleNamespace(content=f"condensed note {self.calls} [1]", usage_metadata=None)
+
+def local_agent(map_llm):
+    # Vertex AI 초기화 없이 문맥 구성만 확인
+    agent = SummaryAgent.__new__(SummaryAgent)
+    agent.map_llm = map_llm
+    return agent
+
+def search_results(passage_count, words_per_passage):
+    # 근접 중복으로 제거되지 않도록 문단마다 다른 단어 사용
+    return [[
+        {"id": i, "entity": {
+            "file_path": f"docs/page{i}.md",
+            "title": f"Page {i}",
+            "content": " ".join(f"p{i}w{j}" for j in range(words_per_passage))
+        }}
+        for i in range(passage_count)
+    ]]
+
+def user_prompt(messages):
+    return messages[1].content
+
+def test_group_passages_keeps_rank_order_within_budget():
+    passages = [{"tokens": tokens} for tokens in [500, 800, 300, 1600, 100]]
+
+    assert SummaryAgent._group_passages(passages, 1500) == [[1, 2], [3], [4], [5]]
+    assert SummaryAgent._group_passages([], 1500) == []
+
+def test_context_within_budget_is_used_as_is():
+    map_llm = LocalMapLLM()
+    messages = asyncio.run(local_agent(map_llm)._build_messages("question", search_results(2, 50)))
+
+    assert map_llm.calls == 0
+    assert "p0w49" in user_prompt(messages)
+
+def test_context_over_threshold_is_condensed():
+    map_llm = LocalMapLLM()
+    results = search_results(4, 1500)
+    assert sum(estimate_tokens(hit["entity"]["content"]) for hit in results[0]) > MAP_REDUCE_THRESHOLD_TOKENS
+
+    messages = asyncio.run(local_agent(map_llm)._build_messages("question", results))
+
+    assert map_llm.calls == 4
+    assert "condensed note" in user_prompt(messages)
+    assert "p0w1499" not in user_prompt(messages)
+
+def test_failed_map_step_falls_back_to_raw_passages():
+    map_llm = LocalMapLLM(fail=True)
+    messages = asyncio.run(local_agent(map_llm)._build_messages("question", search_results(4, 1500)))
+
+    assert map_llm.calls == 4
+    assert "condensed note" not in user_prompt(messages)
+    assert all(f"p{i}w1499" in user_prompt(messages) for i in range(4))
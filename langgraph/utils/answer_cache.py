@@ -0,0 +1,111 @@
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from utils.logger import setup_logger
+
+# 로거 설정
+logger = setup_logger("answer_cache")
+
+class AnswerCache:
+    """이전 질문/답변 쌍의 의미 기반 캐시.
+
+    (capacity x dim) float32 행렬에 정규화한 쿼리 임베딩을 저장하고, 새 쿼리와의
+    코사인 유사도가 threshold 이상인 가장 가까운 항목을 반환합니다.
+    항목마다 scope(그래프 변형과 답변 경로)를 두고 같은 scope의 항목끼리만 비교합니다.
+    가득 차면 가장 오래 사용하지 않은 항목부터 제거하며, 지식 베이스 버전이
+    바뀌면 이전 버전으로 만든 항목을 모두 제거합니다.
+    """
+
+    def __init__(self, dim: int, capacity: int, threshold: float):
+        self.dim = dim
+        self.capacity = capacity
+        self.threshold = threshold
+        self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._valid = np.zeros(capacity, dtype=bool)
+        self._entries: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._scopes = np.full(capacity, None, dtype=object)
+        # 행 번호 LRU 순서 (앞쪽이 가장 오래 사용하지 않은 항목)
+        self._lru: "OrderedDict[int, None]" = OrderedDict()
+        self._kb_version: Optional[str] = None
+        self.stats = {"hits": 0, "misses": 0, "lru_evictions": 0, "version_evictions": 0}
+
+    def _normalize(self, vector: List[float]) -> Optional[np.ndarray]:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        if array.shape != (self.dim,) or norm == 0:
+            return None
+        return array / norm
+
+    def _nearest(self, vector: np.ndarray, scope: str) -> tuple:
+        """scope가 같은 항목 중 가장 가까운 항목의 (행 번호, 유사도). 항목이 없으면 (None, 0.0)"""
+        candidates = self._valid & (self._scopes == scope)
+        if not candidates.any():
+            return None, 0.0
+        similarity = self._vectors @ vector
+        similarity[~candidates] = -np.inf
+        row = int(np.argmax(similarity))
+        return row, float(similarity[row])
+
+    def _remove(self, row: int):
+        self._valid[row] = False
+        self._entries[row] = None
+        self._scopes[row] = None
+        self._lru.pop(row, None)
+
+    def evict_version(self, kb_version: Optional[str]):
+        """kb_version과 다른 지식 베이스 버전으로 만든 항목을 제거합니다."""
+        if kb_version == self._kb_version:
+            return
+        stale = [row for row in self._lru if self._entries[row]["kb_version"] != kb_version]
+        for row in stale:
+            self._remove(row)
+        self.stats["version_evictions"] += len(stale)
+        if stale:
+            logger.info(f"Evicted {len(stale)} cached answers from knowledge base version {self._kb_version}")
+        self._kb_version = kb_version
+
+    def get(self, vector: List[float], kb_version: Optional[str], scope: str) -> Optional[Dict[str, Any]]:
+        """scope가 같고 유사도가 threshold 이상인 가장 가까운 항목({"query", "answer", "sources", "kb_version", "scope", "similarity"})을 반환합니다."""
+        self.evict_version(kb_version)
+        normalized = self._normalize(vector)
+        row, similarity = self._nearest(normalized, scope) if normalized is not None else (None, 0.0)
+        if row is None or similarity < self.threshold:
+            self.stats["misses"] += 1
+            return None
+
+        self._lru.move_to_end(row)
+        self.stats["hits"] += 1
+        return {**self._entries[row], "similarity": similarity}
+
+    def put(self, vector: List[float], query: str, answer: str, sources: List[str], kb_version: Optional[str], scope: str):
+        """답변을 저장합니다. 같은 scope에 이미 threshold 이상으로 비슷한 항목이 있으면 그 항목을 새 답변으로 바꿉니다."""
+        self.evict_version(kb_version)
+        normalized = self._normalize(vector)
+        if normalized is None:
+            return
+
+        row, similarity = self._nearest(normalized, scope)
+        if row is None or similarity < self.threshold:
+            if len(self._lru) < self.capacity:
+                row = int(np.argmin(self._valid))
+            else:
+                row, _ = self._lru.popitem(last=False)
+                self.stats["lru_evictions"] += 1
+
+        self._vectors[row] = normalized
+        self._valid[row] = True
+        self._entries[row] = {"query": query, "answer": answer, "sources": sources, "kb_version": kb_version, "scope": scope}
+        self._scopes[row] = scope
+        self._lru[row] = None
+        self._lru.move_to_end(row)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "entries": len(self._lru),
+            "kb_version": self._kb_version
+        }
@@ -0,0 +1,168 @@
+import re
+import math
+from typing import Dict, Any, List, Optional
+
+# 한글/한자/가나 문자 (대략 문자당 토큰 1개로 계산)
+CJK_PATTERN = re.compile(r"[\u1100-\u11ff\u3040-\u30ff\u3130-\u318f\u4e00-\u9fff\uac00-\ud7af]")
+WORD_PATTERN = re.compile(r"\w+")
+# 이웃 청크로 판단할 최소 겹침 문자 수 (적재 시 CHUNK_OVERLAP=150)
+MIN_OVERLAP_CHARS = 30
+# 근접 중복 판단에 사용할 단어 n-gram 크기
+SHINGLE_SIZE = 3
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 토큰 수를 추정합니다 (CJK 문자 1개 ≈ 1토큰, 그 외 4문자 ≈ 1토큰)."""
+    if not text:
+        return 0
+    cjk_count = len(CJK_PATTERN.findall(text))
+    return cjk_count + math.ceil((len(text) - cjk_count) / 4)
+
+def flatten_hits(search_results: List[Any]) -> List[Dict[str, Any]]:
+    """Milvus 검색 결과(쿼리별 결과 목록 또는 결과 목록)를 순위 순 문단 목록으로 변환합니다."""
+    hits: List[Any] = []
+    for item in search_results:
+        if isinstance(item, dict):
+            hits.append(item)
+        else:
+            hits.extend(item)
+
+    passages = []
+    for rank, hit in enumerate(hits):
+        entity = hit.get("entity", hit)
+        # 문자 위치로 이어붙일 수 있도록 본문은 자르지 않음
+        content = entity.get("content") or ""
+        if not content.strip():
+            continue
+        passages.append({
+            "rank": rank,
+            "file_path": entity.get("file_path") or "",
+            "title": entity.get("title") or "",
+            "content": content,
+            "chunk_index": entity.get("chunk_index"),
+            "char_start": entity.get("char_start"),
+            "char_end": entity.get("char_end")
+        })
+    return passages
+
+def _has_offsets(passage: Dict[str, Any]) -> bool:
+    return passage["char_start"] is not None and passage["char_end"] is not None
+
+def stitch_by_offsets(passages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """같은 파일에서 문자 위치가 이어지거나 겹치는 청크를 겹친 부분 없이 하나의 문단으로 이어붙입니다.
+
+    이어붙인 문단은 구성 청크 중 가장 높은 순위를 가지며, 결과는 순위 순으로 정렬됩니다.
+    """
+    by_file: Dict[str, List[Dict[str, Any]]] = {}
+    for passage in passages:
+        by_file.setdefault(passage["file_path"], []).append(passage)
+
+    stitched: List[Dict[str, Any]] = []
+    for file_passages in by_file.values():
+        file_passages.sort(key=lambda passage: (passage["char_start"], passage["char_end"]))
+        current = dict(file_passages[0])
+        for passage in file_passages[1:]:
+            if passage["char_start"] <= current["char_end"]:
+                if passage["char_end"] > current["char_end"]:
+                    current["content"] += passage["content"][current["char_end"] - passage["char_start"]:]
+                    current["char_end"] = passage["char_end"]
+                current["rank"] = min(current["rank"], passage["rank"])
+            else:
+                stitched.append(current)
+                current = dict(passage)
+        stitched.append(current)
+
+    return sorted(stitched, key=lambda passage: passage["rank"])
+
+def _merge_overlapping(first: str, second: str) -> Optional[str]:
+    """한 청크의 끝과 다른 청크의 시작이 겹치면 하나로 이어붙인 텍스트를 반환합니다."""
+    if second in first:
+        return first
+    if first in second:
+        return second
+
+    for left, right in ((first, second), (second, first)):
+        max_overlap = min(len(left), len(right))
+        for size in range(max_overlap, MIN_OVERLAP_CHARS - 1, -1):
+            if left.endswith(right[:size]):
+                return left + right[size:]
+    return None
+
+def _shingles(text: str) -> set:
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+def _containment(a: set, b: set) -> float:
+    """작은 쪽 n-gram 집합이 큰 쪽에 포함된 비율 (병합된 긴 문단 안의 청크도 중복으로 판단)"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+def _truncate(text: str, token_budget: int) -> str:
+    tokens = estimate_tokens(text)
+    if tokens <= token_budget:
+        return text
+    keep_chars = max(1, int(len(text) * token_budget / tokens))
+    return text[:keep_chars] + " ..."
+
+def render_passage(index: int, passage: Dict[str, Any]) -> str:
+    header = f"[{index}] {passage['title']} ({passage['file_path']})" if passage["title"] else f"[{index}] {passage['file_path']}"
+    return f"{header}\n{passage['content'].strip()}"
+
+def pack_context(search_results: List[Any], token_budget: int, dedup_threshold: float = 0.85) -> List[Dict[str, Any]]:
+    """검색 결과를 프롬프트에 넣을 문단 목록으로 정리합니다.
+
+    1. 같은 문서에서 겹치는 이웃 청크를 하나로 합침 (앞선 순위 유지).
+       청크 문자 위치(char_start/char_end)가 있으면 위치로, 없으면 텍스트 겹침으로 판단
+    2. 단어 n-gram이 앞선 문단과 dedup_threshold 이상 겹치는 근접 중복 제거
+    3. 순위 순으로 token_budget(추정 토큰)을 넘지 않을 때까지 채움
+
+    Returns:
+        순위 순 문단 목록 ({"rank", "file_path", "title", "content", "tokens"})
+    """
+    passages = flatten_hits(search_results)
+    merged = stitch_by_offsets([passage for passage in passages if _has_offsets(passage)])
+    for passage in passages:
+        if _has_offsets(passage):
+            continue
+        for kept in merged:
+            if kept["file_path"] != passage["file_path"] or _has_offsets(kept):
+                continue
+            combined = _merge_overlapping(kept["content"], passage["content"])
+            if combined is not None:
+                kept["content"] = combined
+                break
+        else:
+            merged.append(dict(passage))
+    merged.sort(key=lambda passage: passage["rank"])
+
+    unique: List[Dict[str, Any]] = []
+    shingle_sets: List[set] = []
+    for passage in merged:
+        shingles = _shingles(passage["content"])
+        if any(_containment(shingles, other) >= dedup_threshold for other in shingle_sets):
+            continue
+        unique.append(passage)
+        shingle_sets.append(shingles)
+
+    packed: List[Dict[str, Any]] = []
+    used = 0
+    for passage in unique:
+        tokens = estimate_tokens(render_passage(len(packed) + 1, passage))
+        if used + tokens > token_budget:
+            if packed:
+                # 남은 예산에 들어가는 더 짧은 문단이 있을 수 있으므로 계속 확인
+                continue
+            # 1순위 문단 하나가 예산보다 크면 잘라서라도 포함
+            header_tokens = tokens - estimate_tokens(passage["content"])
+            passage = {**passage, "content": _truncate(passage["content"], max(1, token_budget - header_tokens))}
+            tokens = estimate_tokens(render_passage(1, passage))
+        passage["tokens"] = tokens
+        packed.append(passage)
+        used += tokens
+    return packed
+
+def render_context(passages: List[Dict[str, Any]]) -> str:
+    """문단 목록을 번호가 붙은 "[n] 제목 (경로)" 블록 텍스트로 만듭니다."""
+    return "\n\n".join(render_passage(i, passage) for i, passage in enumerate(passages, start=1))
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Any, List, Optional, Set, Tuple
+
+from utils.logger import setup_logger
+
+# 로거 설정
+logger = setup_logger("embedding_batcher")
+
+EmbedFunction = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+class EmbeddingBatcher:
+    """동시에 들어온 임베딩 요청을 모아 한 번의 배치 호출로 처리합니다.
+
+    첫 요청이 들어온 뒤 max_wait_ms 동안 또는 max_batch_size개가 모일 때까지
+    요청을 모은 다음 embed_fn을 한 번 호출하고, 결과 벡터를 기다리던
+    코루틴들에 나눠줍니다. 같은 배치 안의 중복 텍스트는 한 번만 임베딩합니다.
+    """
+
+    def __init__(self, embed_fn: EmbedFunction, max_batch_size: int = 250, max_wait_ms: float = 5.0):
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"requests": 0, "batches": 0, "embedded_texts": 0}
+
+    async def embed(self, text: str) -> List[float]:
+        """텍스트 하나의 임베딩을 배치에 실어 요청하고 결과를 기다립니다."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        self.stats["requests"] += 1
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        # 이미 취소된 호출자는 제외하고 중복 텍스트는 한 번만 요청
+        waiting = [(text, future) for text, future in batch if not future.done()]
+        texts = list(dict.fromkeys(text for text, _ in waiting))
+        if not texts:
+            return
+
+        try:
+            vectors = await self.embed_fn(texts)
+            self.stats["batches"] += 1
+            self.stats["embedded_texts"] += len(texts)
+            by_text = dict(zip(texts, vectors))
+            for text, future in waiting:
+                if not future.done():
+                    future.set_result(by_text[text])
+        except Exception as e:
+            logger.error(f"Batched embedding call failed ({len(texts)} texts): {str(e)}")
+            for _, future in waiting:
+                if not future.done():
+                    future.set_exception(e)
+
+    def get_stats(self) -> Dict[str, Any]:
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "avg_batch_size": round(self.stats["embedded_texts"] / batches, 2) if batches else 0.0
+        }
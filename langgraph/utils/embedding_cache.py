@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import fcntl
+import hashlib
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from utils.logger import setup_logger
+
+# 로거 설정
+logger = setup_logger("embedding_cache")
+
+# 디스크 인덱스를 저장하는 주기 (새 항목 수 기준)
+INDEX_FLUSH_INTERVAL = 32
+
+class EmbeddingCache:
+    """쿼리 임베딩 캐시 (메모리 LRU + 디스크 계층).
+
+    디스크 계층은 (capacity x dim) float32 메모리 맵 행렬과
+    키 -> 행 번호 인덱스(JSON)로 구성되며, 가득 차면 가장 오래된 행부터
+    덮어쓰는 링 버퍼로 동작합니다. cache_dir이 None이면 메모리 계층만 사용합니다.
+
+    디스크 계층에는 잠금이 없으므로 디렉토리의 lock 파일을 배타적으로 잡고,
+    다른 프로세스가 이미 사용 중이면 RuntimeError를 냅니다 (워커마다 다른 경로 지정).
+    인덱스와 벡터 파일이 맞지 않으면 다른 쿼리의 벡터를 돌려주지 않도록 ValueError를 냅니다.
+    """
+
+    def __init__(self, cache_dir: Optional[str], dim: int, capacity: int, memory_size: int):
+        self.cache_dir = cache_dir
+        self.dim = dim
+        self.capacity = capacity
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._index: Dict[str, int] = {}
+        self._row_keys: List[Optional[str]] = [None] * capacity
+        self._next_row = 0
+        self._unflushed = 0
+        self.stats = {"hits": 0, "disk_hits": 0, "misses": 0, "miss_seconds": 0.0}
+        self._vectors = None
+        self._lock_file = None
+
+        if cache_dir is None:
+            return
+        os.makedirs(cache_dir, exist_ok=True)
+        self._index_path = os.path.join(cache_dir, "index.json")
+        self._vectors_path = os.path.join(cache_dir, "vectors.f32")
+        self._lock()
+        try:
+            self._load()
+        except Exception:
+            self.close()
+            raise
+
+    def _lock(self):
+        lock_file = open(os.path.join(self.cache_dir, "lock"), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise RuntimeError(f"Embedding cache directory {self.cache_dir} is used by another process")
+        self._lock_file = lock_file
+
+    def close(self):
+        """디스크 계층을 기록하고 디렉토리 잠금을 해제합니다."""
+        if self._vectors is not None:
+            self.flush()
+            self._vectors = None
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    @staticmethod
+    def make_key(model_id: str, text: str) -> str:
+        normalized = re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+        return hashlib.sha1(f"{model_id}\0{normalized}".encode('utf-8')).hexdigest()
+
+    def _load(self):
+        meta = {}
+        if os.path.exists(self._index_path):
+            try:
+                with open(self._index_path, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read embedding cache index: {str(e)}")
+
+        # 차원이나 용량이 바뀌었으면 디스크 계층을 새로 만듦
+        reuse = (
+            meta.get("dim") == self.dim
+            and meta.get("capacity") == self.capacity
+            and os.path.exists(self._vectors_path)
+        )
+        self._vectors = np.memmap(
+            self._vectors_path,
+            dtype=np.float32,
+            mode="r+" if reuse else "w+",
+            shape=(self.capacity, self.dim)
+        )
+
+        if reuse:
+            self._index = {key: int(row) for key, row in meta.get("index", {}).items()}
+            self._validate(meta)
+            for key, row in self._index.items():
+                self._row_keys[row] = key
+            self._next_row = int(meta.get("next_row", 0))
+            logger.info(f"Embedding cache loaded: {len(self._index)} vectors from {self.cache_dir}")
+
+    def _validate(self, meta: Dict[str, Any]):
+        """인덱스가 벡터 파일의 행과 일대일로 맞는지 확인합니다."""
+        rows = list(self._index.values())
+        problems = []
+        if os.path.getsize(self._vectors_path) != self.capacity * self.dim * 4:
+            problems.append(f"vector file size {os.path.getsize(self._vectors_path)} != {self.capacity * self.dim * 4}")
+        if any(row < 0 or row >= self.capacity for row in rows):
+            problems.append("row out of range")
+        if len(set(rows)) != len(rows):
+            problems.append("rows shared by several keys")
+        if meta.get("entries", len(rows)) != len(rows):
+            problems.append(f"{len(rows)} index entries != {meta.get('entries')} recorded")
+        if not 0 <= int(meta.get("next_row", 0)) < self.capacity:
+            problems.append("next_row out of range")
+        if problems:
+            raise ValueError(f"Embedding cache index in {self.cache_dir} does not match its vectors: {', '.join(problems)}")
+
+    def get(self, key: str) -> Optional[List[float]]:
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.stats["hits"] += 1
+            return vector
+
+        row = self._index.get(key) if self._vectors is not None else None
+        if row is not None:
+            vector = self._vectors[row].tolist()
+            self._remember(key, vector)
+            self.stats["hits"] += 1
+            self.stats["disk_hits"] += 1
+            return vector
+
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, key: str, vector: List[float], latency: float = 0.0):
+        """임베딩을 저장합니다. latency는 캐시 미스 시 실제 임베딩 호출에 걸린 시간(초)입니다."""
+        self.stats["miss_seconds"] += latency
+        self._remember(key, vector)
+
+        if self._vectors is None or len(vector) != self.dim or key in self._index:
+            return
+
+        # 링 버퍼: 가장 오래된 행을 덮어쓰고 그 행의 이전 키는 인덱스에서 제거
+        row = self._next_row
+        old_key = self._row_keys[row]
+        if old_key is not None:
+            self._index.pop(old_key, None)
+
+        self._vectors[row] = np.asarray(vector, dtype=np.float32)
+        self._index[key] = row
+        self._row_keys[row] = key
+        self._next_row = (row + 1) % self.capacity
+
+        self._unflushed += 1
+        if self._unflushed >= INDEX_FLUSH_INTERVAL:
+            self.flush()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def flush(self):
+        """메모리 맵 행렬과 인덱스를 디스크에 기록합니다."""
+        if self._vectors is None:
+            return
+        try:
+            self._vectors.flush()
+            temp_file = f"{self._index_path}.temp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({
+                    "dim": self.dim,
+                    "capacity": self.capacity,
+                    "next_row": self._next_row,
+                    "entries": len(self._index),
+                    "index": self._index
+                }, f)
+            os.replace(temp_file, self._index_path)
+            self._unflushed = 0
+        except Exception as e:
+            logger.error(f"Failed to flush embedding cache: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        avg_miss_seconds = self.stats["miss_seconds"] / self.stats["misses"] if self.stats["misses"] else 0.0
+        return {
+            "hits": self.stats["hits"],
+            "disk_hits": self.stats["disk_hits"],
+            "misses": self.stats["misses"],
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            "avg_miss_latency_ms": round(avg_miss_seconds * 1000, 2),
+            # 적중 한 번마다 평균 임베딩 호출 시간만큼 절약한 것으로 추정
+            "saved_latency_seconds": round(self.stats["hits"] * avg_miss_seconds, 3),
+            "memory_entries": len(self._memory),
+            "disk_entries": len(self._index)
+        }
@@ -0,0 +1,110 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+# 단계별 지연 시간 분위수 계산에 사용할 최근 표본 수
+LATENCY_WINDOW = 500
+
+class RequestTrace:
+    """요청 하나의 단계별 소요 시간, LLM 토큰 수, 검색 결과 수"""
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.hits = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round((time.perf_counter() - self.started_at) * 1000, 1),
+            "stages_ms": {stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()},
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "hits": self.hits
+        }
+
+# 현재 요청의 추적 정보 (asyncio 태스크/LangGraph 노드에 컨텍스트로 전달됨)
+_current_trace: ContextVar[Optional[RequestTrace]] = ContextVar("request_trace", default=None)
+
+class MetricsRegistry:
+    """프로세스 전체의 단계별 누적 지표 (/metrics 엔드포인트용)"""
+
+    def __init__(self):
+        self.stage_counts: Dict[str, int] = {}
+        self.stage_seconds: Dict[str, float] = {}
+        self.stage_samples: Dict[str, deque] = {}
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.hits = 0
+        self.requests = 0
+
+    def observe(self, stage: str, seconds: float):
+        self.stage_counts[stage] = self.stage_counts.get(stage, 0) + 1
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+        self.stage_samples.setdefault(stage, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stages = {}
+        for stage, samples in self.stage_samples.items():
+            ordered = sorted(samples)
+            stages[stage] = {
+                "count": self.stage_counts[stage],
+                "avg_ms": round(self.stage_seconds[stage] / self.stage_counts[stage] * 1000, 1),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 1),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1)
+            }
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "hits": self.hits,
+            "stages": stages
+        }
+
+metrics = MetricsRegistry()
+
+@contextmanager
+def trace_request():
+    """새 요청 추적을 시작합니다. 블록 안에서 기록한 지표가 반환된 RequestTrace에 모입니다."""
+    trace = RequestTrace()
+    token = _current_trace.set(trace)
+    metrics.requests += 1
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+@contextmanager
+def timed(stage: str):
+    """블록 실행 시간을 현재 요청과 전체 지표에 stage 이름으로 기록합니다 (같은 stage는 합산)."""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start_time
+        metrics.observe(stage, elapsed)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.stages[stage] = trace.stages.get(stage, 0.0) + elapsed
+
+def record_tokens(usage: Optional[Dict[str, Any]]):
+    """LLM 응답의 usage_metadata(input_tokens, output_tokens)를 기록합니다."""
+    if not usage:
+        return
+    input_tokens = int(usage.get("input_tokens") or 0)
+    output_tokens = int(usage.get("output_tokens") or 0)
+    metrics.input_tokens += input_tokens
+    metrics.output_tokens += output_tokens
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.input_tokens += input_tokens
+        trace.output_tokens += output_tokens
+
+def record_hits(count: int):
+    metrics.hits += count
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.hits += count
@@ -0,0 +1,67 @@
+import os
+import re
+import json
+from collections import Counter
+from typing import Dict, Optional
+
+import numpy as np
+
+from utils.logger import setup_logger
+
+# 로거 설정
+logger = setup_logger("sparse_encoder")
+
+class SparseEncoder:
+    """적재(ingestion) 시 전체 코퍼스로 학습한 TF-IDF 통계로 쿼리를 희소 벡터로 변환합니다.
+
+    milvus-utils/push_using_gemini.py가 저장한 버전별 아티팩트를 읽습니다.
+      - manifest.json  : 버전, 토큰화 설정, 불용어
+      - vocabulary.json: 단어 -> 인덱스
+      - idf.npy        : 인덱스별 IDF (float32, 메모리 맵으로 로드)
+    scikit-learn TfidfVectorizer(norm="l2", sublinear_tf=False)와 같은 값을 만듭니다.
+    """
+
+    def __init__(self, artifact_dir: str):
+        with open(os.path.join(artifact_dir, "manifest.json"), 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        with open(os.path.join(artifact_dir, "vocabulary.json"), 'r', encoding='utf-8') as f:
+            self.vocabulary: Dict[str, int] = json.load(f)
+
+        # IDF는 메모리 맵으로 읽어 여러 워커 프로세스가 페이지를 공유
+        self.idf = np.load(os.path.join(artifact_dir, "idf.npy"), mmap_mode="r")
+
+        self.version = self.manifest["version"]
+        self.lowercase = self.manifest.get("lowercase", True)
+        self.token_pattern = re.compile(self.manifest.get("token_pattern", r"(?u)\b\w\w+\b"))
+        self.stop_words = set(self.manifest.get("stop_words", []))
+        logger.info(f"Sparse encoder loaded: version {self.version}, {len(self.vocabulary)} terms")
+
+    @classmethod
+    def load(cls, root_dir: str) -> Optional["SparseEncoder"]:
+        """root_dir/CURRENT가 가리키는 버전의 인코더를 로드합니다. 없으면 None을 반환합니다."""
+        current_file = os.path.join(root_dir, "CURRENT")
+        if not os.path.exists(current_file):
+            logger.warning(f"Sparse encoder artifact not found in {root_dir}")
+            return None
+
+        with open(current_file, 'r', encoding='utf-8') as f:
+            version = f.read().strip()
+        return cls(os.path.join(root_dir, version))
+
+    def encode(self, text: str) -> Dict[int, float]:
+        """텍스트를 {인덱스: 가중치} 형태의 L2 정규화된 희소 벡터로 변환합니다."""
+        if self.lowercase:
+            text = text.lower()
+
+        counts = Counter(
+            self.vocabulary[token]
+            for token in self.token_pattern.findall(text)
+            if token not in self.stop_words and token in self.vocabulary
+        )
+        if not counts:
+            return {}
+
+        indices = np.fromiter(counts.keys(), dtype=np.int64)
+        weights = np.fromiter(counts.values(), dtype=np.float32) * self.idf[indices]
+        weights /= np.linalg.norm(weights)
+        return {int(idx): float(weight) for idx, weight in zip(indices, weights)}
@@ -1,7 +1,10 @@
 import os
+import json
 import pathlib
+import hashlib
 import numpy as np
 import time
+from datetime import datetime, timezone
 from typing import List, Dict
 from scipy.sparse import csr_matrix
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -33,6 +36,16 @@ DOCS_ROOT      = pathlib.Path(
 CHUNK_SIZE        = 700   # 한 청크당 최대 문자 수
 CHUNK_OVERLAP     = 150   # 이웃 청크와 겹칠 문자 수
 
+# 코퍼스 단위 희소 인코더 아티팩트 저장 경로. langgraph와 같은 SPARSE_ENCODER_DIR 환경 변수를 읽으며,
+# 없으면 실행 위치와 관계없이 langgraph 서버의 기본 경로(langgraph/sparse-encoder)에 저장
+SPARSE_ENCODER_DIR = pathlib.Path(os.getenv(
+    "SPARSE_ENCODER_DIR",
+    pathlib.Path(__file__).resolve().parent.parent / "langgraph" / "sparse-encoder"
+)).resolve()
+
+# language 파티션 키의 파티션 수 (언어 값이 해시로 분산됨)
+NUM_PARTITIONS    = 16
+
 # Vertex AI API 제한사항
 MAX_BATCH_SIZE    = 250   # API 요청당 최대 텍스트 수
 
@@ -46,6 +59,49 @@ def setup_tfidf_vectorizer():
     )
     return vectorizer
 
+def save_sparse_encoder(vectorizer, output_dir: pathlib.Path, num_documents: int):
+    """학습된 TF-IDF 통계를 버전별 아티팩트로 저장하고 버전 이름을 반환
+
+    CURRENT는 바꾸지 않으므로, 적재가 끝난 뒤 publish_sparse_encoder로 새 버전을 가리키게 해야 함.
+    저장 형식 (langgraph/utils/sparse_encoder.py에서 로드):
+      <output_dir>/<version>/manifest.json, vocabulary.json, idf.npy
+      <output_dir>/CURRENT
+    """
+    vocabulary = {term: int(idx) for term, idx in vectorizer.vocabulary_.items()}
+    idf = vectorizer.idf_.astype(np.float32)
+
+    digest = hashlib.sha256(json.dumps(vocabulary, sort_keys=True).encode("utf-8") + idf.tobytes()).hexdigest()[:8]
+    version = f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{digest}"
+    version_dir = output_dir / version
+    version_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {
+        "version": version,
+        "collection": COLLECTION_NAME,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "num_terms": len(vocabulary),
+        "num_documents": num_documents,
+        "lowercase": vectorizer.lowercase,
+        "token_pattern": vectorizer.token_pattern,
+        "stop_words": sorted(vectorizer.get_stop_words() or []),
+        "norm": vectorizer.norm,
+    }
+    with open(version_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    with open(version_dir / "vocabulary.json", "w", encoding="utf-8") as f:
+        json.dump(vocabulary, f, ensure_ascii=False)
+    np.save(version_dir / "idf.npy", idf)
+
+    print(f"[SparseEncoder] 저장 완료: {version_dir} (단어 {len(vocabulary)}개, 문서 {num_documents}개)")
+    return version
+
+def publish_sparse_encoder(output_dir: pathlib.Path, version: str):
+    """CURRENT가 version을 가리키게 함 (atomic rename). 모든 청크의 삽입과 flush가 끝난 뒤에만 호출"""
+    current_tmp = output_dir / "CURRENT.tmp"
+    current_tmp.write_text(version, encoding="utf-8")
+    os.replace(current_tmp, output_dir / "CURRENT")
+    print(f"[SparseEncoder] CURRENT → {version}")
+
 def setup_vertex_ai():
     """Vertex AI 임베딩 모델 초기화"""
     vertexai.init(project=VERTEX_PROJECT_ID, location=VERTEX_LOCATION)
@@ -69,13 +125,18 @@ def setup_milvus_collection():
         FieldSchema(name="dense_vector", dtype=DataType.FLOAT_VECTOR,     dim=EMBEDDING_DIM),
         FieldSchema(name="sparse_vector",dtype=DataType.SPARSE_FLOAT_VECTOR),
         FieldSchema(name="file_path",    dtype=DataType.VARCHAR,          max_length=500),
-        FieldSchema(name="language",     dtype=DataType.VARCHAR,          max_length=20),
+        # 파티션 키: language 필터 검색 시 해당 언어 파티션만 검색
+        FieldSchema(name="language",     dtype=DataType.VARCHAR,          max_length=20, is_partition_key=True),
         FieldSchema(name="title",        dtype=DataType.VARCHAR,          max_length=200),
         FieldSchema(name="content",      dtype=DataType.VARCHAR,          max_length=10000),
         FieldSchema(name="directory",    dtype=DataType.VARCHAR,          max_length=500),
+        # 검색 시 같은 파일의 이웃 청크를 이어붙이기 위한 청크 순번과 원문 내 문자 위치 [char_start, char_end)
+        FieldSchema(name="chunk_index",  dtype=DataType.INT64),
+        FieldSchema(name="char_start",   dtype=DataType.INT64),
+        FieldSchema(name="char_end",     dtype=DataType.INT64),
     ]
-    schema = CollectionSchema(fields, description="MkDocs 문서 하이브리드 검색 저장소")
-    coll = Collection(name=COLLECTION_NAME, schema=schema,consistency_level="Strong")
+    schema = CollectionSchema(fields, description="MkDocs 문서 하이브리드 검색 저장소", partition_key_field="language")
+    coll = Collection(name=COLLECTION_NAME, schema=schema, consistency_level="Strong", num_partitions=NUM_PARTITIONS)
     print(f"[Milvus] 컬렉션 생성: {COLLECTION_NAME}")
 
     # 밀집 벡터 인덱스 생성
@@ -120,14 +181,22 @@ def find_markdown_files(root_dir):
     print(f"[Info] 총 {len(md_files)}개의 MD파일 발견")
     return md_files
 
-def chunk_text_by_char(text: str, size: int, overlap: int):
-    """문자 단위로 text를 size씩 잘라 overlap만큼 겹치게 반환"""
+def chunk_text_by_char(text: str, size: int, overlap: int) -> List[Dict]:
+    """문자 단위로 text를 size씩 잘라 overlap만큼 겹치게 반환
+
+    각 청크는 {"index", "text", "char_start", "char_end"} 형태이며 text == 원문[char_start:char_end]
+    """
     chunks = []
     start = 0
     length = len(text)
     while start < length:
         end = min(start + size, length)
-        chunks.append(text[start:end])
+        chunks.append({
+            "index": len(chunks),
+            "text": text[start:end],
+            "char_start": start,
+            "char_end": end
+        })
         start += size - overlap
     return chunks
 
@@ -136,9 +205,7 @@ def process_chunks_in_batches(chunks: List[str], model, vectorizer, batch_size=M
     all_dense_vectors = []
     all_sparse_vectors = []
     
-    # TF-IDF 희소 벡터 생성을 위해 전체 코퍼스로 학습
-    vectorizer.fit(chunks)
-    
+    # vectorizer는 main()에서 전체 코퍼스로 한 번만 학습됨
     # 배치 단위로 처리
     for i in range(0, len(chunks), batch_size):
         batch = chunks[i:i+batch_size]
@@ -170,36 +237,47 @@ def process_chunks_in_batches(chunks: List[str], model, vectorizer, batch_size=M
             time.sleep(0.5)  # 0.5초 대기
     return all_dense_vectors, all_sparse_vectors
 
-def insert_file_with_hybrid_chunks(file_info, collection, model, vectorizer, root_dir):
-    """파일을 읽고 문자 단위 청킹 후 하이브리드 임베딩하여 Milvus에 삽입"""
+def load_file_chunks(file_info):
+    """파일을 읽어 문자 단위로 청킹 (빈 파일이면 빈 리스트)"""
+    rel = file_info["rel"]
+    try:
+        text = file_info["path"].read_text(encoding="utf-8").strip()
+    except Exception as e:
+        print(f"[Error] {rel} 읽기 중 예외: {e}")
+        return []
+
+    if not text:
+        print(f"[Skip] 빈 파일: {rel}")
+        return []
+
+    chunks = chunk_text_by_char(text, CHUNK_SIZE, CHUNK_OVERLAP)
+    if not chunks:
+        print(f"[Skip] 청킹 후 내용 없음: {rel}")
+    return chunks
+
+def insert_file_with_hybrid_chunks(file_info, chunks, collection, model, vectorizer, root_dir) -> bool:
+    """청킹된 파일을 하이브리드 임베딩하여 Milvus에 삽입. 모든 배치가 삽입되면 True"""
     print("-----------------  insert_file_with_hybrid_chunks  ---------------------------")
     path = file_info["path"]
     rel  = file_info["rel"]
     lang = file_info["lang"]
 
     try:
-        text = path.read_text(encoding="utf-8").strip()
-        if not text:
-            print(f"[Skip] 빈 파일: {rel}")
-            return
-
-        # 문자 단위 청킹
-        chunks = chunk_text_by_char(text, CHUNK_SIZE, CHUNK_OVERLAP)
-        if not chunks:
-            print(f"[Skip] 청킹 후 내용 없음: {rel}")
-            return
-            
         # 밀집 및 희소 벡터 생성 (배치 처리)
-        dense_vectors, sparse_vectors = process_chunks_in_batches(chunks, model, vectorizer)
+        dense_vectors, sparse_vectors = process_chunks_in_batches([chunk["text"] for chunk in chunks], model, vectorizer)
 
         # 각 필드 데이터 준비
         file_paths, langs, titles, contents, dirs = [], [], [], [], []
-        for idx, chunk in enumerate(chunks):
+        chunk_indices, char_starts, char_ends = [], [], []
+        for chunk in chunks:
             file_paths.append(rel)
             langs.append(lang)
-            titles.append(f"{path.stem}_chunk{idx}")
-            contents.append(chunk)
+            titles.append(f"{path.stem}_chunk{chunk['index']}")
+            contents.append(chunk["text"])
             dirs.append(str(path.parent.relative_to(root_dir)))
+            chunk_indices.append(chunk["index"])
+            char_starts.append(chunk["char_start"])
+            char_ends.append(chunk["char_end"])
 
         # Milvus에 삽입 (배치 단위로)
         max_batch = 1000  # Milvus 삽입 배치 크기 (64MB 제한 고려)
@@ -213,6 +291,9 @@ def insert_file_with_hybrid_chunks(file_info, collection, model, vectorizer, roo
             batch_titles = titles[i:end_idx]
             batch_contents = contents[i:end_idx]
             batch_dirs = dirs[i:end_idx]
+            batch_chunk_indices = chunk_indices[i:end_idx]
+            batch_char_starts = char_starts[i:end_idx]
+            batch_char_ends = char_ends[i:end_idx]
             
             # Milvus에 삽입
             entities = [
@@ -223,6 +304,9 @@ def insert_file_with_hybrid_chunks(file_info, collection, model, vectorizer, roo
                 batch_titles,    # title 필드
                 batch_contents,  # content 필드
                 batch_dirs,      # directory 필드
+                batch_chunk_indices,  # chunk_index 필드
+                batch_char_starts,    # char_start 필드
+                batch_char_ends,      # char_end 필드
             ]
             print(f"entities 삽입 시작 : {entities}")
             
@@ -231,9 +315,13 @@ def insert_file_with_hybrid_chunks(file_info, collection, model, vectorizer, roo
                 print(f"[Inserted] {rel} 배치 {i//max_batch + 1}/{(len(chunks)+max_batch-1)//max_batch} → {len(batch_dense)}개 청크")
             except Exception as e:
                 print(f"[Error] {rel} 삽입 중 오류: {e}")
+                return False
 
     except Exception as e:
         print(f"[Error] {rel} 처리 중 예외: {e}")
+        return False
+
+    return True
 
 def main():
     model = setup_vertex_ai()
@@ -249,9 +337,26 @@ def main():
         print("[Info] 삽입할 파일이 없습니다.")
         return
 
-    for file_info in md_files:
-        insert_file_with_hybrid_chunks(file_info, collection, model, vectorizer, DOCS_ROOT)
+    # 전체 파일을 먼저 청킹
+    file_chunks = [(file_info, load_file_chunks(file_info)) for file_info in md_files]
+    file_chunks = [(file_info, chunks) for file_info, chunks in file_chunks if chunks]
+    all_chunks = [chunk["text"] for _, chunks in file_chunks for chunk in chunks]
+
+    # 희소 벡터용 TF-IDF를 전체 코퍼스로 한 번만 학습하고, 검색 서버가 쓸 수 있도록 저장
+    vectorizer.fit(all_chunks)
+    version = save_sparse_encoder(vectorizer, SPARSE_ENCODER_DIR, len(all_chunks))
+
+    failed_files = [
+        file_info["rel"] for file_info, chunks in file_chunks
+        if not insert_file_with_hybrid_chunks(file_info, chunks, collection, model, vectorizer, DOCS_ROOT)
+    ]
+    if failed_files:
+        # 일부만 적재된 상태에서 검색 서버가 새 어휘로 쿼리를 인코딩하지 않도록 CURRENT는 그대로 둠
+        print(f"[Error] {len(failed_files)}개 파일 삽입 실패, 희소 인코더 {version}을(를) 적용하지 않습니다: {failed_files}")
+        return
 
+    collection.flush()
+    publish_sparse_encoder(SPARSE_ENCODER_DIR, version)
     print("[Done] 모든 파일의 하이브리드 임베딩 청크 삽입 완료")
 
 if __name__ == "__main__":